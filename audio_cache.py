@@ -0,0 +1,120 @@
+import hashlib
+import os
+import threading
+
+from disk_cache import atomic_write, evict_lru, touch
+from perf import stats
+
+# Default cap on the total size of cached audio clips
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CLIP_SUFFIX = '.clip'
+
+
+class EmptyClipError(ValueError):
+    """A backend returned no audio for a chunk"""
+
+
+def normalize_chunk_text(text):
+    """Collapse whitespace so layout differences don't defeat the cache"""
+    return ' '.join(text.split())
+
+
+def check_clip(clip, text):
+    """Return clip, raising EmptyClipError if it holds no audio"""
+    if not clip:
+        raise EmptyClipError(f"No audio returned for {text[:40]!r}")
+    return clip
+
+
+class AudioCache:
+    """On-disk cache of synthesized clips keyed by text and voice settings, with LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None  # Scanned lazily on first write
+        self._lock = threading.Lock()
+
+    def key(self, text, engine, language, rate):
+        """Return the cache key for a chunk spoken with the given settings"""
+        source = '\0'.join([engine, language, str(rate), normalize_chunk_text(text)])
+        return hashlib.blake2b(source.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CLIP_SUFFIX)
+
+    def get(self, key):
+        """Return cached clip bytes, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                clip = f.read()
+        except OSError:
+            clip = None
+        if not clip:
+            # An empty file is left by an older version that cached failed clips
+            self.misses += 1
+            stats.count('audio_cache.miss')
+            return None
+        touch(path)
+        self.hits += 1
+        stats.count('audio_cache.hit')
+        return clip
+
+    def put(self, key, clip):
+        """Store a clip and evict old clips once the cache is over its cap; empty clips are never stored"""
+        if not clip:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write(self._path(key), clip)
+            with self._lock:
+                # Track the size in memory so most writes don't rescan the directory
+                if self._total_bytes is None or self._total_bytes + len(clip) > self.max_bytes:
+                    self._total_bytes = evict_lru(self.cache_dir, self.max_bytes, CLIP_SUFFIX)
+                else:
+                    self._total_bytes += len(clip)
+                stats.gauge('audio_cache.bytes', self._total_bytes)
+        except Exception as e:
+            print(f"Audio cache write error: {e}")
+
+
+class CachedSynthesizer:
+    """Wrap a synthesize callable so repeated chunks are served from an AudioCache"""
+
+    def __init__(self, synthesize, cache, engine, language, rate):
+        self.synthesize = synthesize
+        self.cache = cache
+        self.engine = engine
+        self.language = language
+        self.rate = rate
+
+    def __call__(self, text):
+        key = self.cache.key(text, self.engine, self.language, self.rate)
+        clip = self.cache.get(key)
+        if clip is None:
+            clip = check_clip(self.synthesize(normalize_chunk_text(text)), text)
+            self.cache.put(key, clip)
+        return clip
+
+    def iter_audio(self, text):
+        """Yield a cached clip, or stream from the backend and cache the clip once it is complete"""
+        key = self.cache.key(text, self.engine, self.language, self.rate)
+        clip = self.cache.get(key)
+        if clip is not None:
+            yield clip
+            return
+        if not hasattr(self.synthesize, 'iter_audio'):
+            clip = check_clip(self.synthesize(normalize_chunk_text(text)), text)
+            self.cache.put(key, clip)
+            yield clip
+            return
+
+        parts = []
+        for data in self.synthesize.iter_audio(normalize_chunk_text(text)):
+            parts.append(data)
+            yield data
+        # Not reached if playback stopped mid-clip, so partial clips are never cached
+        self.cache.put(key, check_clip(b''.join(parts), text))
@@ -0,0 +1,321 @@
+"""Reproducible benchmarks for extraction, search and narration latency.
+
+    python benchmark.py --pages 300 --output results.json
+    python benchmark.py --pages 300 --baseline results.json
+
+Synthetic PDFs are generated locally and the TTS backends are replaced by
+stubs, so no network or audio device is needed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import struct
+import sys
+import tempfile
+import time
+
+from document_view import page_piece
+from pdf_extraction import PageExtractor, default_worker_count
+from search_index import SearchIndex
+from text_normalization import iter_normalized
+from text_positions import LineIndex
+from tts_pipeline import NarrationPipeline, Pyttsx3Narrator, split_into_chunks
+
+WORDS = ("the of and to in is was that for it with as his on be at by had are but from or have an they "
+         "which one you were her all she there would their we him been has when who will more no if out "
+         "narrator chapter library reading voice speech document quick brown fox lazy dog river mountain "
+         "silence thunder morning evening window garden letter question answer memory history").split()
+
+# Simulated synthesis cost for the stub backend
+STUB_SYNTH_BASE_SECONDS = 0.02
+STUB_SYNTH_SECONDS_PER_CHAR = 0.0001
+# Audio the streaming stub returns: 16 kHz mono 16-bit WAV, in this many parts per clip
+STUB_WAV_RATE = 16000
+STUB_AUDIO_SECONDS_PER_CHAR = 0.06
+STUB_STREAM_PARTS = 10
+# Clips narrated when timing a streaming backend; only the first matters
+STREAM_BENCHMARK_CHUNKS = 3
+
+# Default allowed slowdown before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+
+def synthetic_pages(pages, lines_per_page, words_per_line, seed=0):
+    """Return deterministic page texts made of random words and sentences"""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(pages):
+        lines = []
+        for _ in range(lines_per_page):
+            words = [rng.choice(WORDS) for _ in range(words_per_line)]
+            words[0] = words[0].capitalize()
+            line = ' '.join(words)
+            lines.append(line + '.' if rng.random() < 0.4 else line)
+        result.append(lines)
+    return result
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_synthetic_pdf(path, pages, lines_per_page=40, words_per_line=12, seed=0):
+    """Write a plain-text PDF with no third-party dependencies"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in synthetic_pages(pages, lines_per_page, words_per_line, seed):
+        body = ["BT /F1 9 Tf 11 TL 40 800 Td"]
+        body.extend(f"({_pdf_escape(line)}) '" for line in lines)
+        body.append("ET")
+        stream = '\n'.join(body).encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = ' '.join(f"{i} 0 R" for i in page_ids).encode('ascii')
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def _best_of(repeats, func):
+    """Run func repeats times; return (fastest seconds, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def _metric(value, unit, better):
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+class StubSynthesizer:
+    """Stand-in for a network TTS backend with a fixed per-request and per-character cost"""
+
+    def __call__(self, text):
+        time.sleep(STUB_SYNTH_BASE_SECONDS + STUB_SYNTH_SECONDS_PER_CHAR * len(text))
+        return text.encode('utf-8')
+
+
+class StubStreamingSynthesizer:
+    """Stand-in for an HTTP backend streaming WAV, delivering each clip in parts over its synthesis time"""
+
+    def iter_audio(self, text):
+        seconds = STUB_SYNTH_BASE_SECONDS + STUB_SYNTH_SECONDS_PER_CHAR * len(text)
+        frames = int(STUB_WAV_RATE * STUB_AUDIO_SECONDS_PER_CHAR * len(text))
+        fmt = struct.pack('<IHHIIHH', 16, 1, 1, STUB_WAV_RATE, 2 * STUB_WAV_RATE, 2, 16)
+        # Sizes unknown while streaming, as real services send them
+        yield b'RIFF\xff\xff\xff\xffWAVEfmt ' + fmt + b'data\xff\xff\xff\xff'
+        part_bytes = 2 * -(-frames // STUB_STREAM_PARTS)
+        for start in range(0, 2 * frames, part_bytes):
+            time.sleep(seconds / STUB_STREAM_PARTS)
+            yield bytes(min(part_bytes, 2 * frames - start))
+
+    def __call__(self, text):
+        return b''.join(self.iter_audio(text))
+
+
+class StubPlayer:
+    """Records when the first clip reaches the player instead of playing it"""
+
+    def __init__(self, started):
+        self.started = started
+        self.first_clip_at = None
+
+    def enqueue(self, clip, is_running, on_start=None):
+        if self.first_clip_at is None:
+            self.first_clip_at = time.perf_counter() - self.started
+        if on_start:
+            on_start()
+
+    def wait_until_done(self, is_running):
+        pass
+
+    def stop(self):
+        pass
+
+
+class StubEngine:
+    """pyttsx3 stand-in that records when speech first starts"""
+
+    def __init__(self, started):
+        self.started = started
+        self.first_say_at = None
+
+    def say(self, text):
+        if self.first_say_at is None:
+            self.first_say_at = time.perf_counter() - self.started
+
+    def runAndWait(self):
+        pass
+
+    def setProperty(self, name, value):
+        pass
+
+    def stop(self):
+        pass
+
+
+def run_benchmarks(pages=200, lines_per_page=40, words_per_line=12, repeats=3, workers=None, seed=0):
+    """Run every benchmark and return a JSON-serializable result dict"""
+    workers = workers or default_worker_count()
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "synthetic.pdf")
+        write_synthetic_pdf(pdf_path, pages, lines_per_page, words_per_line, seed)
+
+        seconds, page_texts = _best_of(repeats, lambda: PageExtractor(workers=1).extract_pages(pdf_path))
+        metrics['extract_serial_pages_per_second'] = _metric(pages / seconds, 'pages/s', 'higher')
+        seconds, _ = _best_of(repeats, lambda: PageExtractor(workers=workers, serial_threshold=1).extract_pages(pdf_path))
+        metrics['extract_parallel_pages_per_second'] = _metric(pages / seconds, 'pages/s', 'higher')
+
+    seconds, normalized = _best_of(repeats, lambda: list(iter_normalized(page_texts)))
+    metrics['normalize_pages_per_second'] = _metric(pages / seconds, 'pages/s', 'higher')
+
+    # Search and narration run on the normalized text, laid out as the reader shows it
+    pieces = [page_piece(page_num, page.text) for page_num, page in enumerate(normalized)]
+    text = ''.join(pieces)
+
+    def build_index():
+        index = SearchIndex()
+        for page_num, piece in enumerate(pieces):
+            index.add_text(piece, page_num)
+        index.folded  # Force the folded copy, as the first query would
+        return index
+
+    seconds, index = _best_of(repeats, build_index)
+    metrics['index_build_seconds'] = _metric(seconds, 's', 'lower')
+
+    queries = {
+        'common_word': ("the", "text"),
+        'rare_word': ("thunder", "word"),
+        'prefix': ("mem", "prefix"),
+        'phrase': ("quick brown", "phrase"),
+        'substring': ("ound", "text"),
+        'regex': (r"riv\w+ moun", "regex"),
+    }
+    for name, (query, mode) in queries.items():
+        timings = []
+        for _ in range(max(repeats, 5)):
+            started = time.perf_counter()
+            results = index.find_all(query, mode)
+            timings.append(time.perf_counter() - started)
+        metrics[f'query_{name}_ms'] = _metric(statistics.median(timings) * 1000, 'ms', 'lower')
+        metrics[f'query_{name}_matches'] = _metric(len(results), 'matches', 'info')
+
+    line_index = LineIndex(text)
+    all_hits = index.find_all("the")
+    seconds, _ = _best_of(repeats, lambda: line_index.to_indices(all_hits))
+    metrics['highlight_indices_ms'] = _metric(seconds * 1000, 'ms', 'lower')
+
+    def first_audio_gtts():
+        started = time.perf_counter()
+        player = StubPlayer(started)
+        NarrationPipeline(StubSynthesizer(), player).run(split_into_chunks(text[:20000]))
+        return player.first_clip_at
+
+    _, first_audio = _best_of(1, first_audio_gtts)
+    metrics['gtts_time_to_first_audio_ms'] = _metric(first_audio * 1000, 'ms', 'lower')
+
+    def first_audio_wav(streaming):
+        started = time.perf_counter()
+        player = StubPlayer(started)
+        chunks = split_into_chunks(text[:20000])[:STREAM_BENCHMARK_CHUNKS]
+        NarrationPipeline(StubStreamingSynthesizer(), player, streaming=streaming).run(chunks)
+        return player.first_clip_at
+
+    # The same WAV backend played once each clip is complete, then while it downloads
+    for name, streaming in (('http_wav', False), ('http_wav_streamed', True)):
+        first_audio = min(first_audio_wav(streaming) for _ in range(repeats))
+        metrics[f'{name}_time_to_first_audio_ms'] = _metric(first_audio * 1000, 'ms', 'lower')
+
+    def first_audio_pyttsx3():
+        started = time.perf_counter()
+        engine = StubEngine(started)
+        Pyttsx3Narrator(engine).run(text)
+        return engine.first_say_at
+
+    first_say = min(first_audio_pyttsx3() for _ in range(repeats))
+    metrics['pyttsx3_time_to_first_audio_ms'] = _metric(first_say * 1000, 'ms', 'lower')
+
+    return {
+        'config': {'pages': pages, 'lines_per_page': lines_per_page, 'words_per_line': words_per_line,
+                   'repeats': repeats, 'workers': workers, 'seed': seed, 'characters': len(text)},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'metrics': metrics,
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return (report lines, regression names) comparing results against a baseline"""
+    lines = []
+    regressions = []
+    for name, metric in results['metrics'].items():
+        old = baseline.get('metrics', {}).get(name)
+        if old is None or metric['better'] == 'info' or not old['value']:
+            continue
+        change = (metric['value'] - old['value']) / old['value']
+        worse = change < -tolerance if metric['better'] == 'higher' else change > tolerance
+        flag = "REGRESSION" if worse else ""
+        if worse:
+            regressions.append(name)
+        lines.append(f"{name:40s} {old['value']:12.3f} -> {metric['value']:12.3f} {metric['unit']:8s} "
+                     f"{change * 100:+7.1f}% {flag}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extraction, search and narration latency")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--words-per-line", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a JSON file from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric is a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.pages, args.lines_per_page, args.words_per_line,
+                             args.repeats, args.workers, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline, args.tolerance)
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
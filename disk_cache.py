@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file and rename, so readers never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def touch(path):
+    """Mark a cache entry as recently used"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict_lru(directory, max_bytes, suffix):
+    """Delete least recently used files ending in suffix until they fit in max_bytes.
+
+    Returns the total size of the files that remain.
+    """
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(suffix):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
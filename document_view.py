@@ -0,0 +1,276 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from text_positions import LineIndex
+
+# Pages kept resident on each side of the page being viewed
+DEFAULT_WINDOW_PAGES = 25
+# Fraction of the resident text from either end at which the window shifts
+SHIFT_MARGIN = 0.05
+# Shown in place of a page that is still being extracted
+PLACEHOLDER_TEXT = "[Extracting page {page}...]"
+
+
+def page_piece(page_num, page_text):
+    """Return the piece for a page: blank pages are empty, later pages start with a blank line"""
+    if not page_text.strip():
+        return ''
+    return page_text.lstrip() if page_num == 0 else '\n\n' + page_text
+
+
+class TextPieces:
+    """Read-only piece list sliced on demand from the assembled document text"""
+
+    def __init__(self, text, starts):
+        self.text = text
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, page_num):
+        end = self.starts[page_num + 1] if page_num + 1 < len(self.starts) else len(self.text)
+        return self.text[self.starts[page_num]:end]
+
+
+class DocumentView:
+    """Keep a window of pages resident in a Tk Text widget.
+
+    The document is held as a list of pieces (one per page, separators
+    included). Only pieces [first, last) are inserted in the widget; the
+    window moves as the user scrolls towards either end or when
+    show_offset() targets a page outside it. Callers work in global
+    document offsets and convert with to_index()/to_offset().
+
+    While a document is still loading, set_page_source() lets the window
+    show pages that haven't been appended yet. They are requested from the
+    page source and shown as placeholders until receive_page() delivers
+    them, so the Tk thread never waits on extraction. Global offsets are
+    only known up to the last appended piece, so a window past that point
+    has no window_start and to_offset() returns None.
+    """
+
+    def __init__(self, widget, window_pages=DEFAULT_WINDOW_PAGES):
+        self.widget = widget
+        self.window_pages = window_pages
+        self.on_window_change = None  # Called after the resident pages are swapped
+        self.clear()
+
+    def clear(self):
+        """Drop the document and empty the widget"""
+        self.pieces = []
+        self.piece_starts = array('L')
+        self.length = 0
+        self.first = 0
+        self.last = 0
+        self.window_starts = array('L', [0])  # Offset of each resident piece within the widget text
+        self.page_count = 0
+        self.page_source = None
+        self.fetched = {}  # page_num -> piece delivered by receive_page(), for resident pages only
+        self.line_index = LineIndex()
+        self._placeholders = set()  # Resident pages currently shown as placeholders
+        self._shift_pending = False
+        self._refresh_pending = False
+        self.widget.delete('1.0', 'end')
+
+    @property
+    def max_resident(self):
+        return 2 * self.window_pages + 1
+
+    @property
+    def total_pages(self):
+        return max(len(self.pieces), self.page_count) if self.page_source else len(self.pieces)
+
+    @property
+    def window_start(self):
+        """Global offset of the first resident character, or None if not known yet"""
+        if self.first < len(self.pieces):
+            return self.piece_starts[self.first]
+        return self.length if self.first == len(self.pieces) else None
+
+    @property
+    def window_end(self):
+        """Global offset just past the last resident character, or None if not known yet"""
+        start = self.window_start
+        return None if start is None else start + self.window_starts[-1]
+
+    def set_page_source(self, page_count, page_source):
+        """Let the window show pages [len(pieces), page_count) before they are appended.
+
+        page_source(page_nums) is called on the Tk thread with the pages the
+        window needs, most wanted first, and must not block; each piece is
+        then handed back with receive_page(). A piece must be the same one
+        append_pieces() will later receive for that page. Pass None to go
+        back to appended pieces only.
+        """
+        self.page_count = page_count
+        self.page_source = page_source
+        self.fetched = {}
+
+    def receive_page(self, page_num, piece):
+        """Fill in a page requested from the page source; call on the Tk thread"""
+        if self.page_source is None or not self.first <= page_num < self.last or page_num < len(self.pieces):
+            return
+        self.fetched[page_num] = piece
+        if page_num in self._placeholders:
+            self._schedule_refresh()
+
+    def adopt_text(self, text):
+        """Slice pieces from the assembled text from now on instead of keeping each page's string.
+
+        This drops the view's copy of the text; the search index still keeps
+        its own casefolded copy. No more pieces can be appended until clear().
+        """
+        self.pieces = TextPieces(text, self.piece_starts)
+
+    def append_pieces(self, pieces):
+        """Add pages to the end of the document, showing them if the window has room"""
+        visible = []
+        for piece in pieces:
+            self.piece_starts.append(self.length)
+            self.pieces.append(piece)
+            self.length += len(piece)
+            # The window grows while loading until it holds max_resident pages
+            if self.last == len(self.pieces) - 1 and self.last - self.first < self.max_resident:
+                self.last += 1
+                self.window_starts.append(self.window_starts[-1] + len(piece))
+                visible.append(piece)
+        if visible:
+            text = ''.join(visible)
+            self.widget.insert('end', text)
+            self.line_index.append(text)
+        if any(page_num < len(self.pieces) for page_num in self._placeholders):
+            self._schedule_refresh()
+
+    def contains(self, offset):
+        start, end = self.window_start, self.window_end
+        if start is None:
+            return False
+        return start <= offset < end or (offset == end == self.length)
+
+    def piece_for_offset(self, offset):
+        return max(0, bisect_right(self.piece_starts, offset) - 1)
+
+    def to_index(self, offset):
+        """Return the widget index for a resident global offset"""
+        return self.line_index.to_index(offset - self.window_start)
+
+    def to_indices(self, ranges):
+        """Convert sorted global (start, end) ranges inside the window to widget indices"""
+        base = self.window_start
+        return self.line_index.to_indices([(start - base, end - base) for start, end in ranges])
+
+    def to_offset(self, index):
+        """Return the global offset for a widget index, or None if the window's offsets aren't known yet"""
+        start = self.window_start
+        if start is None:
+            return None
+        return start + self.line_index.to_offset(self.widget.index(index))
+
+    def resident_range(self, ranges):
+        """Return (lo, hi) so that ranges[lo:hi] are the sorted ranges starting inside the window"""
+        start, end = self.window_start, self.window_end
+        if start is None:
+            return 0, 0
+        return bisect_left(ranges, (start, -1)), bisect_left(ranges, (end, -1))
+
+    def show_offset(self, offset):
+        """Make sure offset is resident (re-centering the window if needed) and scroll to it"""
+        if not self.contains(offset):
+            self._load_window(self.piece_for_offset(offset))
+        index = self.to_index(offset)
+        self.widget.see(index)
+        return index
+
+    def show_page(self, page_num):
+        """Make a page resident, extracting it through the page source if needed, and scroll to it"""
+        page_num = max(0, min(page_num, self.total_pages - 1))
+        if not self.first <= page_num < self.last:
+            self._load_window(page_num)
+        index = self.line_index.to_index(self.window_starts[page_num - self.first])
+        self.widget.yview(index)
+        return index
+
+    def check_scroll(self, first_fraction, last_fraction):
+        """Shift the window when the user scrolls close to either end of the resident text"""
+        near_top = float(first_fraction) < SHIFT_MARGIN and self.first > 0
+        near_bottom = float(last_fraction) > 1 - SHIFT_MARGIN and self.last < self.total_pages
+        if (near_top or near_bottom) and not self._shift_pending:
+            # Defer the swap so it doesn't run inside the widget's scroll callback
+            self._shift_pending = True
+            self.widget.after_idle(self._shift_to_view)
+
+    def _top_position(self):
+        """Return (page_num, offset within the page) of the first visible character"""
+        # Work in window-relative positions; global offsets may not be known yet
+        top = self.line_index.to_offset(self.widget.index('@0,0'))
+        slot = bisect_right(self.window_starts, top) - 1
+        page_num = self.first + min(slot, self.last - self.first - 1)
+        return page_num, top - self.window_starts[page_num - self.first]
+
+    def _scroll_to_position(self, page_num, within):
+        slot = page_num - self.first
+        offset = min(self.window_starts[slot] + within, self.window_starts[slot + 1])
+        self.widget.yview(self.line_index.to_index(offset))
+
+    def _shift_to_view(self):
+        self._shift_pending = False
+        if self.last == self.first:
+            self._load_window(self.first)
+            return
+        page_num, within = self._top_position()
+        self._load_window(page_num)
+        self._scroll_to_position(page_num, within)
+
+    def _schedule_refresh(self):
+        if not self._refresh_pending:
+            # Coalesce pages arriving together into one redraw
+            self._refresh_pending = True
+            self.widget.after_idle(self._refresh_window)
+
+    def _refresh_window(self):
+        """Redraw the resident pages once placeholders can be filled in, keeping the view where it was"""
+        self._refresh_pending = False
+        if self.last == self.first or not any(
+                page_num < len(self.pieces) or page_num in self.fetched for page_num in self._placeholders):
+            return
+        page_num, within = self._top_position()
+        if page_num in self._placeholders:
+            within = 0  # The placeholder's text says nothing about where in the page the user was
+        self._render_window(self.first, self.last)
+        self._scroll_to_position(page_num, within)
+
+    def _piece(self, page_num):
+        if page_num < len(self.pieces):
+            return self.pieces[page_num]
+        piece = self.fetched.get(page_num)
+        if piece is None:
+            self._placeholders.add(page_num)
+            piece = page_piece(page_num, PLACEHOLDER_TEXT.format(page=page_num + 1))
+        return piece
+
+    def _load_window(self, center):
+        """Replace the widget contents with the pages around center"""
+        first = max(0, center - self.window_pages)
+        last = min(self.total_pages, first + self.max_resident)
+        first = max(0, last - self.max_resident)
+        if (first, last) != (self.first, self.last):
+            self._render_window(first, last)
+            if self._placeholders:
+                # Nearest the page being shown first
+                self.page_source(sorted(self._placeholders, key=lambda page_num: abs(page_num - center)))
+
+    def _render_window(self, first, last):
+        self.first, self.last = first, last
+        self.fetched = {page_num: piece for page_num, piece in self.fetched.items() if first <= page_num < last}
+        self._placeholders = set()
+        pieces = [self._piece(page_num) for page_num in range(first, last)]
+        self.window_starts = array('L', [0])
+        for piece in pieces:
+            self.window_starts.append(self.window_starts[-1] + len(piece))
+        text = ''.join(pieces)
+        self.widget.delete('1.0', 'end')
+        self.widget.insert('1.0', text)
+        self.line_index = LineIndex(text)
+        if self.on_window_change:
+            self.on_window_change()
@@ -0,0 +1,299 @@
+"""Render PDFs to chapter-split audio files without the GUI.
+
+    python export_audiobook.py book.pdf other.pdf -o audiobooks --engine gtts
+
+Each chunk is rendered to its own part file first, so an interrupted run
+picks up where it stopped; chapters are assembled from their parts at
+the end and the parts removed.
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+import wave
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from audio_cache import AudioCache, CachedSynthesizer, EmptyClipError, check_clip
+from disk_cache import atomic_write
+from extraction_cache import ExtractionCache, path_key
+from pdf_extraction import PageExtractor, default_worker_count
+from text_normalization import cache_normalized, iter_normalized, load_normalized
+from tts_backends import Pyttsx3Backend, backend_classes, create_backend
+from tts_pipeline import DEFAULT_CHUNK_CHARS, split_into_chunks
+
+DEFAULT_PAGES_PER_CHAPTER = 20
+DEFAULT_CACHE_DIR = "pdf_reader_cache"
+
+# Number words allowed after "Chapter", "Part" or "Book"; tens combine with units ("twenty-one")
+UNIT_WORDS = ("one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen"
+              "|sixteen|seventeen|eighteen|nineteen")
+TENS_WORDS = "twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety"
+ORDINAL_WORDS = ("first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|eleventh|twelfth"
+                 "|thirteenth|fourteenth|fifteenth|sixteenth|seventeenth|eighteenth|nineteenth|twentieth")
+# A page whose first line looks like this starts a new chapter. The number
+# must end the line or be followed by punctuation or a capitalized title, so
+# body text such as "Part of the reason" or "Book I read" doesn't match.
+CHAPTER_HEADING = re.compile(
+    r'^\s*(chapter|part|book)\s+'
+    r'(\d+'
+    r'|(?=[mdclxvi])m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})'
+    rf'|(?:{TENS_WORDS})(?:[- ]?(?:{UNIT_WORDS}))?|{UNIT_WORDS}|{ORDINAL_WORDS})'
+    r'(?=[ \t]*(?:$|\n|[.:,;\u2013\u2014-])|[ \t]+(?-i:[A-Z"\'\u201c]))',
+    re.IGNORECASE)
+
+RenderJob = namedtuple('RenderJob', ['chapter_key', 'text', 'part_path'])
+
+
+def iter_chapters(pages, pages_per_chapter=DEFAULT_PAGES_PER_CHAPTER):
+    """Group an iterable of page texts into chapter texts.
+
+    A page starting with a chapter heading begins a new chapter; without
+    headings, chapters are cut every pages_per_chapter pages. Only the
+    current chapter is held in memory.
+    """
+    current = []
+    for page_text in pages:
+        if not page_text.strip():
+            continue
+        if current and (CHAPTER_HEADING.match(page_text) or len(current) >= pages_per_chapter):
+            yield '\n\n'.join(current)
+            current = []
+        current.append(page_text.strip())
+    if current:
+        yield '\n\n'.join(current)
+
+
+_worker_engine = None
+
+
+def _init_pyttsx3_worker(rate):
+    """Give each worker process its own pyttsx3 engine"""
+    global _worker_engine
+    import pyttsx3
+    _worker_engine = pyttsx3.init()
+    _worker_engine.setProperty('rate', rate)
+
+
+def _render_pyttsx3(text, part_path):
+    """Render one chunk to part_path in a worker process"""
+    root, extension = os.path.splitext(part_path)
+    tmp_path = root + '.tmp' + extension
+    _worker_engine.save_to_file(text, tmp_path)
+    _worker_engine.runAndWait()
+    if not os.path.exists(tmp_path) or not os.path.getsize(tmp_path):
+        # A 0-byte part would count as rendered on the next run
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise EmptyClipError(f"No audio rendered for {text[:40]!r}")
+    os.replace(tmp_path, part_path)
+    return os.path.getsize(part_path)
+
+
+class AudiobookExporter:
+    """Extract, chunk and synthesize documents through a shared worker pool"""
+
+    def __init__(self, output_dir, engine="gtts", language="en", rate=150, workers=None,
+                 chunk_chars=DEFAULT_CHUNK_CHARS, pages_per_chapter=DEFAULT_PAGES_PER_CHAPTER,
+                 cache_dir=DEFAULT_CACHE_DIR, stream=False, synthesize=None):
+        self.output_dir = output_dir
+        self.engine = engine
+        self.language = language
+        self.rate = rate
+        self.workers = workers or default_worker_count()
+        self.chunk_chars = chunk_chars
+        self.pages_per_chapter = pages_per_chapter
+        self.stream = stream
+        self.extractor = PageExtractor()
+        self.extraction_cache = None if stream or not cache_dir else ExtractionCache(os.path.join(cache_dir, "pages"))
+
+        if engine == "pyttsx3":
+            # Rendered in worker processes, each with its own engine
+            self.extension = '.' + Pyttsx3Backend.capabilities.audio_format
+            self.render_workers = self.workers
+            self.synthesize = None
+        else:
+            backend = create_backend(engine, language=language, rate=rate)
+            self.extension = '.' + backend.capabilities.audio_format
+            self.render_workers = min(self.workers, backend.capabilities.max_concurrency)
+            synthesize = synthesize or backend
+            if cache_dir:
+                synthesize = CachedSynthesizer(synthesize, AudioCache(os.path.join(cache_dir, "audio")),
+                                               engine=engine, language=language, rate=backend.voice_key())
+            self.synthesize = synthesize
+
+        self.stats = {'documents': 0, 'pages': 0, 'chunks': 0, 'skipped': 0,
+                      'characters': 0, 'audio_bytes': 0, 'extract_seconds': 0.0}
+        self.chapters = OrderedDict()  # chapter_key -> (output path, [part paths])
+
+    def _create_pool(self):
+        if self.engine == "pyttsx3":
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_pyttsx3_worker,
+                                       initargs=(self.rate,))
+        # Clip backends are network bound, so threads are enough
+        return ThreadPoolExecutor(max_workers=self.render_workers)
+
+    def _render_clip(self, text, part_path):
+        clip = check_clip(self.synthesize(text), text)
+        atomic_write(part_path, clip)
+        return len(clip)
+
+    def iter_pages(self, pdf_path):
+        """Yield normalized page texts, going through the extraction cache unless streaming"""
+        started = time.perf_counter()
+        if self.extraction_cache is not None:
+            pages = load_normalized(self.extraction_cache, pdf_path)
+            if pages is None:
+                pages = list(iter_normalized(self.extractor.extract_pages(pdf_path)))
+                cache_normalized(self.extraction_cache, pdf_path, pages)
+            self.stats['extract_seconds'] += time.perf_counter() - started
+            self.stats['pages'] += len(pages)
+            for page in pages:
+                yield page.text
+            return
+
+        raw_pages = (page_text for _, page_text in self.extractor.iter_pages(pdf_path))
+        for page in iter_normalized(raw_pages):
+            self.stats['extract_seconds'] += time.perf_counter() - started
+            self.stats['pages'] += 1
+            yield page.text
+            started = time.perf_counter()
+
+    def iter_jobs(self, pdf_paths):
+        """Yield a RenderJob per chunk that still needs rendering, across all documents"""
+        for pdf_path in pdf_paths:
+            self.stats['documents'] += 1
+            # Named after the file but keyed on its full path, so two book.pdf files don't share parts
+            book = os.path.splitext(os.path.basename(pdf_path))[0]
+            book_dir = os.path.join(self.output_dir, f"{book}-{path_key(pdf_path)}")
+            parts_dir = os.path.join(book_dir, "parts")
+            os.makedirs(parts_dir, exist_ok=True)
+
+            for chapter_num, chapter_text in enumerate(iter_chapters(self.iter_pages(pdf_path), self.pages_per_chapter), 1):
+                chapter_key = (book_dir, chapter_num)
+                output_path = os.path.join(book_dir, f"chapter_{chapter_num:03d}{self.extension}")
+                parts = []
+                self.chapters[chapter_key] = (output_path, parts)
+                if os.path.exists(output_path):
+                    continue  # Already assembled on an earlier run
+
+                chunks = split_into_chunks(chapter_text, self.chunk_chars, first_max_chars=None)
+                for chunk_num, chunk in enumerate(chunks, 1):
+                    part_path = os.path.join(parts_dir, f"ch{chapter_num:03d}_{chunk_num:05d}{self.extension}")
+                    parts.append(part_path)
+                    if os.path.exists(part_path) and os.path.getsize(part_path):
+                        self.stats['skipped'] += 1
+                        continue
+                    yield RenderJob(chapter_key, chunk.text, part_path)
+
+    def run(self, pdf_paths, max_in_flight=None):
+        """Render every document, keeping at most max_in_flight chunks queued at once"""
+        max_in_flight = max_in_flight or self.workers * 4
+        started = time.perf_counter()
+        render = _render_pyttsx3 if self.engine == "pyttsx3" else self._render_clip
+
+        with self._create_pool() as pool:
+            in_flight = set()
+            for job in self.iter_jobs(pdf_paths):
+                # Bound queued work so memory stays flat however many books are queued
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+                in_flight.add(pool.submit(render, job.text, job.part_path))
+                self.stats['characters'] += len(job.text)
+            done, _ = wait(in_flight)
+            self._collect(done)
+
+        self.assemble_chapters()
+        self.stats['elapsed_seconds'] = time.perf_counter() - started
+        return self.stats
+
+    def _collect(self, futures):
+        for future in futures:
+            self.stats['audio_bytes'] += future.result()
+            self.stats['chunks'] += 1
+
+    def assemble_chapters(self):
+        """Join each chapter's parts into one file"""
+        for output_path, parts in self.chapters.values():
+            if os.path.exists(output_path) or not parts or not all(os.path.exists(p) for p in parts):
+                continue
+            tmp_path = output_path + '.tmp'
+            if self.extension == '.mp3':
+                # MP3 frames can simply be concatenated
+                with open(tmp_path, 'wb') as out:
+                    for part in parts:
+                        with open(part, 'rb') as src:
+                            shutil.copyfileobj(src, out)
+            elif self.extension == '.wav':
+                _merge_wav(parts, tmp_path)
+            else:
+                print(f"Leaving {len(parts)} parts unmerged for {output_path}")
+                continue
+            os.replace(tmp_path, output_path)
+            # The chapter file now marks it as done, so its parts are no longer needed
+            for part in parts:
+                os.remove(part)
+
+
+def _merge_wav(parts, output_path, frames_per_read=1 << 16):
+    """Concatenate WAV files with matching formats, streaming frames"""
+    with wave.open(output_path, 'wb') as out:
+        for i, part in enumerate(parts):
+            with wave.open(part, 'rb') as src:
+                if i == 0:
+                    out.setparams(src.getparams())
+                frames = src.readframes(frames_per_read)
+                while frames:
+                    out.writeframes(frames)
+                    frames = src.readframes(frames_per_read)
+
+
+def format_report(stats):
+    """Return a human-readable throughput summary"""
+    elapsed = max(stats['elapsed_seconds'], 1e-9)
+    extract = max(stats['extract_seconds'], 1e-9)
+    return "\n".join([
+        f"Documents: {stats['documents']}  Pages: {stats['pages']}  "
+        f"Chunks rendered: {stats['chunks']}  Chunks skipped: {stats['skipped']}",
+        f"Extraction: {stats['pages'] / extract:.1f} pages/s",
+        f"Synthesis: {stats['chunks'] / elapsed:.2f} chunks/s, {stats['characters'] / elapsed:.0f} chars/s, "
+        f"{stats['audio_bytes'] / 1024 / 1024:.1f} MiB audio",
+        f"Elapsed: {elapsed:.1f} s",
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert PDFs to chapter-split audiobooks")
+    parser.add_argument("pdfs", nargs="+", help="PDF files to convert")
+    parser.add_argument("-o", "--output-dir", default="audiobooks")
+    # Backends missing their settings (the HTTP backend without a URL) aren't offered
+    engines = [backend_class.name for backend_class in backend_classes() if backend_class.is_configured()]
+    parser.add_argument("--engine", choices=engines, default="gtts")
+    parser.add_argument("--lang", default="en", help="Voice language")
+    parser.add_argument("--rate", type=int, default=150, help="Speech rate (words per minute)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel synthesis workers")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    parser.add_argument("--pages-per-chapter", type=int, default=DEFAULT_PAGES_PER_CHAPTER,
+                        help="Chapter length when no chapter headings are found")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Shared with the GUI; empty to disable")
+    parser.add_argument("--stream", action="store_true",
+                        help="Process pages as they are extracted without holding whole documents in memory")
+    args = parser.parse_args(argv)
+
+    exporter = AudiobookExporter(
+        args.output_dir, engine=args.engine, language=args.lang, rate=args.rate, workers=args.workers,
+        chunk_chars=args.chunk_chars, pages_per_chapter=args.pages_per_chapter,
+        cache_dir=args.cache_dir, stream=args.stream
+    )
+    stats = exporter.run(args.pdfs)
+    print(format_report(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
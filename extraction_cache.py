@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import zlib
+
+from disk_cache import atomic_write, evict_lru, touch
+from perf import stats
+
+# Default cap on the total size of the cache directory
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Bytes read from each end of the file for the optional content hash
+FAST_HASH_BLOCK = 64 * 1024
+# Bumped when cached data changes meaning; 2: pages hold normalized text, 3: stricter header detection,
+# 4: hyphenated compounds keep their hyphen
+CACHE_FORMAT_VERSION = 4
+
+
+def fast_file_hash(path, block_size=FAST_HASH_BLOCK):
+    """Hash the first and last blocks of a file; catches in-place edits that keep size and mtime"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        digest.update(file.read(block_size))
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        if size > block_size:
+            file.seek(max(block_size, size - block_size))
+            digest.update(file.read(block_size))
+    return digest.hexdigest()
+
+
+def path_key(pdf_path):
+    """Hash a file's absolute path, naming everything derived from that file"""
+    abs_path = os.path.abspath(pdf_path)
+    return hashlib.blake2b(os.path.normcase(abs_path).encode('utf-8'), digest_size=10).hexdigest()
+
+
+class ExtractionCache:
+    """Compressed on-disk cache of per-page PDF text with LRU eviction.
+
+    Each document gets one entry per artifact kind, named
+    ``<path hash>-<version hash>.<kind>.z``. The path hash groups all
+    versions of the same file so a changed PDF replaces its old entry;
+    the version hash covers size, mtime and (optionally) a content hash.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, use_fast_hash=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.use_fast_hash = use_fast_hash
+        self.hits = 0
+        self.misses = 0
+
+    def document_key(self, pdf_path):
+        """Return (path_key, version_key) for the file as it is on disk now"""
+        abs_path = os.path.abspath(pdf_path)
+        stat = os.stat(abs_path)
+        version = f"{stat.st_size}|{stat.st_mtime_ns}"
+        if self.use_fast_hash:
+            version += '|' + fast_file_hash(abs_path)
+        version_key = hashlib.blake2b(version.encode('utf-8'), digest_size=10).hexdigest()
+        return path_key(abs_path), version_key
+
+    def _entry_path(self, path_key, version_key, kind):
+        return os.path.join(self.cache_dir, f"{path_key}-{version_key}.{kind}.z")
+
+    def get(self, pdf_path, kind='pages'):
+        """Return the cached data for the current version of the file, or None"""
+        try:
+            entry_path = self._entry_path(*self.document_key(pdf_path), kind)
+            with open(entry_path, 'rb') as f:
+                data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+            if data.get('version') != CACHE_FORMAT_VERSION:
+                raise ValueError("stale cache format")
+        except (OSError, ValueError, zlib.error):
+            self.misses += 1
+            stats.count(f'extraction_cache.{kind}.miss')
+            return None
+        # Touch the entry so eviction treats it as recently used
+        touch(entry_path)
+        self.hits += 1
+        stats.count(f'extraction_cache.{kind}.hit')
+        return data['data']
+
+    def contains(self, pdf_path, kind='pages'):
+        """Return True if there is an entry for the current version of the file, without reading it"""
+        try:
+            return os.path.exists(self._entry_path(*self.document_key(pdf_path), kind))
+        except OSError:
+            return False
+
+    def put(self, pdf_path, data, kind='pages'):
+        """Store data for the current version of the file and evict old entries"""
+        try:
+            path_key, version_key = self.document_key(pdf_path)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._drop_other_versions(path_key, version_key)
+
+            payload = json.dumps({'version': CACHE_FORMAT_VERSION, 'data': data}, ensure_ascii=False)
+            blob = zlib.compress(payload.encode('utf-8'), 6)
+
+            # Write atomically so a crash never leaves a truncated entry behind
+            atomic_write(self._entry_path(path_key, version_key, kind), blob)
+            self.evict()
+        except Exception as e:
+            print(f"Extraction cache write error: {e}")
+
+    def _drop_other_versions(self, path_key, version_key):
+        """Remove entries left behind by earlier versions of the same file"""
+        prefix = path_key + '-'
+        current = f"{path_key}-{version_key}."
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and not name.startswith(current):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        evict_lru(self.cache_dir, self.max_bytes, '.z')
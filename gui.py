@@ -1,16 +1,63 @@
-import PyPDF2
-import pyttsx3
+import time
+STARTUP_STARTED = time.perf_counter()  # Taken before the remaining imports
+
 import tkinter as tk
-from tkinter import filedialog, messagebox, Text, ttk, Menu
-import threading
+from tkinter import filedialog, messagebox, simpledialog, Text, ttk, Menu
+import bisect
+from array import array
 import json
 import os
+import queue
 from pathlib import Path
 import re
-from gtts import gTTS
-import pygame
-import tempfile
-import requests
+import sys
+import multiprocessing
+import threading
+from collections import Counter, namedtuple
+from contextlib import closing, contextmanager
+
+from pdf_extraction import PageExtractor
+from lazy_document import LazyDocument
+from library import STATUS_MISSING, Library, LibraryIndexer, search_library
+from extraction_cache import ExtractionCache
+from audio_cache import AudioCache, CachedSynthesizer
+from search_index import SEARCH_MODES, SearchIndex
+from document_view import DocumentView, page_piece
+from narration_cursor import NarrationCursor
+from perf import run_profiled, stats
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, Scheduler
+from session_store import SessionStore
+from text_normalization import (cache_normalized, extend_sentence_ends, iter_normalized, load_normalized,
+                                normalize_page_at)
+from tts_backends import backend_classes, create_backend, get_backend_class
+from tts_pipeline import (DEFAULT_CHUNK_CHARS, DEFAULT_FIRST_CHUNK_CHARS, DEFAULT_PREFETCH,
+                          NarrationPipeline, PygameClipPlayer, Pyttsx3Narrator, split_into_chunks)
+
+# Seconds between batches of streamed pages pushed to the text widget
+PAGE_BATCH_INTERVAL = 0.25
+# Pages read on demand while opening, before the parallel extractor takes over
+LAZY_LEAD_PAGES = 50
+# Above this many matches only those near the viewport are highlighted
+LAZY_HIGHLIGHT_THRESHOLD = 2000
+# Lines above and below the viewport highlighted in lazy mode
+HIGHLIGHT_MARGIN_LINES = 200
+# Ranges passed to a single tag_add call
+TAG_BATCH_SIZE = 1000
+# Warn when the window takes longer than this to become interactive
+STARTUP_BUDGET_SECONDS = 1.0
+# Milliseconds between refreshes of the performance stats panel
+STATS_REFRESH_MS = 500
+# Documents listed under File > Recent Files
+RECENT_FILES_LIMIT = 10
+# Milliseconds between checks of the queue of callbacks from worker threads
+UI_QUEUE_POLL_MS = 15
+# Longest the Tk thread spends on queued callbacks before letting events through
+UI_QUEUE_BUDGET_SECONDS = 0.05
+# Milliseconds typing has to pause for before the Find box searches
+SEARCH_DEBOUNCE_MS = 200
+
+# Voice settings read on the Tk thread and handed to narration jobs
+VoiceSettings = namedtuple('VoiceSettings', ['method', 'language', 'rate'])
 
 class PDFReaderApp:
     def __init__(self, root):
@@ -22,38 +69,90 @@ class PDFReaderApp:
         # Initialize variables
         self.extracted_text = ""
         self.current_pdf_path = ""
+        self.streamed_pieces = []  # Text shown so far while a PDF is still loading
+        self.lazy_document = None  # Serves pages on demand until loading finishes
+        self.load_generation = 0  # Bumped per load so stale batches are dropped
+        self.pending_search = None  # (query, mode) to run once the document being opened has loaded
+        self.session_path = None  # Library path whose session state is being tracked, once loaded
         self.tts_engine = None
-        self.is_reading = False
-        self.search_results = []
+        self.is_reading = False  # Only changed on the Tk thread
+        self.narration_job = None  # Scheduler job of the current narration
+        self.search_results = []  # (start, end) offsets into extracted_text
+        self.search_result_indices = []  # Tk indices of the results in the resident pages
+        self.search_window_first = 0  # Index into search_results of search_result_indices[0]
         self.current_search_index = 0
+        self.search_job = None  # Scheduler job of the latest search
+        self.search_request = None  # (query, mode) of the latest search started
+        self.search_shown = None  # Token of the search whose results are on screen
+        self.last_search = None  # (query, mode, matches) of the last completed search, to refine from
+        self.search_debounce_id = None
+        self.search_index = None
+        self.sentence_ends = None  # Document offsets where sentences start, from the normalization stage
+        self.highlight_window = None  # (first, last) results highlighted in lazy mode
+        self.highlight_refresh_pending = False
         self.tts_method = tk.StringVar(value="pyttsx3")  # Default to offline TTS
-        self.temp_audio_files = []  # Track temporary audio files
-        
-        # Initialize internet_available BEFORE setup_ui()
-        self.internet_available = False
+        self.extraction_workers = None  # None = all cores but one
+        self.page_extractor = PageExtractor(workers=self.extraction_workers)
         
-        # Check internet connectivity first
-        self.check_internet_connection()
+        # Narration tuning: smaller first chunk = faster first audio
+        self.narration_chunk_chars = DEFAULT_CHUNK_CHARS
+        self.narration_first_chunk_chars = DEFAULT_FIRST_CHUNK_CHARS
+        self.clip_prefetch = DEFAULT_PREFETCH
+        self.cache_audio = True  # Keep synthesized clips on disk; playback itself never touches the disk
+        self.tts_backends = {}  # Backend instances by name, kept so their connection pools are reused
+        self.tts_backend_users = Counter()  # Jobs using each backend; replaced ones are closed when unused
+        self.tts_backends_lock = threading.Lock()
+        self.narration = None  # Active NarrationPipeline or Pyttsx3Narrator, if any
+        self.narration_text = ""  # Text being narrated and offset of the current chunk
+        self.narration_offset = 0
+        self.paused_narration = None  # (text, offset, base_offset) to resume from
+        self.narration_base_offset = None  # Document offset of narration_text, if it is part of the document
+        self.narration_path = None  # Library path of the document being narrated; its session gets the position
         
-        # Initialize pygame for audio playback
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            print(f"Pygame mixer initialization error: {e}")
+        # Initialize internet_available BEFORE setup_ui(); probed in the background once the window is up
+        self.internet_available = False
+        self.startup_seconds = None
+        self.stats_window = None  # Debug > Performance Stats panel
+        self.profile_request = None  # "load" or "narration" to profile the next run
         
         # Settings file
         self.settings_file = "pdf_reader_settings.json"
-        self.recent_files = self.load_recent_files()
         
-        # Initialize TTS engine in a separate thread
-        threading.Thread(target=self.init_tts_engine, daemon=True).start()
+        # Worker threads own all blocking work; results come back through ui_queue
+        self.scheduler = Scheduler()
+        self.ui_queue = queue.SimpleQueue()
+        
+        # Extracted page text is cached next to the settings file
+        self.cache_dir = os.path.join(os.path.dirname(os.path.abspath(self.settings_file)), "pdf_reader_cache")
+        self.extraction_cache = ExtractionCache(os.path.join(self.cache_dir, "pages"))
+        self.audio_cache = AudioCache(os.path.join(self.cache_dir, "audio"))
+        
+        # Catalog of opened and added documents, indexed in the background while idle
+        self.library = Library(os.path.join(self.cache_dir, "library.sqlite3"))
+        if not len(self.library):
+            self.import_recent_files()
+        self.library_indexer = LibraryIndexer(
+            self.library, self.extraction_cache,
+            is_idle=self.scheduler.is_idle,
+            on_change=lambda: self.post_to_ui(self.update_recent_menu)
+        )
+        self.session_store = SessionStore(self.library)
+        
+        # Initialize TTS engine in the background
+        self.scheduler.submit(lambda token: self.init_tts_engine(), priority=PRIORITY_BACKGROUND, name="init-tts")
         
         self.setup_ui()
         self.setup_menu()
+        self.root.after(UI_QUEUE_POLL_MS, self._drain_ui_queue)
+        
+        # Probe connectivity without holding up the first paint
+        self.refresh_internet_status()
+        self.library_indexer.start()
         
     def init_tts_engine(self):
         """Initialize TTS engine in background"""
         try:
+            import pyttsx3
             self.tts_engine = pyttsx3.init()
             self.tts_engine.setProperty('rate', 150)
             self.tts_engine.setProperty('volume', 1.0)
@@ -61,15 +160,14 @@ class PDFReaderApp:
             print(f"pyttsx3 initialization error: {e}")
     
     # Check internet connectivity for gTTS
-        
-
-    def check_internet_connection(self):
-        """Check if internet is available for gTTS"""
+    def _probe_internet(self):
+        """Return True if the gTTS service host is reachable"""
         try:
+            import requests
             requests.get("https://www.google.com", timeout=3)
-            self.internet_available = True
+            return True
         except:
-            self.internet_available = False
+            return False
     
     def setup_menu(self):
         """Create menu bar"""
@@ -80,6 +178,8 @@ class PDFReaderApp:
         file_menu = Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Open PDF", command=self.load_pdf, accelerator="Ctrl+O")
+        file_menu.add_command(label="Add Folder to Library...", command=self.add_folder_to_library)
+        file_menu.add_command(label="Search Library...", command=self.search_library, accelerator="Ctrl+Shift+F")
         file_menu.add_separator()
         
         # Recent files submenu
@@ -95,18 +195,35 @@ class PDFReaderApp:
         menubar.add_cascade(label="Edit", menu=edit_menu)
         edit_menu.add_command(label="Find", command=self.focus_search, accelerator="Ctrl+F")
         edit_menu.add_command(label="Find Next", command=self.find_next, accelerator="F3")
+        edit_menu.add_command(label="Go to Page...", command=self.go_to_page, accelerator="Ctrl+G")
         
         # Speech menu
         speech_menu = Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Speech", menu=speech_menu)
         speech_menu.add_command(label="Read All", command=self.read_pdf_aloud)
         speech_menu.add_command(label="Read Selection", command=self.read_selection)
+        speech_menu.add_command(label="Pause/Resume", command=self.toggle_pause)
         speech_menu.add_command(label="Stop Reading", command=self.stop_reading)
         
+        # Debug menu
+        debug_menu = Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Debug", menu=debug_menu)
+        debug_menu.add_command(label="Performance Stats", command=self.toggle_stats_panel, accelerator="Ctrl+Shift+D")
+        debug_menu.add_command(label="Reset Stats", command=stats.reset)
+        debug_menu.add_separator()
+        self.trace_var = tk.BooleanVar(value=False)
+        debug_menu.add_checkbutton(label="Write Trace File...", variable=self.trace_var, command=self.toggle_trace)
+        debug_menu.add_separator()
+        debug_menu.add_command(label="Profile Next Load", command=lambda: self.request_profile("load"))
+        debug_menu.add_command(label="Profile Next Narration", command=lambda: self.request_profile("narration"))
+        
         # Bind keyboard shortcuts
         self.root.bind('<Control-o>', lambda e: self.load_pdf())
         self.root.bind('<Control-f>', lambda e: self.focus_search())
         self.root.bind('<F3>', lambda e: self.find_next())
+        self.root.bind('<Control-g>', lambda e: self.go_to_page())
+        self.root.bind('<Control-Shift-F>', lambda e: self.search_library())
+        self.root.bind('<Control-Shift-D>', lambda e: self.toggle_stats_panel())
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -142,16 +259,22 @@ class PDFReaderApp:
         ttk.Label(search_frame, text="Find:").grid(row=0, column=0, padx=(0, 5))
         
         self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', self._on_search_changed)
         self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         self.search_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 5))
         self.search_entry.bind('<Return>', lambda e: self.search_text())
         
         ttk.Button(search_frame, text="Search", command=self.search_text).grid(row=0, column=2, padx=(0, 5))
         ttk.Button(search_frame, text="Next", command=self.find_next).grid(row=0, column=3, padx=(0, 5))
-        ttk.Button(search_frame, text="Clear", command=self.clear_search).grid(row=0, column=4)
+        ttk.Button(search_frame, text="Clear", command=self.clear_search).grid(row=0, column=4, padx=(0, 5))
+        
+        self.search_mode_var = tk.StringVar(value=SEARCH_MODES[0])
+        self.search_mode_var.trace_add('write', self._on_search_changed)
+        ttk.Combobox(search_frame, textvariable=self.search_mode_var, values=SEARCH_MODES,
+                     width=7, state="readonly").grid(row=0, column=5)
         
         self.search_info = ttk.Label(search_frame, text="", foreground="blue")
-        self.search_info.grid(row=1, column=0, columnspan=5, sticky=tk.W, pady=(5, 0))
+        self.search_info.grid(row=1, column=0, columnspan=6, sticky=tk.W, pady=(5, 0))
         
         # Speech controls frame
         speech_frame = ttk.LabelFrame(main_frame, text="Speech Controls", padding="5")
@@ -160,16 +283,18 @@ class PDFReaderApp:
         ttk.Button(speech_frame, text="Read All", command=self.read_pdf_aloud).grid(row=0, column=0, padx=(0, 5))
         ttk.Button(speech_frame, text="Read Selection", command=self.read_selection).grid(row=0, column=1, padx=(0, 5))
         ttk.Button(speech_frame, text="Stop", command=self.stop_reading).grid(row=0, column=2, padx=(0, 5))
+        self.pause_button = ttk.Button(speech_frame, text="Pause", command=self.toggle_pause)
+        self.pause_button.grid(row=0, column=3, padx=(0, 5))
         
         # Speech settings
-        ttk.Label(speech_frame, text="Speed:").grid(row=0, column=3, padx=(20, 5))
+        ttk.Label(speech_frame, text="Speed:").grid(row=0, column=4, padx=(20, 5))
         self.speed_var = tk.IntVar(value=150)
         speed_scale = ttk.Scale(speech_frame, from_=50, to=300, variable=self.speed_var, 
                               orient=tk.HORIZONTAL, length=100, command=self.update_speech_rate)
-        speed_scale.grid(row=0, column=4, padx=(0, 10))
+        speed_scale.grid(row=0, column=5, padx=(0, 10))
         
         self.speed_label = ttk.Label(speech_frame, text="150")
-        self.speed_label.grid(row=0, column=5)
+        self.speed_label.grid(row=0, column=6)
         
         # TTS Method selection
         ttk.Label(speech_frame, text="Voice:").grid(row=1, column=0, padx=(0, 5), sticky=tk.W)
@@ -177,22 +302,24 @@ class PDFReaderApp:
         tts_frame = ttk.Frame(speech_frame)
         tts_frame.grid(row=1, column=1, columnspan=2, sticky=tk.W, pady=(5, 0))
 
-        ttk.Radiobutton(tts_frame, text="Offline (pyttsx3)", variable=self.tts_method, 
-                        value="pyttsx3").grid(row=0, column=0, padx=(0, 10))
-
-        internet_text = "Online (gTTS)" if self.internet_available else "Online (gTTS) - No Internet"
-        internet_state = tk.NORMAL if self.internet_available else tk.DISABLED
-
-        ttk.Radiobutton(tts_frame, text=internet_text, variable=self.tts_method, 
-                        value="gtts", state=internet_state).grid(row=0, column=1)
+        # One button per configured backend; network ones stay disabled until the connectivity probe reports back
+        self.network_backend_radios = {}
+        configured = [backend_class for backend_class in backend_classes() if backend_class.is_configured()]
+        for column, backend_class in enumerate(configured):
+            radio = ttk.Radiobutton(tts_frame, text=backend_class.label, variable=self.tts_method,
+                                    value=backend_class.name)
+            radio.grid(row=0, column=column, padx=(0, 10))
+            if backend_class.capabilities.needs_network:
+                radio.config(text=f"{backend_class.label} - Checking...", state=tk.DISABLED)
+                self.network_backend_radios[backend_class.name] = (radio, backend_class.label)
 
         # Language selection for gTTS
-        ttk.Label(speech_frame, text="Language:").grid(row=1, column=3, padx=(20, 5), sticky=tk.W)
+        ttk.Label(speech_frame, text="Language:").grid(row=1, column=4, padx=(20, 5), sticky=tk.W)
         self.language_var = tk.StringVar(value="en")
         language_combo = ttk.Combobox(speech_frame, textvariable=self.language_var, 
                                      values=["en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko", "zh"], 
                                      width=5, state="readonly")
-        language_combo.grid(row=1, column=4, padx=(0, 10))
+        language_combo.grid(row=1, column=5, padx=(0, 10))
         
         # Text display frame
         text_frame = ttk.LabelFrame(main_frame, text="Document Content", padding="5")
@@ -208,7 +335,12 @@ class PDFReaderApp:
         
         self.display_text = Text(text_container, wrap=tk.WORD, font=('Arial', 11))
         scrollbar = ttk.Scrollbar(text_container, orient=tk.VERTICAL, command=self.display_text.yview)
-        self.display_text.configure(yscrollcommand=scrollbar.set)
+        self.text_scrollbar = scrollbar
+        self.display_text.configure(yscrollcommand=self._on_text_scroll)
+        
+        # Only a window of pages around the viewport is kept in the widget
+        self.document_view = DocumentView(self.display_text)
+        self.document_view.on_window_change = self._on_view_window_change
         
         self.display_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
@@ -216,33 +348,81 @@ class PDFReaderApp:
         # Configure text tags
         self.display_text.tag_configure('highlight', background='yellow', foreground='black')
         self.display_text.tag_configure('current_highlight', background='orange', foreground='black')
+        self.display_text.tag_configure('narration_sentence', background='#e3ecfa')
+        self.display_text.tag_configure('narration_word', background='#9cc3f5', foreground='black')
+        
+        # Follows the spoken word/sentence while narrating
+        self.narration_cursor = NarrationCursor(self.document_view)
         
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN)
         status_bar.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
     
-    def extract_text_from_pdf(self, pdf_path):
-        """Extract text from PDF with better error handling"""
+    def iter_document_pieces(self, pdf_path, on_open=None, token=None):
+        """Yield (page_num, piece, page) one page at a time, separators included (blank pages are empty)"""
         try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ''
-                total_pages = len(reader.pages)
-                
-                for page_num in range(total_pages):
-                    page = reader.pages[page_num]
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + '\n\n'
-                    
-                    # Update progress (this would be called from a thread)
-                    progress = (page_num + 1) / total_pages * 100
-                    self.root.after(0, lambda p=progress: self.update_progress(p))
-                
-                return text.strip()
+            for page_num, page in enumerate(self.iter_page_texts(pdf_path, on_open, token)):
+                yield page_num, page_piece(page_num, page.text), page
+        except OSError:
+            raise  # Callers tell a vanished file apart from a broken one
         except Exception as e:
-            raise Exception(f"Error reading PDF: {str(e)}")
+            raise Exception(f"Error reading PDF: {str(e)}") from e
+    
+    def iter_page_texts(self, pdf_path, on_open=None, token=None):
+        """Yield NormalizedPages from the extraction cache, extracting, normalizing and caching on a miss.
+        
+        on_open(page_count, document) is called before the first page. On a miss
+        document is the LazyDocument serving pages on demand, and closing it
+        becomes the callback's job; on a hit it is None. Cancelling token stops
+        the extraction workers right away.
+        """
+        cached_pages = load_normalized(self.extraction_cache, pdf_path)
+        if cached_pages is not None:
+            if on_open:
+                on_open(len(cached_pages), None)
+            self._report_page_progress(len(cached_pages), len(cached_pages))
+            yield from cached_pages
+            return
+        
+        # Opening only reads the page count, so the first pages show up at once
+        document = LazyDocument(pdf_path)
+        
+        def iter_raw_pages():
+            extracted = 0
+            for _, page_text in document.iter_pages(stop=LAZY_LEAD_PAGES):
+                extracted += 1
+                self._report_page_progress(extracted, document.page_count)
+                yield page_text
+            
+            # The parallel extractor is faster for the bulk of a long document
+            if extracted < document.page_count:
+                for _, page_text in self.page_extractor.iter_pages(
+                        pdf_path, progress_callback=self._report_page_progress, start_page=extracted, token=token):
+                    yield page_text
+        
+        try:
+            if on_open:
+                on_open(document.page_count, document)
+            pages = []
+            for page in iter_normalized(iter_raw_pages()):
+                pages.append(page)
+                yield page
+        finally:
+            if on_open is None:
+                document.close()
+        
+        # Only reached when every page was extracted
+        cache_normalized(self.extraction_cache, pdf_path, pages)
+    
+    def extract_text_from_pdf(self, pdf_path):
+        """Extract text from PDF with better error handling"""
+        return ''.join(piece for _, piece, _ in self.iter_document_pieces(pdf_path)).rstrip()
+    
+    def _report_page_progress(self, done_pages, total_pages):
+        """Forward extraction progress to the UI thread"""
+        progress = done_pages / total_pages * 100 if total_pages else 100  # A document with no pages is done
+        self.post_to_ui(lambda p=progress: self.update_progress(p))
     
     def update_progress(self, value):
         """Update progress bar"""
@@ -250,6 +430,10 @@ class PDFReaderApp:
             self.progress.stop()
             self.progress.grid_remove()
         else:
+            # Switch from the spinner to real progress once pages are counted
+            if str(self.progress['mode']) == 'indeterminate':
+                self.progress.stop()
+                self.progress.config(mode='determinate')
             self.progress['value'] = value
     
     def load_pdf(self):
@@ -260,32 +444,179 @@ class PDFReaderApp:
         )
         
         if pdf_path:
-            self.progress.grid()
-            self.progress.start()
-            self.status_var.set("Loading PDF...")
-            
-            # Load PDF in separate thread
-            threading.Thread(target=self._load_pdf_thread, args=(pdf_path,), daemon=True).start()
+            self._start_loading(pdf_path)
+    
+    def _start_loading(self, pdf_path, restoring=False):
+        """Show progress and load PDF on the scheduler, replacing any load in progress.
+        
+        restoring is set when reopening the last document at startup; a
+        failure then only shows in the status bar instead of a dialog.
+        """
+        self.load_generation += 1
+        self.progress.config(mode='indeterminate', value=0)
+        self.progress.grid()
+        self.progress.start()
+        self.status_var.set("Loading PDF...")
+        
+        generation = self.load_generation
+        load = self._maybe_profiled("load", lambda token: self._load_pdf_thread(pdf_path, generation, token, restoring))
+        self.scheduler.submit(load, priority=PRIORITY_INTERACTIVE, lane="load", name="load-pdf")
     
-    def _load_pdf_thread(self, pdf_path):
-        """Load PDF in background thread"""
+    def _load_pdf_thread(self, pdf_path, generation, token, restoring=False):
+        """Load PDF on a worker thread, streaming pages to the UI in batches"""
         try:
-            text = self.extract_text_from_pdf(pdf_path)
+            # Reuse a cached index, or build one as pages stream in
+            cached_index = self.extraction_cache.get(pdf_path, kind='index')
+            index = SearchIndex() if cached_index is None else None
+            
+            def on_open(page_count, document):
+                self.post_to_ui(lambda: self._document_opened(generation, pdf_path, page_count, document))
+            
+            pieces = []
+            batch = []
+            last_flush = 0.0
+            length = 0
+            page_starts = []
+            sentence_ends = array('L')
+            # Closed on the way out, so an abandoned load releases its document and workers now
+            with closing(self.iter_document_pieces(pdf_path, on_open, token)) as document_pieces:
+                for page_num, piece, page in document_pieces:
+                    if token.cancelled:
+                        return  # A newer load superseded this one
+                    pieces.append(piece)
+                    batch.append(piece)
+                    page_starts.append(length)
+                    extend_sentence_ends(sentence_ends, length, piece, page)
+                    length += len(piece)
+                    if index is not None:
+                        index.add_text(piece, page_num)
+                    
+                    # Show the first page right away, then batch to keep the Tk thread free
+                    now = time.monotonic()
+                    if len(pieces) == 1 or now - last_flush >= PAGE_BATCH_INTERVAL:
+                        self.post_to_ui(lambda b=batch: self._append_pages(generation, b))
+                        batch = []
+                        last_flush = now
+            
+            if batch:
+                self.post_to_ui(lambda b=batch: self._append_pages(generation, b))
+            
+            text = ''.join(pieces).rstrip()
+            if index is None:
+                try:
+                    index = SearchIndex.from_dict(cached_index, text)
+                except (KeyError, ValueError):
+                    index = SearchIndex.build(text, page_starts)
+            else:
+                self.extraction_cache.put(pdf_path, index.to_dict(), kind='index')
+            self._mark_indexed(pdf_path, len(pieces))
             
             # Update UI in main thread
-            self.root.after(0, lambda: self._pdf_loaded_callback(pdf_path, text))
+            self.post_to_ui(lambda: self._pdf_loaded_callback(pdf_path, text, generation, index, sentence_ends))
             
         except Exception as e:
-            self.root.after(0, lambda: self._pdf_error_callback(str(e)))
+            if token.cancelled:
+                return  # A newer load closed this one's document
+            if isinstance(e, FileNotFoundError):
+                self.library.set_status(os.path.abspath(pdf_path), STATUS_MISSING)
+                error_msg = f"File not found: {pdf_path}"
+            elif isinstance(e, OSError):
+                error_msg = f"Error reading PDF: {str(e)}"
+            else:
+                error_msg = str(e)
+            self.post_to_ui(lambda: self._pdf_error_callback(error_msg, show_dialog=not restoring))
+    
+    def _document_opened(self, generation, pdf_path, page_count, document):
+        """Reset the view for a new document whose page count is known"""
+        if generation != self.load_generation:
+            if document is not None:
+                document.close()
+            return
+        
+        # Narration belongs to the document being closed
+        self._save_narration_position()
+        self.stop_reading()
+        self._reset_narration_position()
+        self.session_path = None
+        self.clear_search()
+        self.extracted_text = ""
+        self.search_index = None
+        self.sentence_ends = None
+        self.streamed_pieces = []
+        self.current_pdf_path = pdf_path
+        self._close_lazy_document()
+        self.document_view.clear()
+        if document is not None:
+            # Pages the user scrolls to ahead of the loader are extracted on demand
+            self.lazy_document = document
+            self.document_view.set_page_source(
+                page_count, lambda page_nums: self._request_pages(generation, document, page_count, page_nums))
+        
+        filename = os.path.basename(pdf_path)
+        self.file_label.config(text=f"Loading: {filename}")
+        self.status_var.set(f"Loading {page_count} pages from {filename}...")
+    
+    def _request_pages(self, generation, document, page_count, page_nums):
+        """Extract pages the view is waiting for on a worker; a newer request replaces this one"""
+        self.scheduler.submit(
+            lambda token: self._extract_pages_thread(generation, document, page_count, page_nums, token),
+            priority=PRIORITY_INTERACTIVE, lane="pages", name="extract-pages")
+    
+    def _extract_pages_thread(self, generation, document, page_count, page_nums, token):
+        for page_num in page_nums:
+            if token.cancelled:
+                return
+            try:
+                # Normalized exactly as the loader will normalize them
+                text = normalize_page_at(page_num, page_count, document.get_page).text
+            except ValueError:
+                return  # Closed; the loader has finished or another document was opened
+            piece = page_piece(page_num, text)
+            self.post_to_ui(lambda page_num=page_num, piece=piece: self._page_extracted(generation, page_num, piece))
     
-    def _pdf_loaded_callback(self, pdf_path, text):
+    def _page_extracted(self, generation, page_num, piece):
+        if generation == self.load_generation:
+            self.document_view.receive_page(page_num, piece)
+    
+    def _close_lazy_document(self):
+        """Stop serving pages on demand once every page is in the view"""
+        if self.lazy_document is not None:
+            self.scheduler.cancel_lane("pages")
+            self.document_view.set_page_source(0, None)
+            self.lazy_document.close()
+            self.lazy_document = None
+    
+    def _append_pages(self, generation, pieces):
+        """Append a batch of streamed pages to the text widget"""
+        if generation != self.load_generation:
+            return
+        
+        self.streamed_pieces.extend(pieces)
+        self.document_view.append_pieces(pieces)
+    
+    def get_document_text(self):
+        """Return the full text, or the pages streamed so far while still loading"""
+        if self.extracted_text:
+            return self.extracted_text
+        return ''.join(self.streamed_pieces)
+    
+    def _pdf_loaded_callback(self, pdf_path, text, generation, index, sentence_ends):
         """Callback when PDF is successfully loaded"""
+        if generation != self.load_generation:
+            return
+        
+        # Pages are already in the widget; just swap in the assembled text
+        self._close_lazy_document()
         self.extracted_text = text
+        self.search_index = index
+        self.sentence_ends = sentence_ends
+        self.streamed_pieces = []
         self.current_pdf_path = pdf_path
-        
-        # Update UI
-        self.display_text.delete(1.0, tk.END)
-        self.display_text.insert(tk.END, text)
+        if text:
+            self.document_view.adopt_text(text)
+        else:
+            self.clear_search()
+            self.document_view.clear()
         
         filename = os.path.basename(pdf_path)
         self.file_label.config(text=f"Loaded: {filename}")
@@ -296,74 +627,268 @@ class PDFReaderApp:
         self.progress.stop()
         self.progress.grid_remove()
         self.status_var.set(f"Loaded {len(text)} characters from {filename}")
+        
+        self._restore_session(os.path.abspath(pdf_path))
+    
+    def _restore_session(self, path):
+        """Put back the search, scroll position, voice and narration position saved for a document"""
+        state = self.session_store.load(path)
+        
+        offered = {backend_class.name for backend_class in backend_classes() if backend_class.is_configured()}
+        if state.get('tts_method') in offered:
+            self.tts_method.set(state['tts_method'])
+        if 'speed' in state:
+            self.speed_var.set(state['speed'])
+            self.speed_label.config(text=str(state['speed']))
+        if 'language' in state:
+            self.language_var.set(state['language'])
+        
+        # A search from the library window wins over the one saved with the document, and shows its first match
+        from_library = self.pending_search is not None
+        query, mode = self.pending_search or (state.get('search_query'), state.get('search_mode', SEARCH_MODES[0]))
+        self.pending_search = None
+        if query and self.search_index is not None:
+            self.search_var.set(query)
+            self.search_mode_var.set(mode)
+            self.search_text(show_first=from_library)
+        if not from_library and state.get('scroll_offset'):
+            index = self.document_view.show_offset(min(state['scroll_offset'], len(self.extracted_text)))
+            self.display_text.yview(index)  # Back at the top of the viewport, where it was
+        
+        narration_offset = state.get('narration_offset', 0)
+        if 0 < narration_offset < len(self.extracted_text):
+            # Pause/Resume picks up where narration stopped last time
+            self.paused_narration = (self.extracted_text, narration_offset, 0)
+            self.narration_text = self.extracted_text
+            self.narration_offset = narration_offset
+            self.narration_base_offset = 0
+            self.narration_path = path
+            self.pause_button.config(text="Resume")
+            page = self.search_index.page_for_offset(narration_offset)
+            self.status_var.set(f"{self.status_var.get()} - Resume to continue reading at page {page + 1}")
+            self._prefetch_narration(self.extracted_text, narration_offset, self.sentence_ends)
+        
+        # Track changes only from here, so restoring doesn't overwrite what was saved
+        self.session_path = path
     
-    def _pdf_error_callback(self, error_msg):
+    def _save_session(self, **fields):
+        """Queue a change to the current document's session state; safe from any thread"""
+        path = self.session_path
+        if path is not None:
+            self.session_store.update(path, **fields)
+    
+    def _save_narration_position(self):
+        """Record the document offset narration has reached, if it is reading a document"""
+        if self.narration_path is not None and (self.is_reading or self.paused_narration):
+            self.session_store.update(self.narration_path,
+                                      narration_offset=self.narration_base_offset + self.narration_offset)
+    
+    def _reset_narration_position(self):
+        self.narration_text = ""
+        self.narration_offset = 0
+        self.narration_base_offset = None
+        self.narration_path = None
+    
+    def _pdf_error_callback(self, error_msg, show_dialog=True):
         """Callback when PDF loading fails"""
+        self._close_lazy_document()
+        self.pending_search = None
+        self.update_recent_menu()
         self.progress.stop()
         self.progress.grid_remove()
-        self.status_var.set("Error loading PDF")
-        messagebox.showerror("Error", error_msg)
+        if show_dialog:
+            self.status_var.set("Error loading PDF")
+            messagebox.showerror("Error", error_msg)
+        else:
+            self.status_var.set(f"Could not reopen the last document. {error_msg}")
+    
+    def _on_search_changed(self, *args):
+        """Search as the user types, once typing pauses for SEARCH_DEBOUNCE_MS"""
+        # Whatever is still running is for a query the user has moved on from
+        self.scheduler.cancel_lane("search")
+        self.search_request = None
+        self._cancel_search_debounce()
+        self.search_debounce_id = self.root.after(SEARCH_DEBOUNCE_MS, self._run_debounced_search)
+    
+    def _cancel_search_debounce(self):
+        if self.search_debounce_id is not None:
+            self.root.after_cancel(self.search_debounce_id)
+            self.search_debounce_id = None
     
-    def search_text(self):
-        """Enhanced search with multiple results"""
+    def _run_debounced_search(self):
+        self.search_debounce_id = None
+        if (self.search_var.get().strip(), self.search_mode_var.get()) != self.search_request:
+            self.search_text()
+    
+    def search_text(self, show_first=True):
+        """Search the document on a background worker; matches are highlighted as they arrive.
+        
+        The previous results stay up until the first batch of new ones
+        replaces them. When the query extends the last one, only its
+        matches are re-checked.
+        """
+        self._cancel_search_debounce()
         query = self.search_var.get().strip()
-        if not query or not self.extracted_text:
+        mode = self.search_mode_var.get()
+        self.search_request = (query, mode)
+        self.scheduler.cancel_lane("search")
+        if not query or not self.search_index:
+            self.search_job = None
+            self._clear_search_results()
             return
         
-        # Clear previous highlights
-        self.display_text.tag_remove('highlight', '1.0', tk.END)
-        self.display_text.tag_remove('current_highlight', '1.0', tk.END)
-        
-        # Find all occurrences (case-insensitive)
-        self.search_results = []
-        text_lower = self.extracted_text.lower()
-        query_lower = query.lower()
-        
-        start = 0
-        while True:
-            pos = text_lower.find(query_lower, start)
-            if pos == -1:
-                break
-            self.search_results.append(pos)
-            start = pos + 1
-        
-        if self.search_results:
-            self.current_search_index = 0
-            self.highlight_search_results(query)
+        index = self.search_index
+        previous = self.last_search
+        self.search_job = self.scheduler.submit(
+            lambda token: self._search_thread(index, query, mode, previous, show_first, token),
+            priority=PRIORITY_INTERACTIVE, lane="search", name="search")
+    
+    def _search_thread(self, index, query, mode, previous, show_first, token):
+        """Find matches off the Tk thread and hand them over a batch at a time"""
+        matches = []
+        try:
+            with stats.timer('search.query'):
+                for batch in index.iter_find(query, mode, previous, is_cancelled=lambda: token.cancelled):
+                    if token.cancelled:
+                        return  # The user has typed on
+                    matches.extend(batch)
+                    self.post_to_ui(lambda batch=batch: self._on_search_batch(token, batch, show_first))
+        except re.error as e:
+            message = str(e)
+            self.post_to_ui(lambda: self._on_search_error(token, message))
+            return
+        if token.cancelled:
+            return  # The search stopped early; its matches are incomplete
+        self.post_to_ui(lambda: self._on_search_done(token, query, mode, matches))
+    
+    def _is_current_search(self, token):
+        return self.search_job is not None and self.search_job.token is token and not token.cancelled
+    
+    def _on_search_batch(self, token, batch, show_first):
+        """Add a batch of matches to the ones shown, replacing the last search's on the first batch"""
+        if not self._is_current_search(token):
+            return
+        first_batch = self.search_shown is not token
+        if first_batch:
+            self._clear_search_results()
+            self.search_shown = token
+        with stats.timer('search.highlight'):
+            self._append_search_results(batch)
+        if first_batch and show_first:
             self.show_current_result()
+        self.search_info.config(text=f"Searching... {len(self.search_results)} matches")
+    
+    def _on_search_done(self, token, query, mode, matches):
+        if not self._is_current_search(token):
+            return
+        self.last_search = (query, mode, matches)
+        self._save_session(search_query=query, search_mode=mode)
+        if self.search_shown is token:
             self.search_info.config(text=f"Found {len(self.search_results)} matches")
         else:
+            self._clear_search_results()
             self.search_info.config(text="No matches found")
     
-    def highlight_search_results(self, query):
-        """Highlight all search results"""
-        for pos in self.search_results:
-            start_idx = f"1.0+{pos}c"
-            end_idx = f"1.0+{pos + len(query)}c"
-            self.display_text.tag_add('highlight', start_idx, end_idx)
+    def _on_search_error(self, token, message):
+        if self._is_current_search(token):
+            self._clear_search_results()
+            self.search_info.config(text=f"Invalid pattern: {message}")
+    
+    def _append_search_results(self, batch):
+        """Add later matches, highlighting those in the resident pages"""
+        offset = len(self.search_results)
+        self.search_results.extend(batch)
+        first, last = self.document_view.resident_range(batch)
+        if first == last:
+            return
+        if not self.search_result_indices:
+            self.search_window_first = offset + first
+        self.search_result_indices.extend(self.document_view.to_indices(batch[first:last]))
+        if len(self.search_result_indices) <= LAZY_HIGHLIGHT_THRESHOLD:
+            self._tag_ranges('highlight', self.search_result_indices[-(last - first):])
+        else:
+            self.highlight_window = None  # Let the refresh re-tag around the viewport
+            self._refresh_visible_highlights()
+    
+    def highlight_search_results(self):
+        """Highlight all resident search results, or only those near the viewport for large result sets"""
+        # Resolve every resident match to a line.column index once, in a single pass
+        first, last = self.document_view.resident_range(self.search_results)
+        self.search_window_first = first
+        self.search_result_indices = self.document_view.to_indices(self.search_results[first:last])
+        self.highlight_window = None
+        
+        if len(self.search_result_indices) <= LAZY_HIGHLIGHT_THRESHOLD:
+            self._tag_ranges('highlight', self.search_result_indices)
+        else:
+            self._refresh_visible_highlights()
+    
+    def _tag_ranges(self, tag, ranges):
+        """Apply a tag to many (start, end) ranges with few Tk calls"""
+        for i in range(0, len(ranges), TAG_BATCH_SIZE):
+            flat = [index for pair in ranges[i:i + TAG_BATCH_SIZE] for index in pair]
+            self.display_text.tag_add(tag, *flat)
+    
+    def _on_text_scroll(self, first, last):
+        """Keep the scrollbar in sync and refresh lazy highlights after scrolling"""
+        self.text_scrollbar.set(first, last)
+        self.document_view.check_scroll(first, last)
+        if self.session_path is not None:
+            self._save_session(scroll_offset=self.document_view.to_offset('@0,0'))
+        if len(self.search_result_indices) > LAZY_HIGHLIGHT_THRESHOLD and not self.highlight_refresh_pending:
+            # Coalesce bursts of scroll events into one refresh
+            self.highlight_refresh_pending = True
+            self.root.after(50, self._refresh_visible_highlights)
+    
+    def _refresh_visible_highlights(self):
+        """Highlight only the matches within a margin of the visible lines"""
+        self.highlight_refresh_pending = False
+        if not self.search_results:
+            return
+        
+        top_line = int(self.display_text.index('@0,0').split('.')[0])
+        bottom_line = int(self.display_text.index(f'@0,{self.display_text.winfo_height()}').split('.')[0])
+        low = self.document_view.to_offset(f"{max(1, top_line - HIGHLIGHT_MARGIN_LINES)}.0")
+        high = self.document_view.to_offset(f"{bottom_line + HIGHLIGHT_MARGIN_LINES + 1}.0")
+        
+        # Positions within search_result_indices, which only covers the resident pages
+        base = self.search_window_first
+        first = max(0, bisect.bisect_left(self.search_results, (low, -1)) - base)
+        last = min(len(self.search_result_indices), bisect.bisect_left(self.search_results, (high, -1)) - base)
+        if (first, last) == self.highlight_window:
+            return
+        
+        self.highlight_window = (first, last)
+        self.display_text.tag_remove('highlight', '1.0', tk.END)
+        self._tag_ranges('highlight', self.search_result_indices[first:last])
     
     def show_current_result(self):
         """Show current search result"""
         if not self.search_results:
             return
         
-        query = self.search_var.get()
-        pos = self.search_results[self.current_search_index]
+        # Bring the result's page into the widget if needed, then scroll to it
+        self.document_view.show_offset(self.search_results[self.current_search_index][0])
+        start_idx, end_idx = self.search_result_indices[self.current_search_index - self.search_window_first]
         
         # Remove previous current highlight
         self.display_text.tag_remove('current_highlight', '1.0', tk.END)
         
         # Add current highlight
-        start_idx = f"1.0+{pos}c"
-        end_idx = f"1.0+{pos + len(query)}c"
         self.display_text.tag_add('current_highlight', start_idx, end_idx)
         
-        # Scroll to current result
-        self.display_text.see(start_idx)
-        
         # Update info
         self.search_info.config(text=f"Match {self.current_search_index + 1} of {len(self.search_results)}")
     
+    def _on_view_window_change(self):
+        """Re-apply search and narration highlights after the resident pages were swapped"""
+        self.narration_cursor.refresh()
+        if self.search_results:
+            self.highlight_search_results()
+            start, end = self.search_results[self.current_search_index]
+            if self.document_view.contains(start):
+                self.display_text.tag_add('current_highlight', *self.document_view.to_indices([(start, end)])[0])
+    
     def find_next(self):
         """Find next search result"""
         if self.search_results:
@@ -373,11 +898,35 @@ class PDFReaderApp:
     def clear_search(self):
         """Clear search results"""
         self.search_var.set("")
+        self._cancel_search_debounce()
+        self.scheduler.cancel_lane("search")
+        self.search_job = None
+        self.search_request = None
+        self.last_search = None
+        self._clear_search_results()
+    
+    def _clear_search_results(self):
+        """Remove the results and their highlights, leaving the query alone"""
         self.display_text.tag_remove('highlight', '1.0', tk.END)
         self.display_text.tag_remove('current_highlight', '1.0', tk.END)
         self.search_results = []
+        self.search_result_indices = []
+        self.search_window_first = 0
+        self.current_search_index = 0
+        self.search_shown = None
+        self.highlight_window = None
         self.search_info.config(text="")
     
+    def go_to_page(self):
+        """Jump to a page, extracting it on demand if the document is still loading"""
+        total_pages = self.document_view.total_pages
+        if not total_pages:
+            return
+        page = simpledialog.askinteger("Go to Page", f"Page (1-{total_pages}):", parent=self.root,
+                                       minvalue=1, maxvalue=total_pages)
+        if page:
+            self.document_view.show_page(page - 1)
+    
     def focus_search(self):
         """Focus on search entry"""
         self.search_entry.focus_set()
@@ -387,12 +936,16 @@ class PDFReaderApp:
         """Update TTS speech rate"""
         rate = int(float(value))
         self.speed_label.config(text=str(rate))
-        if self.tts_engine:
+        if isinstance(self.narration, Pyttsx3Narrator) and self.is_reading:
+            # Takes effect at the next chunk boundary
+            self.narration.set_property('rate', rate)
+        elif self.tts_engine:
             self.tts_engine.setProperty('rate', rate)
     
     def read_pdf_aloud(self):
         """Read entire PDF content aloud"""
-        if not self.extracted_text:
+        text = self.get_document_text()
+        if not text:
             messagebox.showwarning("Warning", "No text available to read.")
             return
         
@@ -400,9 +953,7 @@ class PDFReaderApp:
             self.stop_reading()
             return
         
-        self.is_reading = True
-        self.status_var.set("Reading aloud...")
-        threading.Thread(target=self._speak_text, args=(self.extracted_text,), daemon=True).start()
+        self._start_speaking(text, status="Reading aloud...", base_offset=0)
     
     def read_selection(self):
         """Read selected text aloud"""
@@ -412,156 +963,467 @@ class PDFReaderApp:
                 if self.is_reading:
                     self.stop_reading()
                 
-                self.is_reading = True
-                self.status_var.set("Reading selection...")
-                threading.Thread(target=self._speak_text, args=(selected_text,), daemon=True).start()
+                base_offset = self.document_view.to_offset(tk.SEL_FIRST)
+                self._start_speaking(selected_text, status="Reading selection...", base_offset=base_offset)
             else:
                 messagebox.showinfo("Info", "Please select some text to read.")
         except tk.TclError:
             messagebox.showinfo("Info", "Please select some text to read.")
     
-    def _speak_text(self, text):
-        """Speak text using selected TTS method"""
+    def _start_speaking(self, text, start_offset=0, status="Reading aloud...", base_offset=None):
+        """Start narrating text from start_offset in a background thread.
+        
+        base_offset is where text starts in the document, so the view can follow narration.
+        """
+        self.scheduler.cancel_lane("prefetch")  # Whatever it was warming up is about to be synthesized anyway
+        self.paused_narration = None
+        self.pause_button.config(text="Pause")
+        self.is_reading = True
+        self.narration_text = text
+        self.narration_offset = start_offset
+        self.narration_base_offset = base_offset
+        # Position updates go to this document's session even if another one is opened meanwhile
+        self.narration_path = None
+        if base_offset is not None and self.current_pdf_path:
+            self.narration_path = os.path.abspath(self.current_pdf_path)
+        if base_offset is not None:
+            self.narration_cursor.start()
+            self._save_session(tts_method=self.tts_method.get(), speed=self.speed_var.get(),
+                               language=self.language_var.get())
+        self.status_var.set(status)
+        voice = self._voice_settings()
+        # Reuse the stored sentence boundaries when reading the document itself
+        boundaries = self.sentence_ends if text is self.extracted_text else None
+        # The narration lane cancels any earlier narration and waits for it to wind down first
+        speak = self._maybe_profiled(
+            "narration", lambda token: self._speak_text(text, start_offset, token, voice, boundaries))
+        self.narration_job = self.scheduler.submit(speak, priority=PRIORITY_INTERACTIVE, lane="narration",
+                                                   name="narration")
+    
+    def toggle_pause(self):
+        """Pause narration at the current chunk, or resume from where it paused"""
+        if self.is_reading:
+            paused = (self.narration_text, self.narration_offset, self.narration_base_offset)
+            self.stop_reading()
+            self.paused_narration = paused
+            self.pause_button.config(text="Resume")
+            self.status_var.set("Paused")
+        elif self.paused_narration:
+            text, offset, base_offset = self.paused_narration
+            self._start_speaking(text, start_offset=offset, status="Resuming...", base_offset=base_offset)
+    
+    def _on_chunk_start(self, chunk, token):
+        """Remember where narration is so it can be paused and resumed, and move the cursor"""
+        if token.cancelled:
+            return  # A stopped narration must not move the position of whatever came after it
+        self.narration_offset = chunk.start
+        if self.narration_base_offset is not None:
+            start = self.narration_base_offset + chunk.start
+            self.narration_cursor.set_sentence(start, start + len(chunk.text))
+            if self.narration_path is not None:
+                self.session_store.update(self.narration_path, narration_offset=start)
+    
+    def _on_word(self, start, end, token):
+        """Move the cursor to the word the engine just started"""
+        if not token.cancelled and self.narration_base_offset is not None:
+            self.narration_cursor.set_word(self.narration_base_offset + start, self.narration_base_offset + end)
+    
+    def _voice_settings(self):
+        """Read the voice controls; Tk variables are only touched on the Tk thread"""
+        return VoiceSettings(self.tts_method.get(), self.language_var.get(), self.speed_var.get())
+    
+    def _speak_text(self, text, start_offset, token, voice, boundaries=None):
+        """Speak text with the given VoiceSettings, until done or token is cancelled"""
         try:
-            if self.tts_method.get() == "gtts" and self.internet_available:
-                self._speak_with_gtts(text)
+            backend_class = get_backend_class(voice.method)
+            if backend_class.capabilities.needs_network and not self.internet_available:
+                backend_class = get_backend_class("pyttsx3")
+            if backend_class.capabilities.direct_playback:
+                self._speak_with_pyttsx3(text, start_offset, token, boundaries)
             else:
-                self._speak_with_pyttsx3(text)
+                self._speak_with_clips(backend_class.name, voice, text, start_offset, token, boundaries)
         except Exception as e:
             print(f"TTS error: {e}")
-            self.root.after(0, lambda: messagebox.showerror("TTS Error", f"Error during speech: {str(e)}"))
+            error_msg = str(e)
+            self.post_to_ui(lambda: messagebox.showerror("TTS Error", f"Error during speech: {error_msg}"))
         finally:
-            self.is_reading = False
-            self.root.after(0, lambda: self.status_var.set("Ready"))
+            self.post_to_ui(lambda: self._narration_finished(token))
+    
+    def _narration_finished(self, token):
+        """Tidy up on the UI thread unless another narration has already started"""
+        if self.narration_job is not None and self.narration_job.token is not token:
+            return
+        self.narration_job = None
+        self.is_reading = False
+        self.narration_cursor.stop()
+        if self.paused_narration is None:
+            self.status_var.set("Ready")
 
-    def _speak_with_pyttsx3(self, text):
-        """Speak using pyttsx3 (offline)"""
+    def _speak_with_pyttsx3(self, text, start_offset, token, boundaries=None):
+        """Speak using pyttsx3 (offline), one chunk at a time"""
         if self.tts_engine and text:
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            narration = self.narration = Pyttsx3Narrator(
+                self.tts_engine,
+                chunk_chars=self.narration_chunk_chars,
+                first_chunk_chars=self.narration_first_chunk_chars
+            )
+            token.on_cancel(narration.stop)  # Runs at once if stopped while we were setting up
+            narration.run(text, start_offset, on_chunk_start=lambda index, chunk: self._on_chunk_start(chunk, token),
+                          on_word=lambda start, end: self._on_word(start, end, token), boundaries=boundaries)
 
-    def _speak_with_gtts(self, text):
-        """Speak using gTTS (online)"""
+    @contextmanager
+    def tts_backend(self, name, voice):
+        """Use the backend instance for name with voice's settings; safe from any thread.
+        
+        Instances are shared between jobs. One whose voice_key() no longer
+        matches, because a setting it uses changed, is replaced and closed
+        once no job is using it any more.
+        """
+        with self.tts_backends_lock:
+            backend = self.tts_backends.get(name)
+            if backend is None or backend.voice_key() != backend.voice_key_for(voice.language, voice.rate):
+                if backend is not None and not self.tts_backend_users[backend]:
+                    backend.close()
+                backend = create_backend(name, language=voice.language, rate=voice.rate)
+                self.tts_backends[name] = backend
+            self.tts_backend_users[backend] += 1
+        try:
+            yield backend
+        finally:
+            with self.tts_backends_lock:
+                self.tts_backend_users[backend] -= 1
+                if not self.tts_backend_users[backend]:
+                    del self.tts_backend_users[backend]
+                    if self.tts_backends.get(name) is not backend:
+                        backend.close()  # Replaced while this job was using it
+    
+    def _speak_with_clips(self, backend_name, voice, text, start_offset, token, boundaries=None):
+        """Speak using a backend that returns audio clips, synthesizing chunks ahead of playback"""
         if not text.strip():
             return
         
         try:
-            # Update status
-            self.root.after(0, lambda: self.status_var.set("Generating speech with gTTS..."))
-            
-            # Create gTTS object
-            tts = gTTS(text=text, lang=self.language_var.get(), slow=False)
-            
-            # Create temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-            temp_file.close()
-            
-            # Save audio
-            tts.save(temp_file.name)
-            self.temp_audio_files.append(temp_file.name)
-            
-            # Update status
-            self.root.after(0, lambda: self.status_var.set("Playing gTTS audio..."))
-            
-            # Play audio using pygame
-            pygame.mixer.music.load(temp_file.name)
-            pygame.mixer.music.play()
-            
-            # Wait for playback to finish
-            while pygame.mixer.music.get_busy() and self.is_reading:
-                pygame.time.wait(100)
-                
+            with self.tts_backend(backend_name, voice) as backend:
+                self._play_clips(backend, text, start_offset, token, boundaries)
         except Exception as e:
-            raise Exception(f"gTTS error: {str(e)}")
+            raise Exception(f"{get_backend_class(backend_name).label} error: {str(e)}")
+    
+    def _play_clips(self, backend, text, start_offset, token, boundaries):
+        """Synthesize chunks ahead of playback and play them in order"""
+        capabilities = backend.capabilities
+        self.post_to_ui(lambda: self.status_var.set(f"Generating speech with {backend.label}..."))
+        
+        chunks = self._clip_chunks(backend, text, start_offset, boundaries)
+        synthesizer = self._clip_synthesizer(backend)
+        # Clips are synthesized ahead; streamed WAV plays while it downloads, other formats once complete
+        narration = self.narration = NarrationPipeline(
+            synthesizer,
+            PygameClipPlayer(),
+            prefetch=self.clip_prefetch,
+            workers=capabilities.max_concurrency,
+            streaming=capabilities.streaming
+        )
+        token.on_cancel(narration.stop)  # Runs at once if stopped while we were setting up
+        
+        def on_chunk_start(index, chunk):
+            self._on_chunk_start(chunk, token)
+            status = f"Playing {backend.label} audio ({index + 1}/{len(chunks)})..."
+            self.post_to_ui(lambda: self.status_var.set(status))
+        
+        # Playback starts with the first chunk's audio
+        narration.run(chunks, on_chunk_start=on_chunk_start)
+
+    
+    def _clip_chunks(self, backend, text, start_offset=0, boundaries=None):
+        """Split text into chunks no longer than the backend accepts"""
+        max_chars = min(self.narration_chunk_chars, backend.capabilities.max_chunk_chars or self.narration_chunk_chars)
+        first_max_chars = min(self.narration_first_chunk_chars, max_chars)
+        return split_into_chunks(text, max_chars, first_max_chars, start=start_offset, boundaries=boundaries)
+    
+    def _clip_synthesizer(self, backend):
+        """Wrap a backend in the audio cache if caching is on"""
+        if not self.cache_audio:
+            return backend
+        return CachedSynthesizer(
+            backend, self.audio_cache,
+            engine=backend.name, language=backend.language, rate=backend.voice_key()
+        )
+    
+    def _prefetch_narration(self, text, start_offset, boundaries=None):
+        """Synthesize the first chunks from start_offset into the audio cache, so resuming starts at once"""
+        voice = self._voice_settings()
+        backend_class = get_backend_class(voice.method)
+        if backend_class.capabilities.direct_playback or not self.cache_audio:
+            return  # Nothing to keep; pyttsx3 speaks directly
+        
+        def prefetch(token):
+            try:
+                with self.tts_backend(backend_class.name, voice) as backend:
+                    synthesizer = self._clip_synthesizer(backend)
+                    for chunk in self._clip_chunks(backend, text, start_offset, boundaries)[:self.clip_prefetch]:
+                        if token.cancelled:
+                            return  # Narration started; its own pipeline takes over
+                        synthesizer(chunk.text)
+                        stats.count('narration.prefetched')
+            except Exception as e:
+                print(f"Narration prefetch error: {e}")
+        
+        self.scheduler.submit(prefetch, priority=PRIORITY_BACKGROUND, lane="prefetch", name="narration-prefetch")
+    
+    def close(self):
+        """Save the session and stop background work before the window closes"""
+        self._save_narration_position()
+        if self.is_reading:
+            self.stop_reading()
+        self.library_indexer.stop()
+        self.scheduler.shutdown()
+        self.session_store.close()
+    
+    def restore_last_document(self):
+        """Reopen the most recently read document, from the extraction cache when it is there"""
+        entries = self.library.recent(1)
+        if entries and entries[0].status != STATUS_MISSING and not self.current_pdf_path:
+            self._start_loading(entries[0].path, restoring=True)
     
     def stop_reading(self):
         """Stop text-to-speech"""
         if self.is_reading:
-            if self.tts_method.get() == "gtts":
-                pygame.mixer.music.stop()
-            elif self.tts_engine:
-                self.tts_engine.stop()
+            self._save_narration_position()
+            if self.narration_job is not None:
+                self.narration_job.cancel()
         
+        self.narration_job = None
         self.is_reading = False
+        self.paused_narration = None
+        self.narration_cursor.stop()
+        self.pause_button.config(text="Pause")
         self.status_var.set("Stopped reading")
     
-    def load_recent_files(self):
-        """Load recent files from settings"""
-        try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r') as f:
-                    data = json.load(f)
-                    return data.get('recent_files', [])
-        except Exception:
-            pass
-        return []
-    
-    def save_recent_files(self):
-        """Save recent files to settings"""
+    def import_recent_files(self):
+        """Move the recent files list from older settings files into the library"""
         try:
-            data = {'recent_files': self.recent_files}
-            with open(self.settings_file, 'w') as f:
-                json.dump(data, f)
-        except Exception:
-            pass
+            with open(self.settings_file, 'r') as f:
+                recent_files = json.load(f).get('recent_files', [])
+        except (OSError, ValueError, AttributeError):
+            return
+        # Oldest first, so the most recent file ends up on top
+        for filepath in reversed(recent_files):
+            self.library.add(filepath, opened=True)
     
     def add_recent_file(self, filepath):
-        """Add file to recent files list"""
-        if filepath in self.recent_files:
-            self.recent_files.remove(filepath)
-        
-        self.recent_files.insert(0, filepath)
-        self.recent_files = self.recent_files[:10]  # Keep only 10 recent files
-        
-        self.save_recent_files()
+        """Record that a file was opened"""
+        self.library.add(filepath, opened=True)
         self.update_recent_menu()
     
+    def _mark_indexed(self, pdf_path, page_count):
+        """Record a document the reader has just extracted and indexed itself"""
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return
+        path = self.library.add(pdf_path)
+        self.library.set_indexed(path, page_count, stat.st_size, stat.st_mtime_ns)
+    
     def update_recent_menu(self):
-        """Update recent files menu"""
+        """Update recent files menu from the library, without touching the files"""
         self.recent_menu.delete(0, tk.END)
         
-        for filepath in self.recent_files:
-            if os.path.exists(filepath):
-                filename = os.path.basename(filepath)
+        entries = self.library.recent(RECENT_FILES_LIMIT)
+        for entry in entries:
+            filename = os.path.basename(entry.path)
+            if entry.status == STATUS_MISSING:
+                self.recent_menu.add_command(label=f"{filename} (missing)", state=tk.DISABLED)
+            else:
                 self.recent_menu.add_command(
                     label=filename,
-                    command=lambda f=filepath: self._load_recent_file(f)
+                    command=lambda f=entry.path: self._load_recent_file(f)
                 )
         
-        if not self.recent_files:
+        if not entries:
             self.recent_menu.add_command(label="No recent files", state=tk.DISABLED)
     
     def _load_recent_file(self, filepath):
-        """Load a recent file"""
-        if os.path.exists(filepath):
-            self.progress.grid()
-            self.progress.start()
-            self.status_var.set("Loading PDF...")
-            threading.Thread(target=self._load_pdf_thread, args=(filepath,), daemon=True).start()
-        else:
-            messagebox.showerror("Error", f"File not found: {filepath}")
-            self.recent_files.remove(filepath)
-            self.save_recent_files()
-            self.update_recent_menu()
+        """Load a recent file; a missing file is reported by the loader thread"""
+        self._start_loading(filepath)
+    
+    def add_folder_to_library(self):
+        """Add every PDF under a folder to the library for background indexing"""
+        folder = filedialog.askdirectory(title="Add folder to library")
+        if folder:
+            self.scheduler.submit(lambda token: self._add_folder_thread(folder, token), name="add-folder")
+    
+    def _add_folder_thread(self, folder, token):
+        """Walk the folder off the UI thread"""
+        added = 0
+        for dirpath, _, filenames in os.walk(folder):
+            token.raise_if_cancelled()
+            for filename in filenames:
+                if filename.lower().endswith('.pdf'):
+                    self.library.add(os.path.join(dirpath, filename))
+                    added += 1
+        self.library_indexer.wake()
+        self.post_to_ui(lambda: self.status_var.set(f"Added {added} PDFs to the library"))
+    
+    def search_library(self):
+        """Search every indexed library document and list the ones that match"""
+        query = simpledialog.askstring("Search Library", "Find in all documents:", parent=self.root,
+                                       initialvalue=self.search_var.get().strip())
+        if not query:
+            return
+        mode = self.search_mode_var.get()
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"Library matches for \"{query}\"")
+        window.geometry("640x360")
+        info = ttk.Label(window, text="Searching...")
+        info.pack(fill=tk.X, padx=5, pady=5)
+        results = tk.Listbox(window, font=('Courier', 9))
+        results.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        matches = []
+        
+        def add_match(match):
+            matches.append(match)
+            results.insert(tk.END, f"{match.entry.title} ({match.count}): ...{match.snippet}...")
+            info.config(text=f"{len(matches)} documents so far...")
+        
+        def finish(error=None):
+            if error is not None:
+                info.config(text=f"Invalid pattern: {error}")
+            else:
+                info.config(text=f"{len(matches)} documents match" if matches else "No matches found")
+        
+        def open_match(event=None):
+            selection = results.curselection()
+            if selection:
+                self.pending_search = (query, mode)
+                self._start_loading(matches[selection[0]].entry.path)
+        
+        def search_thread(token):
+            # Checks the token, never the window; this thread must not call into Tk
+            try:
+                for match in search_library(self.library, self.extraction_cache, query, mode,
+                                            is_cancelled=lambda: token.cancelled,
+                                            on_requeue=self.library_indexer.wake):
+                    self.post_to_ui(lambda m=match: token.cancelled or add_match(m))
+            except re.error as e:
+                error = e
+                self.post_to_ui(lambda: token.cancelled or finish(error))
+                return
+            self.post_to_ui(lambda: token.cancelled or finish())
+        
+        results.bind('<Double-Button-1>', open_match)
+        results.bind('<Return>', open_match)
+        job = self.scheduler.submit(search_thread, lane="library-search", name="library-search")
+        window.bind('<Destroy>', lambda e: job.cancel() if e.widget is window else None)
 
     def refresh_internet_status(self):
         """Refresh internet connectivity status"""
-        threading.Thread(target=self._check_internet_thread, daemon=True).start()
+        self.scheduler.submit(lambda token: self._check_internet_thread(), lane="internet-probe",
+                              name="internet-probe")
 
     def _check_internet_thread(self):
         """Check internet in background thread"""
-        try:
-            requests.get("https://www.google.com", timeout=3)
-            internet_available = True
-        except:
-            internet_available = False
+        internet_available = self._probe_internet()
         
-        self.root.after(0, lambda: self._update_internet_status(internet_available))
+        self.post_to_ui(lambda: self._update_internet_status(internet_available))
 
     def _update_internet_status(self, available):
         """Update internet status in UI"""
         self.internet_available = available
-        # You could update the radio button text here if needed
+        for name, (radio, label) in self.network_backend_radios.items():
+            if available:
+                radio.config(text=label, state=tk.NORMAL)
+            else:
+                radio.config(text=f"{label} - No Internet", state=tk.DISABLED)
+                if self.tts_method.get() == name:
+                    self.tts_method.set("pyttsx3")
+    
+    def post_to_ui(self, callback):
+        """Queue callback to run on the Tk thread; the only way worker threads reach the UI"""
+        self.ui_queue.put((time.perf_counter(), callback))
+    
+    def _drain_ui_queue(self):
+        """Run callbacks queued by worker threads, recording how long each waited and ran"""
+        deadline = time.perf_counter() + UI_QUEUE_BUDGET_SECONDS
+        delay = UI_QUEUE_POLL_MS
+        while True:
+            try:
+                queued, callback = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            started = time.perf_counter()
+            stats.record('ui.after_latency', started - queued)
+            try:
+                callback()
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+            finished = time.perf_counter()
+            stats.record('ui.callback', finished - started)
+            if finished > deadline:
+                delay = 0  # More may be waiting; let Tk handle input first, then continue
+                break
+        self.root.after(delay, self._drain_ui_queue)
+    
+    def toggle_stats_panel(self):
+        """Show or hide the live performance stats window"""
+        if self.stats_window is not None:
+            self.stats_window.destroy()
+            self.stats_window = None
+            return
+        
+        self.stats_window = tk.Toplevel(self.root)
+        self.stats_window.title("Performance Stats")
+        self.stats_window.geometry("640x420")
+        self.stats_text = Text(self.stats_window, wrap=tk.NONE, font=('Courier', 9))
+        self.stats_text.pack(fill=tk.BOTH, expand=True)
+        self.stats_window.protocol("WM_DELETE_WINDOW", self.toggle_stats_panel)
+        self._refresh_stats_panel()
+    
+    def _refresh_stats_panel(self):
+        """Redraw the stats panel while it is open"""
+        if self.stats_window is None:
+            return
+        self.stats_text.delete(1.0, tk.END)
+        self.stats_text.insert(tk.END, stats.format_snapshot())
+        self.root.after(STATS_REFRESH_MS, self._refresh_stats_panel)
+    
+    def toggle_trace(self):
+        """Start or stop writing stats events to a JSON-lines file"""
+        if stats.tracing:
+            stats.stop_trace()
+            self.status_var.set("Trace stopped")
+        else:
+            path = filedialog.asksaveasfilename(
+                title="Write trace to",
+                defaultextension=".jsonl",
+                filetypes=[("JSON lines", "*.jsonl")]
+            )
+            if path:
+                stats.start_trace(path)
+                self.status_var.set(f"Tracing to {os.path.basename(path)}")
+        self.trace_var.set(stats.tracing)
+    
+    def request_profile(self, kind):
+        """Profile the next load or narration run with cProfile"""
+        self.profile_request = kind
+        self.status_var.set(f"The next {kind} will be profiled")
+    
+    def _maybe_profiled(self, kind, func):
+        """Wrap func in cProfile if a profile of this kind was requested from the Debug menu"""
+        if self.profile_request != kind:
+            return func
+        self.profile_request = None
+        output_path = os.path.join(os.path.dirname(os.path.abspath(self.settings_file)),
+                                   f"profile-{kind}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        return lambda *args: run_profiled(lambda: func(*args), output_path)
+    
+    def report_startup_time(self):
+        """Record how long the window took to become interactive"""
+        self.startup_seconds = time.perf_counter() - STARTUP_STARTED
+        stats.record('ui.startup', self.startup_seconds)
+        if self.startup_seconds > STARTUP_BUDGET_SECONDS:
+            print(f"Warning: startup took {self.startup_seconds * 1000:.0f} ms, "
+                  f"over the {STARTUP_BUDGET_SECONDS:.1f} s budget")
 
 def main():
     root = tk.Tk()
@@ -569,21 +1431,17 @@ def main():
     
     # Handle window closing
     def on_closing():
-        if app.is_reading:
-            app.stop_reading()
-    
-        # Clean up temporary audio files
-        for temp_file in app.temp_audio_files:
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            except:
-                pass
-    
+        app.close()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
+    
+    # Runs once the window has been drawn and the event loop is idle
+    root.after_idle(app.report_startup_time)
+    # Warm restart: reopen the last document once the window is up
+    root.after_idle(app.restore_last_document)
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,136 @@
+import threading
+from contextlib import ExitStack
+
+from perf import stats
+
+# Pages extracted in the background past the most recently requested page
+DEFAULT_READ_AHEAD = 8
+# Pages kept behind the most recently requested page; covers the neighbours
+# normalize_page_at() reads on either side of the page it normalizes
+DEFAULT_KEEP_BEHIND = 8
+
+
+class LazyDocument:
+    """Open a PDF without extracting it; pages are extracted when first asked for.
+
+    Only the page count is read up front. get_page() extracts on a miss,
+    while a background thread reads ahead of the most recently requested
+    page so sequential access rarely waits. Only the pages from keep_behind
+    before that page to read_ahead after it are kept; callers hold on to
+    the text they use (the reader keeps the whole document's text anyway),
+    so this bounds the document's own memory to that many pages.
+    """
+
+    def __init__(self, pdf_path, read_ahead=DEFAULT_READ_AHEAD, keep_behind=DEFAULT_KEEP_BEHIND):
+        # Imported on first use so opening the window doesn't pay for it
+        import PyPDF2
+        self.pdf_path = pdf_path
+        self.read_ahead = read_ahead
+        self.keep_behind = keep_behind
+        self._resources = ExitStack()
+        try:
+            self._reader = PyPDF2.PdfReader(self._resources.enter_context(open(pdf_path, 'rb')))
+            self.page_count = len(self._reader.pages)
+        except Exception:
+            self._resources.close()
+            raise
+
+        self._pages = {}  # page_num -> text, for pages near the last one requested
+        self._cached_chars = 0
+        self._last_requested = 0
+        # One lock for the reader and the cached pages; PdfReader is not thread-safe
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._next_read_ahead = 0
+        self._read_ahead_stop = 0
+        self._thread = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.page_count
+
+    @property
+    def cached_chars(self):
+        return self._cached_chars
+
+    def get_page(self, page_num):
+        """Return the text of a page, extracting it now if it isn't cached"""
+        if not 0 <= page_num < self.page_count:
+            raise IndexError(f"Page {page_num} out of range")
+        with self._lock:
+            if self._closed:
+                raise ValueError("Document is closed")
+            self._last_requested = page_num
+            text = self._pages.get(page_num)
+            if text is None:
+                stats.count('lazy.page.miss')
+                text = self._extract_locked(page_num)
+            else:
+                stats.count('lazy.page.hit')
+                self._trim_locked()
+            self._schedule_read_ahead(page_num + 1)
+        return text
+
+    def iter_pages(self, start=0, stop=None):
+        """Yield (page_num, text) in page order, reading ahead in the background"""
+        stop = self.page_count if stop is None else min(stop, self.page_count)
+        for page_num in range(start, stop):
+            yield page_num, self.get_page(page_num)
+
+    def close(self):
+        """Stop reading ahead, drop cached pages and close the file"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify_all()
+            self._pages.clear()
+            self._cached_chars = 0
+            self._resources.close()
+
+    def _extract_locked(self, page_num):
+        # Caller holds the lock
+        with stats.timer('lazy.extract_page'):
+            text = self._reader.pages[page_num].extract_text() or ''
+        self._pages[page_num] = text
+        self._cached_chars += len(text)
+        self._trim_locked()
+        return text
+
+    def _trim_locked(self):
+        # Caller holds the lock; drop pages outside the window around the last requested page
+        low = self._last_requested - self.keep_behind
+        high = self._last_requested + self.read_ahead
+        for page_num in [n for n in self._pages if not low <= n <= high]:
+            self._cached_chars -= len(self._pages.pop(page_num))
+            stats.count('lazy.page.evicted')
+        stats.gauge('lazy.cached_chars', self._cached_chars)
+
+    def _schedule_read_ahead(self, start):
+        # Caller holds the lock; a new request replaces the previous read-ahead range
+        self._next_read_ahead = start
+        self._read_ahead_stop = min(self.page_count, start + self.read_ahead)
+        if self._thread is None and self.read_ahead > 0:
+            self._thread = threading.Thread(target=self._read_ahead_loop, name="pdf-read-ahead", daemon=True)
+            self._thread.start()
+        self._wakeup.notify()
+
+    def _read_ahead_loop(self):
+        while True:
+            # The lock is released between pages so on-demand requests get in quickly
+            with self._wakeup:
+                while not self._closed and self._next_read_ahead >= self._read_ahead_stop:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                page_num = self._next_read_ahead
+                self._next_read_ahead += 1
+                if page_num not in self._pages:
+                    stats.count('lazy.read_ahead')
+                    self._extract_locked(page_num)
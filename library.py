@@ -0,0 +1,337 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from itertools import accumulate
+
+from document_view import page_piece
+from pdf_extraction import PageExtractor
+from perf import stats
+from search_index import SearchIndex
+from text_normalization import (cache_normalized, document_sentence_ends, iter_normalized, load_normalized,
+                                sentence_span)
+
+# Seconds between checks while the app is busy or there is nothing to index
+IDLE_POLL_SECONDS = 2.0
+# Seconds between re-checking every library file for changes or removal
+RESCAN_SECONDS = 300.0
+# Characters of context on each side of a match in library search results
+SNIPPET_CHARS = 40
+
+STATUS_QUEUED = "queued"
+STATUS_INDEXED = "indexed"
+STATUS_MISSING = "missing"
+STATUS_ERROR = "error"
+
+LibraryEntry = namedtuple('LibraryEntry', [
+    'path', 'title', 'page_count', 'size', 'mtime_ns', 'status', 'added_at', 'last_opened', 'last_position',
+])
+LibraryMatch = namedtuple('LibraryMatch', ['entry', 'count', 'first_offset', 'snippet'])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    page_count INTEGER,
+    size INTEGER,
+    mtime_ns INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    added_at REAL NOT NULL,
+    last_opened REAL,
+    last_position INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS documents_last_opened ON documents (last_opened DESC);
+CREATE INDEX IF NOT EXISTS documents_status ON documents (status);
+CREATE TABLE IF NOT EXISTS sessions (
+    path TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def assemble_document(pages):
+    """Return (text, SearchIndex) for page texts, laid out exactly as the reader shows them"""
+    index = SearchIndex()
+    pieces = []
+    for page_num, page_text in enumerate(pages):
+        piece = page_piece(page_num, page_text)
+        pieces.append(piece)
+        index.add_text(piece, page_num)
+    return ''.join(pieces).rstrip(), index
+
+
+class Library:
+    """SQLite catalog of the documents the user has opened or added.
+
+    Safe to use from several threads; every call runs under one lock on a
+    shared connection. Only the catalog lives here; page text and search
+    indexes stay in the ExtractionCache.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL keeps commits cheap enough to make from the UI thread
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [LibraryEntry(*row) for row in self._db.execute(sql, params)]
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._db:
+            return self._db.execute(sql, params).rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def add(self, path, opened=False):
+        """Add a document (queued for indexing) or, if opened, mark it as just opened"""
+        path = os.path.abspath(path)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO documents (path, title, added_at) VALUES (?, ?, ?) ON CONFLICT(path) DO NOTHING",
+                (path, os.path.splitext(os.path.basename(path))[0], now))
+            if opened:
+                self._db.execute("UPDATE documents SET last_opened = ? WHERE path = ?", (now, path))
+        return path
+
+    def get(self, path):
+        entries = self._query("SELECT * FROM documents WHERE path = ?", (os.path.abspath(path),))
+        return entries[0] if entries else None
+
+    def recent(self, limit=10):
+        """Return the most recently opened documents"""
+        return self._query("SELECT * FROM documents WHERE last_opened IS NOT NULL "
+                           "ORDER BY last_opened DESC LIMIT ?", (limit,))
+
+    def entries(self, status=None):
+        if status is None:
+            return self._query("SELECT * FROM documents ORDER BY title")
+        return self._query("SELECT * FROM documents WHERE status = ? ORDER BY title", (status,))
+
+    def next_queued(self):
+        """Return the queued document to index next, most recently opened first"""
+        entries = self._query("SELECT * FROM documents WHERE status = ? "
+                              "ORDER BY last_opened IS NULL, last_opened DESC, added_at LIMIT 1", (STATUS_QUEUED,))
+        return entries[0] if entries else None
+
+    def set_status(self, path, status):
+        self._execute("UPDATE documents SET status = ? WHERE path = ?", (status, path))
+
+    def set_indexed(self, path, page_count, size, mtime_ns):
+        self._execute("UPDATE documents SET status = ?, page_count = ?, size = ?, mtime_ns = ? WHERE path = ?",
+                      (STATUS_INDEXED, page_count, size, mtime_ns, path))
+
+    def load_session(self, path):
+        """Return the saved session state for a document as a dict (empty if none)"""
+        with self._lock:
+            row = self._db.execute("SELECT state FROM sessions WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        if row is None:
+            return {}
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return {}
+
+    def save_sessions(self, changes):
+        """Merge {path: fields} into the saved session states in one transaction"""
+        now = time.time()
+        with self._lock, self._db:
+            for path, fields in changes.items():
+                path = os.path.abspath(path)
+                row = self._db.execute("SELECT state FROM sessions WHERE path = ?", (path,)).fetchone()
+                state = json.loads(row[0]) if row else {}
+                state.update(fields)
+                self._db.execute(
+                    "INSERT INTO sessions (path, state, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                    (path, json.dumps(state), now))
+                if 'narration_offset' in fields:
+                    self._db.execute("UPDATE documents SET last_position = ? WHERE path = ?",
+                                     (fields['narration_offset'], path))
+
+    def remove(self, path):
+        path = os.path.abspath(path)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM documents WHERE path = ?", (path,))
+            self._db.execute("DELETE FROM sessions WHERE path = ?", (path,))
+
+
+class LibraryIndexer:
+    """Pre-extract and index library documents in the background while the app is idle.
+
+    Pages and indexes go into the same ExtractionCache the reader uses, so
+    opening an indexed book is a cache hit. is_idle() is checked before
+    each document and between pages; the worker backs off while it
+    returns False.
+    """
+
+    def __init__(self, library, extraction_cache, is_idle=lambda: True, on_change=None):
+        self.library = library
+        self.extraction_cache = extraction_cache
+        self.is_idle = is_idle
+        self.on_change = on_change  # Called from the worker after a document's status changes
+        # Serial extraction in this thread; the pool is left to interactive loads
+        self.extractor = PageExtractor(workers=1)
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_rescan = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="library-indexer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+
+    def wake(self):
+        """Look for work now instead of at the next poll"""
+        self._wakeup.set()
+
+    def _sleep(self, seconds):
+        self._wakeup.wait(seconds)
+        self._wakeup.clear()
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.is_idle():
+                self._sleep(IDLE_POLL_SECONDS)
+                continue
+            if time.monotonic() - self._last_rescan > RESCAN_SECONDS:
+                self.rescan()
+                continue
+            entry = self.library.next_queued()
+            if entry is None:
+                self._sleep(IDLE_POLL_SECONDS)
+                continue
+            self.index_document(entry)
+
+    def rescan(self):
+        """Re-queue changed documents and ones evicted from the cache, and mark deleted ones missing (or back again)"""
+        self._last_rescan = time.monotonic()
+        changed = False
+        for entry in self.library.entries():
+            try:
+                stat = os.stat(entry.path)
+            except OSError:
+                if entry.status != STATUS_MISSING:
+                    self.library.set_status(entry.path, STATUS_MISSING)
+                    changed = True
+                continue
+            if entry.status == STATUS_INDEXED:
+                # Changed on disk, or its pages were evicted from the cache
+                stale = ((stat.st_size, stat.st_mtime_ns) != (entry.size, entry.mtime_ns)
+                         or not self.extraction_cache.contains(entry.path))
+            else:
+                stale = entry.status == STATUS_MISSING
+            if stale:
+                self.library.set_status(entry.path, STATUS_QUEUED)
+                changed = True
+        if changed:
+            self._changed()
+
+    def index_document(self, entry):
+        """Extract and index one document into the cache; returns False if interrupted"""
+        try:
+            stat = os.stat(entry.path)
+            if self.extraction_cache.contains(entry.path, kind='index'):
+                # Opened and indexed by the reader already
+                pages = self.extraction_cache.get(entry.path)
+                if pages is not None:
+                    self.library.set_indexed(entry.path, len(pages), stat.st_size, stat.st_mtime_ns)
+                    self._changed()
+                    return True
+
+            interrupted = False
+
+            def iter_raw_pages():
+                nonlocal interrupted
+                for _, page_text in self.extractor.iter_pages(entry.path):
+                    if self._stop_event.is_set():
+                        interrupted = True
+                        return
+                    # Back off while the user is doing something
+                    while not self.is_idle():
+                        if self._stop_event.is_set():
+                            interrupted = True
+                            return
+                        self._sleep(IDLE_POLL_SECONDS)
+                    yield page_text
+
+            with stats.timer('library.index_document'):
+                pages = list(iter_normalized(iter_raw_pages()))
+                if interrupted:
+                    return False
+                _, index = assemble_document([page.text for page in pages])
+            cache_normalized(self.extraction_cache, entry.path, pages)
+            self.extraction_cache.put(entry.path, index.to_dict(), kind='index')
+            self.library.set_indexed(entry.path, len(pages), stat.st_size, stat.st_mtime_ns)
+            stats.count('library.indexed')
+        except FileNotFoundError:
+            self.library.set_status(entry.path, STATUS_MISSING)
+        except Exception as e:
+            print(f"Library indexing error for {entry.path}: {e}")
+            self.library.set_status(entry.path, STATUS_ERROR)
+        self._changed()
+        return True
+
+
+def search_library(library, extraction_cache, query, mode="text", is_cancelled=lambda: False, on_requeue=None):
+    """Yield a LibraryMatch for each indexed document containing query.
+
+    Documents whose pages have been evicted from the cache can't be
+    searched; they are queued to be indexed again and on_requeue() is
+    called so the indexer picks them up.
+    Raises re.error for an invalid regex, like SearchIndex.find_all.
+    """
+    for entry in library.entries(STATUS_INDEXED):
+        if is_cancelled():
+            return
+        pages = load_normalized(extraction_cache, entry.path)
+        if pages is None:
+            library.set_status(entry.path, STATUS_QUEUED)
+            if on_requeue:
+                on_requeue()
+            continue
+        pieces = [page_piece(page_num, page.text) for page_num, page in enumerate(pages)]
+        text = ''.join(pieces).rstrip()
+        index = None
+        index_data = extraction_cache.get(entry.path, kind='index')
+        if index_data is not None:
+            try:
+                index = SearchIndex.from_dict(index_data, text)
+            except (KeyError, ValueError):
+                pass
+        if index is None:
+            index = SearchIndex.build(text, list(accumulate((len(piece) for piece in pieces[:-1]), initial=0)))
+        matches = index.find_all(query, mode, is_cancelled)
+        if is_cancelled():
+            return
+        if matches:
+            start, end = matches[0]
+            # The sentence around the match, cut down to SNIPPET_CHARS on each side
+            sentence_start, sentence_end = sentence_span(document_sentence_ends(pages), start, len(text))
+            snippet = text[max(sentence_start, start - SNIPPET_CHARS):min(sentence_end, end + SNIPPET_CHARS)]
+            snippet = ' '.join(snippet.split())
+            yield LibraryMatch(entry, len(matches), start, snippet)
@@ -0,0 +1,116 @@
+import threading
+
+# Highlight updates applied per second while narrating
+DEFAULT_CURSOR_FPS = 30
+
+
+class NarrationCursor:
+    """Highlight the word and sentence being spoken in a DocumentView.
+
+    Speech threads report document offsets with set_word() and
+    set_sentence(); the Tk thread applies only the latest position, at
+    most fps times a second, so a fast voice can't flood it with tag
+    operations. The view scrolls only when the word leaves the viewport.
+    """
+
+    def __init__(self, view, word_tag='narration_word', sentence_tag='narration_sentence', fps=DEFAULT_CURSOR_FPS):
+        self.view = view
+        self.widget = view.widget
+        self.word_tag = word_tag
+        self.sentence_tag = sentence_tag
+        self.interval_ms = max(1, int(1000 / fps))
+        self._lock = threading.Lock()
+        self._word = None  # (start, end) document offsets
+        self._sentence = None
+        self._changed = False
+        self._after_id = None
+        self._tagged = {}  # tag -> (start index, end index) currently applied
+
+    @property
+    def running(self):
+        return self._after_id is not None
+
+    def set_word(self, start, end):
+        """Report the word being spoken; safe to call from any thread"""
+        with self._lock:
+            self._word = (start, end)
+            self._changed = True
+
+    def set_sentence(self, start, end):
+        """Report the sentence or chunk being spoken; clears the word until the next one starts"""
+        with self._lock:
+            self._sentence = (start, end)
+            self._word = None
+            self._changed = True
+
+    def start(self):
+        """Start applying updates on the Tk thread"""
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Stop updating and remove the highlight; call from the Tk thread"""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        with self._lock:
+            self._word = self._sentence = None
+            self._changed = False
+        self._untag_all()
+
+    def refresh(self):
+        """Re-apply the highlight, e.g. after the resident pages were swapped"""
+        self._tagged = {}  # Replacing the widget text dropped the old tags
+        with self._lock:
+            self._changed = True
+
+    def _tick(self):
+        with self._lock:
+            word, sentence, changed = self._word, self._sentence, self._changed
+            self._changed = False
+        if changed:
+            self._apply(word, sentence)
+        self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def _apply(self, word, sentence):
+        focus = word or sentence
+        if focus is None:
+            self._untag_all()
+            return
+        if focus[0] < self.view.length and not self.view.contains(focus[0]):
+            self.view.show_offset(focus[0])  # Swaps pages; our tags went with the old text
+            self._tagged = {}
+
+        self._set_tag(self.sentence_tag, sentence)
+        self._set_tag(self.word_tag, word)
+
+        # Only scroll when the spoken word has left the viewport
+        index = self._tagged.get(self.word_tag, self._tagged.get(self.sentence_tag, (None,)))[0]
+        if index is not None and self.widget.bbox(index) is None:
+            self.widget.see(index)
+
+    def _set_tag(self, tag, span):
+        indices = self._resident_indices(span)
+        if indices == self._tagged.get(tag):
+            return
+        old = self._tagged.pop(tag, None)
+        if old is not None:
+            self.widget.tag_remove(tag, *old)
+        if indices is not None:
+            self.widget.tag_add(tag, *indices)
+            self._tagged[tag] = indices
+
+    def _resident_indices(self, span):
+        """Widget indices for the part of span inside the resident window, or None"""
+        if span is None or self.view.window_start is None:
+            return None
+        start = max(span[0], self.view.window_start)
+        end = min(span[1], self.view.window_end)
+        if start >= end:
+            return None
+        return self.view.to_indices([(start, end)])[0]
+
+    def _untag_all(self):
+        for tag, indices in self._tagged.items():
+            self.widget.tag_remove(tag, *indices)
+        self._tagged = {}
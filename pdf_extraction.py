@@ -0,0 +1,130 @@
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+from perf import stats
+
+# Below this many pages the pool startup costs more than it saves
+SERIAL_PAGE_THRESHOLD = 16
+# Upper bound on pages handed to a worker in one go
+MAX_CHUNK_SIZE = 32
+
+
+def default_worker_count():
+    """Leave one core free for the UI thread"""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def count_pages(pdf_path):
+    """Return the number of pages in a PDF"""
+    import PyPDF2
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+# Reader kept open in each worker process across chunks of the same document
+_worker_document = None  # (pdf_path, mtime_ns, ExitStack, PdfReader)
+
+
+def _worker_reader(pdf_path):
+    """Return this worker's reader for pdf_path, parsing the file only once per document"""
+    global _worker_document
+    import PyPDF2
+    mtime_ns = os.stat(pdf_path).st_mtime_ns
+    if _worker_document is None or _worker_document[:2] != (pdf_path, mtime_ns):
+        if _worker_document is not None:
+            _worker_document[2].close()
+            _worker_document = None
+        resources = ExitStack()
+        try:
+            reader = PyPDF2.PdfReader(resources.enter_context(open(pdf_path, 'rb')))
+        except Exception:
+            resources.close()
+            raise
+        _worker_document = (pdf_path, mtime_ns, resources, reader)
+    return _worker_document[3]
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """Extract pages [start, stop) in a worker process"""
+    started = time.perf_counter()
+    reader = _worker_reader(pdf_path)
+    pages = [reader.pages[i].extract_text() or '' for i in range(start, stop)]
+    return start, pages, time.perf_counter() - started
+
+
+class PageExtractor:
+    """Extract page text from a PDF, in parallel for larger documents"""
+
+    def __init__(self, workers=None, serial_threshold=SERIAL_PAGE_THRESHOLD):
+        self.workers = workers or default_worker_count()
+        self.serial_threshold = serial_threshold
+
+    def chunk_ranges(self, total_pages, start_page=0):
+        """Split the page range into chunks, several per worker so progress stays smooth"""
+        size = max(1, min(MAX_CHUNK_SIZE, (total_pages - start_page) // (self.workers * 4) or 1))
+        return [(start, min(start + size, total_pages)) for start in range(start_page, total_pages, size)]
+
+    def extract_pages(self, pdf_path, progress_callback=None):
+        """Return a list of page texts in page order"""
+        return [page_text for _, page_text in self.iter_pages(pdf_path, progress_callback)]
+
+    def iter_pages(self, pdf_path, progress_callback=None, start_page=0, token=None):
+        """Yield (page_num, text) in page order as soon as each page is available.
+
+        Pages before start_page are skipped (and count as done for progress).
+        progress_callback(done_pages, total_pages) is called from the consuming thread.
+        Cancelling token (a scheduler CancellationToken) stops the worker pool
+        at once; iteration then raises CancelledError.
+        """
+        # Imported on first use so opening the window doesn't pay for it
+        import PyPDF2
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            total_pages = len(reader.pages)
+
+            if self.workers <= 1 or total_pages - start_page < self.serial_threshold:
+                for page_num in range(start_page, total_pages):
+                    with stats.timer('extract.page'):
+                        page_text = reader.pages[page_num].extract_text() or ''
+                    stats.count('extract.pages')
+                    if progress_callback:
+                        progress_callback(page_num + 1, total_pages)
+                    yield page_num, page_text
+                return
+
+        yield from self._iter_parallel(pdf_path, total_pages, progress_callback, start_page, token)
+
+    def _iter_parallel(self, pdf_path, total_pages, progress_callback, start_page=0, token=None):
+        """Extract chunks in a process pool, yielding the contiguous prefix as it completes"""
+        ranges = self.chunk_ranges(total_pages, start_page)
+        pending = {}
+        next_page = start_page
+        done = start_page
+        pool = ProcessPoolExecutor(max_workers=min(self.workers, len(ranges)))
+        try:
+            # Futures the pool cancels on shutdown run their callbacks but never wake as_completed()
+            completed = queue.SimpleQueue()
+            for start, stop in ranges:
+                pool.submit(_extract_page_range, pdf_path, start, stop).add_done_callback(completed.put)
+            if token is not None:
+                # Don't wait for the consumer to close this generator; it may be blocked elsewhere
+                token.on_cancel(lambda: pool.shutdown(wait=False, cancel_futures=True))
+            for _ in ranges:
+                start, chunk, seconds = completed.get().result()
+                stats.record('extract.chunk', seconds)
+                stats.count('extract.pages', len(chunk))
+                pending[start] = chunk
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total_pages)
+                # Chunks can finish out of order; only release pages once their predecessors are in
+                while next_page in pending:
+                    chunk = pending.pop(next_page)
+                    for offset, page_text in enumerate(chunk):
+                        yield next_page + offset, page_text
+                    next_page += len(chunk)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,121 @@
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PerfStats:
+    """Thread-safe counters, gauges and timers for the hot paths.
+
+    Every update can also be appended to a JSON-lines trace file while
+    tracing is on. Updates are cheap enough to leave enabled permanently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.timers = {}  # name -> [count, total seconds, max seconds]
+            self.started = time.time()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            self._trace(name, count=n)
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+            self._trace(name, value=value)
+
+    def record(self, name, seconds):
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+            self._trace(name, seconds=round(seconds, 6))
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def snapshot(self):
+        """Return a copy of all current values"""
+        with self._lock:
+            return {
+                'uptime_seconds': time.time() - self.started,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'timers': {name: {'count': count, 'total_seconds': total,
+                                  'mean_ms': total / count * 1000, 'max_ms': longest * 1000}
+                           for name, (count, total, longest) in self.timers.items()},
+            }
+
+    def format_snapshot(self):
+        """Return the snapshot as aligned text for the stats panel"""
+        snapshot = self.snapshot()
+        lines = [f"Uptime: {snapshot['uptime_seconds']:.0f} s", "", "Timers (count / mean / max):"]
+        for name, timer in sorted(snapshot['timers'].items()):
+            lines.append(f"  {name:32s} {timer['count']:7d} {timer['mean_ms']:9.2f} ms {timer['max_ms']:9.2f} ms")
+        lines += ["", "Counters:"]
+        lines += [f"  {name:32s} {value:7d}" for name, value in sorted(snapshot['counters'].items())]
+        lines += ["", "Gauges:"]
+        lines += [f"  {name:32s} {value}" for name, value in sorted(snapshot['gauges'].items())]
+        return "\n".join(lines)
+
+    def start_trace(self, path):
+        """Append every update to a JSON-lines file until stop_trace()"""
+        with self._lock:
+            if self._trace_file:
+                self._trace_file.close()
+            self._trace_file = open(path, 'a', buffering=1, encoding='utf-8')
+
+    def stop_trace(self):
+        with self._lock:
+            if self._trace_file:
+                self._trace_file.close()
+                self._trace_file = None
+
+    @property
+    def tracing(self):
+        return self._trace_file is not None
+
+    def _trace(self, name, **fields):
+        # Caller holds the lock
+        if self._trace_file is not None:
+            fields.update(t=round(time.time(), 6), event=name, thread=threading.current_thread().name)
+            self._trace_file.write(json.dumps(fields) + "\n")
+
+
+# Shared instance used by all modules
+stats = PerfStats()
+
+
+def run_profiled(func, output_path=None, top=25):
+    """Run func under cProfile, dump the raw profile to output_path and print the top entries"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        if output_path:
+            profiler.dump_stats(output_path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(top)
+        print(summary.getvalue())
@@ -0,0 +1,218 @@
+"""One long-lived pool of worker threads for loading, synthesis and background work.
+
+Jobs are queued with a priority and, optionally, a lane. The most urgent
+eligible job runs first. Only a limited number of background jobs run at
+once, so interactive work always finds a free worker. A lane runs one job
+at a time: submitting to a lane cancels the lane's earlier jobs, and the
+new job starts only after they have finished. That is how a quick
+Read/Stop/Read is kept from running two narrations at once.
+
+Two kinds of work stay off the pool on purpose. The library indexer keeps
+its own thread: it polls is_idle() and sleeps between files, so as a job
+it would hold the only background slot for as long as the app runs. A
+narration synthesizes ahead with a small executor of its own, because how
+many requests may run at once depends on the backend, while a lane here
+runs one job at a time.
+"""
+import threading
+import time
+
+from perf import stats
+
+# Job priorities; lower numbers run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+# Worker threads; each lane uses at most one at a time
+DEFAULT_WORKERS = 4
+# Background jobs allowed to run at once
+MAX_BACKGROUND_JOBS = 1
+
+
+class Cancelled(Exception):
+    """Raised by CancellationToken.raise_if_cancelled() to abandon a job"""
+
+
+class CancellationToken:
+    """Cancellation flag shared by a job and whoever may want to stop it"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """Set the flag and run the registered callbacks; safe from any thread"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancel callback error: {e}")
+
+    def on_cancel(self, callback):
+        """Call callback when the token is cancelled, or right away if it already is"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, timeout=None):
+        """Block until cancelled or timeout; return True if cancelled"""
+        return self._event.wait(timeout)
+
+
+class Job:
+    """A function queued on the Scheduler, called as func(token)"""
+
+    def __init__(self, func, priority, lane, name):
+        self.func = func
+        self.priority = priority
+        self.lane = lane
+        self.name = name or getattr(func, '__name__', 'job')
+        self.token = CancellationToken()
+        self.submitted = time.perf_counter()
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def wait(self, timeout=None):
+        """Block until the job has finished or was dropped; return True if so"""
+        return self._done.wait(timeout)
+
+
+class Scheduler:
+    """Run jobs by priority on a fixed set of long-lived worker threads"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_background=MAX_BACKGROUND_JOBS):
+        self.max_background = max_background
+        self._cond = threading.Condition()
+        self._pending = []  # Jobs waiting for a worker, in submission order
+        self._running = set()
+        self._lanes = {}  # lane -> most recently submitted job
+        self._busy_lanes = set()
+        self._closed = False
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, priority=PRIORITY_NORMAL, lane=None, name=None):
+        """Queue func(token) and return its Job"""
+        job = Job(func, priority, lane, name)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            previous = self._lanes.get(lane) if lane is not None else None
+            if lane is not None:
+                self._lanes[lane] = job
+            self._pending.append(job)
+            stats.gauge('scheduler.pending', len(self._pending))
+            self._cond.notify_all()
+        if previous is not None:
+            previous.cancel()  # Outside the lock; cancel callbacks may do anything
+        return job
+
+    def cancel_lane(self, lane):
+        """Cancel the running or queued job in a lane, if any"""
+        with self._cond:
+            job = self._lanes.get(lane)
+        if job is not None:
+            job.cancel()
+
+    def is_idle(self, priority=PRIORITY_BACKGROUND):
+        """True if no job more urgent than priority is running or queued"""
+        with self._cond:
+            return not any(job.priority < priority and not job.cancelled
+                           for job in (*self._running, *self._pending))
+
+    def shutdown(self):
+        """Cancel every job and let the workers exit once their current job returns"""
+        with self._cond:
+            self._closed = True
+            jobs = [*self._running, *self._pending]
+            self._cond.notify_all()
+        for job in jobs:
+            job.cancel()
+
+    def _take_locked(self):
+        """Remove and return the most urgent job that may start now, or None"""
+        background_running = sum(1 for job in self._running if job.priority >= PRIORITY_BACKGROUND)
+        best = None
+        for job in list(self._pending):
+            if job.cancelled:
+                # Never started; nothing to wait for
+                self._pending.remove(job)
+                self._forget_locked(job)
+                job._done.set()
+                stats.count('scheduler.dropped')
+                continue
+            if job.lane is not None and job.lane in self._busy_lanes:
+                continue
+            if job.priority >= PRIORITY_BACKGROUND and background_running >= self.max_background:
+                continue
+            if best is None or job.priority < best.priority:
+                best = job
+        if best is not None:
+            self._pending.remove(best)
+            self._running.add(best)
+            if best.lane is not None:
+                self._busy_lanes.add(best.lane)
+        return best
+
+    def _forget_locked(self, job):
+        if job.lane is not None and self._lanes.get(job.lane) is job:
+            del self._lanes[job.lane]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._take_locked()
+                while job is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    job = self._take_locked()
+            stats.record('scheduler.queue_wait', time.perf_counter() - job.submitted)
+            try:
+                if not job.cancelled:
+                    job.result = job.func(job.token)
+            except Cancelled:
+                pass
+            except Exception as e:
+                job.error = e
+                print(f"Job {job.name} failed: {e}")
+            finally:
+                with self._cond:
+                    self._running.discard(job)
+                    if job.lane is not None:
+                        self._busy_lanes.discard(job.lane)
+                    self._forget_locked(job)
+                    self._cond.notify_all()
+                job._done.set()
+                stats.count('scheduler.jobs')
@@ -0,0 +1,262 @@
+import base64
+import re
+from array import array
+from bisect import bisect_right
+
+INDEX_FORMAT_VERSION = 2
+
+WORD_PATTERN = re.compile(r'\w+')
+
+SEARCH_MODES = ("text", "word", "prefix", "phrase", "regex")
+# Modes where every match of an extended query starts at a match of the shorter one
+REFINABLE_MODES = ("text", "prefix")
+# Matches handed over at a time by SearchIndex.iter_find
+FIND_BATCH_SIZE = 500
+# Loop iterations between checks of is_cancelled in the search loops
+CANCEL_CHECK_INTERVAL = 1024
+
+
+def fold_text(text):
+    """Casefold text without changing its length, so offsets stay valid"""
+    folded = text.casefold()
+    if len(folded) == len(text):
+        return folded
+    # A few characters (e.g. German sharp s) expand when folded; keep those as-is
+    return ''.join(c if len(c.casefold()) != 1 else c.casefold() for c in text)
+
+
+def never_cancelled():
+    return False
+
+
+def can_refine(previous, query, mode):
+    """True if query's matches can be found among those of previous, a (query, mode, matches) search"""
+    previous_query, previous_mode, _ = previous
+    return (mode == previous_mode and mode in REFINABLE_MODES and bool(previous_query)
+            and fold_text(query).startswith(fold_text(previous_query)))
+
+
+class SearchIndex:
+    """Inverted word index over a document, built once and queried many times.
+
+    Keeps a casefolded copy of the text and, for every word, the offsets at
+    which it occurs. Queries look up candidate words in the vocabulary and
+    verify them in place, so most searches never scan the whole text.
+    """
+
+    def __init__(self):
+        self._folded_parts = []
+        self._folded = None
+        self.length = 0
+        self.words = {}
+        self.page_starts = []
+        self.page_numbers = []
+
+    @property
+    def folded(self):
+        if self._folded is None:
+            self._folded = ''.join(self._folded_parts)
+            self._folded_parts = [self._folded]
+        return self._folded
+
+    def add_text(self, text, page_num=None):
+        """Append the next piece of the document (usually one page) and index its words"""
+        folded = fold_text(text)
+        base = self.length
+        self.page_starts.append(base)
+        self.page_numbers.append(len(self.page_numbers) if page_num is None else page_num)
+        words = self.words
+        for match in WORD_PATTERN.finditer(folded):
+            positions = words.get(match.group())
+            if positions is None:
+                positions = words[match.group()] = array('I')
+            positions.append(base + match.start())
+        self._folded_parts.append(folded)
+        self._folded = None
+        self.length += len(folded)
+
+    @classmethod
+    def build(cls, text, page_starts=None):
+        """Index a whole document in one go.
+
+        page_starts are the offsets in text where each page begins, for
+        page_for_offset(); without them the whole text counts as page 0.
+        """
+        index = cls()
+        page_starts = page_starts or [0]
+        ends = list(page_starts[1:]) + [len(text)]
+        for page_num, (start, end) in enumerate(zip(page_starts, ends)):
+            index.add_text(text[start:end], page_num)
+        return index
+
+    def page_for_offset(self, offset):
+        """Return the page number containing a document offset"""
+        if not self.page_starts:
+            return 0
+        return self.page_numbers[max(0, bisect_right(self.page_starts, offset) - 1)]
+
+    def find_all(self, query, mode="text", is_cancelled=never_cancelled):
+        """Return sorted (start, end) offsets of every match.
+
+        Modes: "text" (case-insensitive substring), "word" (whole words),
+        "prefix" (words starting with the query), "phrase" (whole words,
+        any whitespace/punctuation between them) and "regex".
+        Once is_cancelled() returns True the search stops and returns what
+        it has found so far, which the caller should discard.
+        Raises re.error for an invalid regex.
+        """
+        if not query:
+            return []
+        if mode == "regex":
+            matches = []
+            for match in self._iter_regex(query):
+                if len(matches) % CANCEL_CHECK_INTERVAL == 0 and is_cancelled():
+                    break
+                matches.append(match)
+            return matches
+        if mode == "phrase":
+            tokens = WORD_PATTERN.findall(fold_text(query))
+            if not tokens:
+                return []
+            pattern = re.compile(r'\b' + r'\W+'.join(map(re.escape, tokens)) + r'\b')
+            return self._match_candidates(tokens[0], 0, True, True, pattern, is_cancelled=is_cancelled)
+
+        folded_query = fold_text(query)
+        first = WORD_PATTERN.search(folded_query)
+        if first is None:
+            return self._scan(folded_query, is_cancelled)
+
+        # The first token must sit at a word boundary wherever the query has
+        # non-word characters around it (or the mode requires it)
+        bounded_start = first.start() > 0 or mode in ("word", "prefix")
+        bounded_end = first.end() < len(folded_query) or mode == "word"
+        pattern = None
+        if mode == "word":
+            pattern = re.compile(r'\b' + re.escape(folded_query) + r'\b')
+        elif mode == "prefix":
+            pattern = re.compile(r'\b' + re.escape(folded_query))
+        return self._match_candidates(first.group(), first.start(), bounded_start, bounded_end,
+                                      pattern, folded_query, is_cancelled)
+
+    def iter_find(self, query, mode="text", previous=None, batch_size=FIND_BATCH_SIZE,
+                  is_cancelled=never_cancelled):
+        """Yield the matches of find_all() in document order, in lists of up to batch_size.
+
+        previous is an earlier (query, mode, matches) search; when query
+        extends it (see can_refine), only those matches are re-checked.
+        Regex matches are yielded as the scan reaches them, so a consumer
+        that stops early skips the rest of the scan; the other modes stop
+        once is_cancelled() returns True, as in find_all().
+        Raises re.error for an invalid regex.
+        """
+        if mode == "regex" and query:
+            matches = self._iter_regex(query)
+        elif previous is not None and can_refine(previous, query, mode):
+            matches = self.refine(previous[2], query, is_cancelled)
+        else:
+            matches = self.find_all(query, mode, is_cancelled)
+        batch = []
+        for match in matches:
+            batch.append(match)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def refine(self, matches, query, is_cancelled=never_cancelled):
+        """Return the matches of query starting where the shorter query's matches start"""
+        folded = self.folded
+        folded_query = fold_text(query)
+        results = []
+        for i, (start, _) in enumerate(matches):
+            if i % CANCEL_CHECK_INTERVAL == 0 and is_cancelled():
+                break
+            if folded.startswith(folded_query, start):
+                results.append((start, start + len(folded_query)))
+        return results
+
+    def _iter_regex(self, query):
+        pattern = re.compile(query, re.IGNORECASE | re.MULTILINE)
+        return ((m.start(), m.end()) for m in pattern.finditer(self.folded) if m.end() > m.start())
+
+    def _candidate_words(self, token, bounded_start, bounded_end, is_cancelled=never_cancelled):
+        """Yield (word, offset of token within word) for vocabulary words that can contain the token"""
+        if bounded_start and bounded_end:
+            if token in self.words:
+                yield token, 0
+            return
+        for i, word in enumerate(self.words):
+            if i % CANCEL_CHECK_INTERVAL == 0 and is_cancelled():
+                return
+            if bounded_start:
+                if word.startswith(token):
+                    yield word, 0
+            elif bounded_end:
+                if word.endswith(token):
+                    yield word, len(word) - len(token)
+            else:
+                pos = word.find(token)
+                while pos != -1:
+                    yield word, pos
+                    pos = word.find(token, pos + 1)
+
+    def _match_candidates(self, token, lead, bounded_start, bounded_end, pattern=None, literal=None,
+                          is_cancelled=never_cancelled):
+        """Verify each occurrence of candidate words against the full query"""
+        folded = self.folded
+        results = []
+        for word, inner in self._candidate_words(token, bounded_start, bounded_end, is_cancelled):
+            if is_cancelled():
+                break
+            for word_start in self.words[word]:
+                start = word_start + inner - lead
+                if start < 0:
+                    continue
+                if pattern is not None:
+                    match = pattern.match(folded, start)
+                    if match:
+                        results.append((start, match.end()))
+                elif folded.startswith(literal, start):
+                    results.append((start, start + len(literal)))
+        results.sort()
+        return results
+
+    def _scan(self, folded_query, is_cancelled=never_cancelled):
+        """Linear scan for queries with no word characters to look up"""
+        folded = self.folded
+        results = []
+        pos = folded.find(folded_query)
+        while pos != -1:
+            if len(results) % CANCEL_CHECK_INTERVAL == 0 and is_cancelled():
+                break
+            results.append((pos, pos + len(folded_query)))
+            pos = folded.find(folded_query, pos + 1)
+        return results
+
+    def to_dict(self):
+        """Serialize the word index; the text itself is stored separately"""
+        return {
+            'version': INDEX_FORMAT_VERSION,
+            'length': self.length,
+            'page_starts': self.page_starts,
+            'page_numbers': self.page_numbers,
+            'words': {word: base64.b64encode(positions.tobytes()).decode('ascii')
+                      for word, positions in self.words.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, text):
+        """Rebuild an index from to_dict() output and the document text it was built from"""
+        if data.get('version') != INDEX_FORMAT_VERSION:
+            raise ValueError("Unsupported search index version")
+        index = cls()
+        index._folded_parts = [fold_text(text)]
+        index.length = data['length']
+        index.page_starts = data['page_starts']
+        index.page_numbers = data['page_numbers']
+        for word, encoded in data['words'].items():
+            positions = array('I')
+            positions.frombytes(base64.b64decode(encoded))
+            index.words[word] = positions
+        return index
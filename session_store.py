@@ -0,0 +1,54 @@
+import threading
+
+from perf import stats
+
+# Seconds changes are collected for before they are written in one batch
+DEFAULT_SAVE_DELAY = 2.0
+
+
+class SessionStore:
+    """Per-document session state (scroll position, narration offset, search, voice).
+
+    update() only merges the change into memory and is safe to call from any
+    thread, including on every scroll event. The first pending change starts
+    a timer; when it fires, everything changed since is written to the
+    library in a single transaction, off the calling thread. close() writes
+    whatever is still pending.
+    """
+
+    def __init__(self, library, delay=DEFAULT_SAVE_DELAY):
+        self.library = library
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._pending = {}  # path -> fields changed since the last write
+        self._timer = None
+
+    def load(self, path):
+        """Return the saved state for a document, including changes not yet written"""
+        state = self.library.load_session(path)
+        with self._lock:
+            state.update(self._pending.get(path, {}))
+        return state
+
+    def update(self, path, **fields):
+        with self._lock:
+            self._pending.setdefault(path, {}).update(fields)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write all pending changes now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        if pending:
+            with stats.timer('session.save'):
+                self.library.save_sessions(pending)
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self.flush()
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from audio_cache import AudioCache, CachedSynthesizer, EmptyClipError
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AudioCache(str(tmp_path / "audio"))
+
+
+class CountingBackend:
+    """Returns the text as its clip, in two parts when streamed, counting requests"""
+
+    def __init__(self, clip=None):
+        self.clip = clip
+        self.requests = []
+
+    def __call__(self, text):
+        self.requests.append(text)
+        return text.encode() if self.clip is None else self.clip
+
+    def iter_audio(self, text):
+        clip = self(text)
+        yield clip[:2]
+        yield clip[2:]
+
+
+def test_key_covers_the_voice_but_not_the_layout(cache):
+    key = cache.key("Hello  there,\nworld.", "gtts", "en", 150)
+    assert key == cache.key("Hello there, world.", "gtts", "en", 150)
+    assert len({key, cache.key("Hello there, world.", "http", "en", 150),
+                cache.key("Hello there, world.", "gtts", "fr", 150),
+                cache.key("Hello there, world.", "gtts", "en", 200)}) == 4
+
+
+def test_empty_clips_are_never_served(cache):
+    key = cache.key("Hello.", "gtts", "en", 150)
+    cache.put(key, b"")
+    assert not os.path.exists(cache.cache_dir)
+    # Left behind by older versions
+    os.makedirs(cache.cache_dir)
+    open(cache._path(key), 'wb').close()
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_clips_are_evicted(cache):
+    keys = [cache.key(f"Chunk {n}.", "gtts", "en", 150) for n in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, b"x" * 100)
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    assert cache.get(keys[0]) == b"x" * 100
+    cache.max_bytes = 250
+    cache.put(cache.key("Chunk 3.", "gtts", "en", 150), b"x" * 100)
+    assert [cache.get(key) is not None for key in keys] == [True, False, False]
+
+
+def test_repeated_chunks_are_synthesized_once(cache):
+    backend = CountingBackend()
+    synthesize = CachedSynthesizer(backend, cache, "gtts", "en", 150)
+    assert synthesize("Hello\nthere.") == b"Hello there."
+    assert b"".join(synthesize.iter_audio("Hello there.")) == b"Hello there."
+    assert backend.requests == ["Hello there."]
+
+
+def test_only_complete_streamed_clips_are_cached(cache):
+    backend = CountingBackend()
+    synthesize = CachedSynthesizer(backend, cache, "gtts", "en", 150)
+    parts = synthesize.iter_audio("Hello.")
+    assert next(parts) == b"He"
+    parts.close()  # Playback stopped mid-clip
+    assert b"".join(synthesize.iter_audio("Hello.")) == b"Hello."
+    assert b"".join(synthesize.iter_audio("Hello.")) == b"Hello."
+    assert len(backend.requests) == 2
+
+
+def test_empty_clip_raises_and_is_not_cached(cache):
+    backend = CountingBackend(clip=b"")
+    synthesize = CachedSynthesizer(backend, cache, "gtts", "en", 150)
+    for _ in range(2):
+        with pytest.raises(EmptyClipError):
+            synthesize("Hello.")
+    assert len(backend.requests) == 2
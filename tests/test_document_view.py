@@ -0,0 +1,101 @@
+import pytest
+
+from document_view import DocumentView, page_piece
+
+PAGES = [page_piece(n, f"Page {n} starts.\nLine two of page {n}.\nLast line {n}.") for n in range(30)]
+TEXT = ''.join(PAGES)
+
+
+class FakeText:
+    """The parts of a Tk Text widget DocumentView uses; the top visible line is set by yview()"""
+
+    def __init__(self):
+        self.text = ''
+        self.top = '1.0'
+        self.idle = []
+
+    def delete(self, start, end):
+        self.text = ''
+
+    def insert(self, index, text):
+        self.text = text + self.text if index == '1.0' else self.text + text
+
+    def index(self, index):
+        return self.top if index == '@0,0' else index
+
+    def see(self, index):
+        self.top = index
+
+    def yview(self, index):
+        self.top = index
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def run_idle(self):
+        callbacks, self.idle = self.idle, []
+        for callback in callbacks:
+            callback()
+
+
+@pytest.fixture
+def view():
+    return DocumentView(FakeText(), window_pages=2)
+
+
+def resident_text(view):
+    return TEXT[view.window_start:view.window_end]
+
+
+def test_appending_fills_the_window_then_stops(view):
+    view.append_pieces(PAGES[:3])
+    view.append_pieces(PAGES[3:])
+    assert (view.first, view.last) == (0, view.max_resident)
+    assert view.widget.text == resident_text(view) == ''.join(PAGES[:5])
+    offset = TEXT.index("Line two of page 3")
+    assert view.contains(offset) and not view.contains(len(PAGES[0]) * 6)
+    assert view.to_offset(view.to_index(offset)) == offset
+
+
+def test_showing_a_distant_offset_recenters_the_window(view):
+    view.append_pieces(PAGES)
+    offset = TEXT.index("Last line 20")
+    index = view.show_offset(offset)
+    assert (view.first, view.last) == (18, 23)
+    assert view.widget.text == resident_text(view)
+    assert view.to_offset(index) == offset
+    # The end of the document is resident once the window reaches it
+    view.show_offset(len(TEXT))
+    assert view.last == len(PAGES) and view.contains(len(TEXT))
+
+
+def test_scrolling_near_an_end_shifts_the_window_and_keeps_the_view(view):
+    view.append_pieces(PAGES)
+    view.show_page(10)
+    top = TEXT.index("Line two of page 12")
+    view.widget.yview(view.to_index(top))
+    view.check_scroll(0.6, 0.97)
+    view.check_scroll(0.6, 0.98)
+    assert len(view.widget.idle) == 1
+    view.widget.run_idle()
+    assert (view.first, view.last) == (10, 15)
+    assert view.to_offset('@0,0') == top
+
+
+def test_pages_not_yet_loaded_are_requested_and_filled_in(view):
+    requests = []
+    view.append_pieces(PAGES[:3])
+    view.set_page_source(len(PAGES), requests.append)
+    view.show_page(20)
+    assert requests == [[20, 19, 21, 18, 22]]
+    assert view.window_start is None and view.to_offset('1.0') is None
+    assert "Page 21 starts" not in view.widget.text
+
+    view.receive_page(21, PAGES[21])
+    view.receive_page(5, PAGES[5])  # No longer resident, so dropped
+    view.widget.run_idle()
+    assert "Page 21 starts" in view.widget.text and 5 not in view.fetched
+    # Once the loader catches up, offsets are known again
+    view.append_pieces(PAGES[3:])
+    view.widget.run_idle()
+    assert view.widget.text == resident_text(view)
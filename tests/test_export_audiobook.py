@@ -0,0 +1,74 @@
+import pytest
+
+from benchmark import write_synthetic_pdf
+from export_audiobook import CHAPTER_HEADING, AudiobookExporter, iter_chapters, main
+from tts_backends import HTTP_TTS_URL_ENV
+
+
+@pytest.mark.parametrize("line", [
+    "Chapter 3",
+    "Chapter 3: The Storm",
+    "Chapter 3 The Storm",
+    "CHAPTER IV",
+    "chapter xii",
+    "Part One — Beginnings",
+    "Part II",
+    "Chapter Twenty-One",
+    "Chapter Seventeen.",
+    "Book First",
+])
+def test_headings_are_recognized(line):
+    assert CHAPTER_HEADING.match(line + "\nThe text of the chapter begins here.")
+
+
+@pytest.mark.parametrize("line", [
+    "Part of the reason was the weather.",
+    "Book reviews were mixed.",
+    "Chapter and verse, she said.",
+    "Book I read last summer.",
+    "Chapter 3 was the longest.",
+    "Part civil, part rude.",
+    "Part one of the problem is cost.",
+])
+def test_body_text_is_not_a_heading(line):
+    assert not CHAPTER_HEADING.match(line)
+
+
+def test_pages_split_at_headings():
+    pages = ["Chapter 1\nIt begins.", "More of one.", "Chapter 2\nIt goes on.", "Part of the reason is this."]
+    assert list(iter_chapters(pages)) == [
+        "Chapter 1\nIt begins.\n\nMore of one.",
+        "Chapter 2\nIt goes on.\n\nPart of the reason is this.",
+    ]
+
+
+def test_pages_split_by_count_without_headings():
+    pages = [f"Page {n}." for n in range(5)]
+    assert list(iter_chapters(pages, pages_per_chapter=2)) == ["Page 0.\n\nPage 1.", "Page 2.\n\nPage 3.", "Page 4."]
+
+
+def test_blank_pages_are_skipped():
+    assert list(iter_chapters(["", "  \n", "Only page."])) == ["Only page."]
+
+
+def test_unconfigured_engine_is_rejected(monkeypatch, capsys):
+    monkeypatch.delenv(HTTP_TTS_URL_ENV, raising=False)
+    with pytest.raises(SystemExit) as exit_info:
+        main(["book.pdf", "--engine", "http"])
+    assert exit_info.value.code == 2
+    assert "invalid choice: 'http'" in capsys.readouterr().err
+
+
+def test_books_with_the_same_name_get_their_own_chapters(tmp_path):
+    paths = []
+    for seed, folder in enumerate(["first", "second"]):
+        (tmp_path / folder).mkdir()
+        paths.append(str(tmp_path / folder / "book.pdf"))
+        write_synthetic_pdf(paths[-1], 2, lines_per_page=4, words_per_line=6, seed=seed)
+    exporter = AudiobookExporter(str(tmp_path / "out"), engine="gtts", workers=2, pages_per_chapter=5, cache_dir="",
+                                 synthesize=lambda text: text.encode())
+    stats = exporter.run(paths)
+    assert stats['documents'] == 2
+    chapters = sorted((tmp_path / "out").glob("*/chapter_001.mp3"))
+    assert len(chapters) == 2
+    assert chapters[0].read_bytes() != chapters[1].read_bytes()
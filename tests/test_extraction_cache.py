@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+import extraction_cache
+from extraction_cache import ExtractionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "book.pdf"
+    path.write_bytes(b"%PDF-1.4 first version")
+    return str(path)
+
+
+def entries(cache):
+    return sorted(os.listdir(cache.cache_dir))
+
+
+def test_entries_are_kept_per_kind(cache, pdf):
+    assert cache.get(pdf) is None and not cache.contains(pdf)
+    cache.put(pdf, ["page one", "página dos"])
+    cache.put(pdf, {'words': {}}, kind='index')
+    assert cache.get(pdf) == ["page one", "página dos"]
+    assert cache.get(pdf, kind='index') == {'words': {}}
+    assert cache.contains(pdf) and not cache.contains(pdf, kind='sentences')
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_a_changed_file_misses_and_replaces_its_old_entries(cache, pdf):
+    cache.put(pdf, ["old"])
+    cache.put(pdf, {}, kind='index')
+    stat = os.stat(pdf)
+    # Same size and modification time, different content
+    with open(pdf, 'wb') as f:
+        f.write(b"%PDF-1.4 other version")
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.get(pdf) is None
+    cache.put(pdf, ["new"])
+    assert cache.get(pdf) == ["new"]
+    assert len(entries(cache)) == 1
+
+
+def test_entries_from_another_format_version_are_ignored(cache, pdf, monkeypatch):
+    cache.put(pdf, ["page"])
+    monkeypatch.setattr(extraction_cache, "CACHE_FORMAT_VERSION", extraction_cache.CACHE_FORMAT_VERSION + 1)
+    assert cache.get(pdf) is None
+
+
+def test_least_recently_used_documents_are_evicted(tmp_path, cache):
+    paths = []
+    for n in range(3):
+        path = tmp_path / f"book{n}.pdf"
+        path.write_bytes(b"%PDF " + bytes([n]))
+        paths.append(str(path))
+        cache.put(paths[-1], [os.urandom(2000).hex()])
+
+    def entry(path):
+        return cache._entry_path(*cache.document_key(path), 'pages')
+
+    for age, path in enumerate(paths):
+        os.utime(entry(path), (1000 + age, 1000 + age))
+    # Reading the oldest document makes it the most recently used
+    assert cache.get(paths[0]) is not None
+    cache.max_bytes = sum(os.path.getsize(entry(path)) for path in paths) - 1
+    cache.evict()
+    assert [os.path.exists(entry(path)) for path in paths] == [True, False, True]
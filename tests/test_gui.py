@@ -0,0 +1,58 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from extraction_cache import ExtractionCache
+from gui import PDFReaderApp, VoiceSettings
+from library import STATUS_MISSING, Library
+from scheduler import CancellationToken
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A reader without a window, with the parts the loader uses on a worker thread"""
+    app = PDFReaderApp.__new__(PDFReaderApp)
+    app.extraction_cache = ExtractionCache(str(tmp_path / "cache"))
+    app.library = Library(str(tmp_path / "library.sqlite3"))
+    app.posted = []
+    app.post_to_ui = app.posted.append
+    yield app
+    app.library.close()
+
+
+def test_missing_file_keeps_its_error_type(app, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(app.iter_document_pieces(str(tmp_path / "gone.pdf")))
+
+
+def test_loading_a_vanished_document_marks_it_missing(app, tmp_path):
+    path = app.library.add(str(tmp_path / "gone.pdf"), opened=True)
+    errors = []
+    app._pdf_error_callback = lambda message, show_dialog=True: errors.append((message, show_dialog))
+    app._load_pdf_thread(path, 1, CancellationToken(), restoring=True)
+    assert app.library.get(path).status == STATUS_MISSING
+    for callback in app.posted:
+        callback()
+    assert errors == [(f"File not found: {path}", False)]
+
+
+def test_broken_pdf_is_reported_as_a_read_error(app, tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    with pytest.raises(Exception, match="Error reading PDF"):
+        list(app.iter_document_pieces(str(path)))
+
+
+def test_backend_is_only_replaced_when_its_voice_changes(app):
+    app.tts_backends = {}
+    app.tts_backend_users = Counter()
+    app.tts_backends_lock = threading.Lock()
+    with app.tts_backend("gtts", VoiceSettings("gtts", "en", 150)) as first:
+        pass
+    # gTTS has no rate control, so a new rate keeps the backend and its connections
+    with app.tts_backend("gtts", VoiceSettings("gtts", "en", 200)) as backend:
+        assert backend is first
+    with app.tts_backend("gtts", VoiceSettings("gtts", "fr", 200)) as backend:
+        assert backend is not first and backend.language == "fr"
+    assert not app.tts_backend_users
@@ -0,0 +1,47 @@
+import pytest
+
+from benchmark import write_synthetic_pdf
+from lazy_document import LazyDocument
+from pdf_extraction import PageExtractor
+from text_normalization import REPEAT_WINDOW, normalize_page_at
+
+PAGES = 30
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "book.pdf")
+    write_synthetic_pdf(path, PAGES, lines_per_page=5, words_per_line=6, seed=5)
+    return path
+
+
+def test_pages_match_a_full_extraction(pdf_path):
+    expected = PageExtractor(workers=1).extract_pages(pdf_path)
+    with LazyDocument(pdf_path, read_ahead=3) as document:
+        assert len(document) == PAGES
+        assert [document.get_page(n) for n in (12, 0, PAGES - 1, 12)] == [expected[n] for n in (12, 0, PAGES - 1, 12)]
+        assert [text for _, text in document.iter_pages(stop=5)] == expected[:5]
+        with pytest.raises(IndexError):
+            document.get_page(PAGES)
+    with pytest.raises(ValueError):
+        document.get_page(0)
+
+
+def test_only_pages_near_the_last_request_are_kept(pdf_path):
+    with LazyDocument(pdf_path, read_ahead=0, keep_behind=2) as document:
+        longest = 0
+        for page_num in range(PAGES):
+            document.get_page(page_num)
+            assert set(document._pages) <= set(range(page_num - 2, page_num + 1))
+            longest = max(longest, len(document.get_page(page_num)))
+        assert document.cached_chars <= 3 * longest
+        document.get_page(3)
+        assert set(document._pages) == {3}
+
+
+def test_neighbours_read_for_normalizing_stay_cached(pdf_path):
+    with LazyDocument(pdf_path) as document:
+        page = 2 * REPEAT_WINDOW
+        normalize_page_at(page, PAGES, document.get_page)
+        # The next page's neighbours are mostly the same pages
+        assert set(range(page - REPEAT_WINDOW, page + REPEAT_WINDOW + 1)) <= set(document._pages)
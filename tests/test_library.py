@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from benchmark import write_synthetic_pdf
+from extraction_cache import ExtractionCache
+from library import (STATUS_INDEXED, STATUS_MISSING, STATUS_QUEUED, Library, LibraryIndexer,
+                     search_library)
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = Library(str(tmp_path / "library.sqlite3"))
+    yield library
+    library.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(str(tmp_path / "cache"))
+
+
+def make_pdf(tmp_path, name, pages=3, seed=0):
+    path = str(tmp_path / name)
+    write_synthetic_pdf(path, pages, lines_per_page=6, words_per_line=8, seed=seed)
+    return path
+
+
+def indexed(library, cache, path):
+    """Add a document and index it the way the background indexer does"""
+    library.add(path)
+    LibraryIndexer(library, cache).index_document(library.get(path))
+    return library.get(path)
+
+
+def test_recent_and_queue_order(tmp_path, library):
+    first = library.add(str(tmp_path / "a.pdf"), opened=True)
+    second = library.add(str(tmp_path / "b.pdf"))
+    third = library.add(str(tmp_path / "c.pdf"), opened=True)
+    assert [entry.path for entry in library.recent()] == [third, first]
+    # Opened documents are indexed first, most recent first
+    assert library.next_queued().path == third
+    library.set_status(third, STATUS_INDEXED)
+    library.set_status(first, STATUS_INDEXED)
+    assert library.next_queued().path == second
+    library.remove(second)
+    assert library.next_queued() is None and len(library) == 2
+
+
+def test_adding_twice_keeps_one_entry(tmp_path, library):
+    path = library.add(str(tmp_path / "book.pdf"))
+    library.set_status(path, STATUS_INDEXED)
+    library.add(path, opened=True)
+    assert len(library) == 1
+    assert library.get(path).status == STATUS_INDEXED
+    assert library.get(path).last_opened is not None
+
+
+def test_indexing_makes_a_document_searchable(tmp_path, library, cache):
+    entry = indexed(library, cache, make_pdf(tmp_path, "book.pdf"))
+    assert entry.status == STATUS_INDEXED and entry.page_count == 3
+    matches = list(search_library(library, cache, "the"))
+    assert [match.entry.path for match in matches] == [entry.path]
+    assert matches[0].count > 0 and "the" in matches[0].snippet.lower()
+    assert list(search_library(library, cache, "zzzz")) == []
+
+
+def test_evicted_document_is_queued_again(tmp_path, library, cache):
+    entry = indexed(library, cache, make_pdf(tmp_path, "book.pdf"))
+    for name in os.listdir(cache.cache_dir):
+        os.remove(os.path.join(cache.cache_dir, name))
+    woken = []
+    assert list(search_library(library, cache, "the", on_requeue=lambda: woken.append(True))) == []
+    assert library.get(entry.path).status == STATUS_QUEUED and woken
+    LibraryIndexer(library, cache).index_document(library.get(entry.path))
+    assert len(list(search_library(library, cache, "the"))) == 1
+
+
+def test_rescan_finds_changed_evicted_and_missing_documents(tmp_path, library, cache):
+    changed = indexed(library, cache, make_pdf(tmp_path, "changed.pdf"))
+    evicted = indexed(library, cache, make_pdf(tmp_path, "evicted.pdf", seed=1))
+    unchanged = indexed(library, cache, make_pdf(tmp_path, "unchanged.pdf", seed=2))
+    deleted = indexed(library, cache, make_pdf(tmp_path, "deleted.pdf", seed=3))
+    make_pdf(tmp_path, "changed.pdf", pages=4)
+    path_key, _ = cache.document_key(evicted.path)
+    for name in os.listdir(cache.cache_dir):
+        if name.startswith(path_key):
+            os.remove(os.path.join(cache.cache_dir, name))
+    os.remove(deleted.path)
+
+    LibraryIndexer(library, cache).rescan()
+    statuses = {entry.path: entry.status for entry in library.entries()}
+    assert statuses == {changed.path: STATUS_QUEUED, evicted.path: STATUS_QUEUED,
+                        unchanged.path: STATUS_INDEXED, deleted.path: STATUS_MISSING}
+
+
+def test_indexing_a_vanished_document_marks_it_missing(tmp_path, library, cache):
+    path = library.add(str(tmp_path / "gone.pdf"))
+    LibraryIndexer(library, cache).index_document(library.get(path))
+    assert library.get(path).status == STATUS_MISSING
+
+
+def test_stopped_indexer_leaves_the_document_queued(tmp_path, library, cache):
+    path = library.add(make_pdf(tmp_path, "book.pdf"))
+    indexer = LibraryIndexer(library, cache, is_idle=lambda: False)
+    indexer.stop()
+    assert indexer.index_document(library.get(path)) is False
+    assert library.get(path).status == STATUS_QUEUED
+    assert not cache.contains(path)
+
+
+def test_sessions_merge_fields(tmp_path, library):
+    path = library.add(str(tmp_path / "book.pdf"))
+    library.save_sessions({path: {'search_query': "fox", 'narration_offset': 10}})
+    library.save_sessions({path: {'narration_offset': 42}})
+    assert library.load_session(path) == {'search_query': "fox", 'narration_offset': 42}
+    assert library.get(path).last_position == 42
+    assert library.load_session(str(tmp_path / "other.pdf")) == {}
@@ -0,0 +1,110 @@
+import pytest
+
+from document_view import DocumentView, page_piece
+from narration_cursor import NarrationCursor
+
+PAGES = [page_piece(n, f"Page {n} begins here. It has a second sentence.") for n in range(20)]
+TEXT = ''.join(PAGES)
+
+
+class FakeText:
+    """A Text widget that records tag operations and runs its after() timer by hand"""
+
+    def __init__(self):
+        self.text = ''
+        self.tags = {}
+        self.tag_calls = 0
+        self.timer = None
+        self.visible = True
+        self.seen = []
+
+    def delete(self, start, end):
+        self.text = ''
+        self.tags = {}
+
+    def insert(self, index, text):
+        self.text += text
+
+    def index(self, index):
+        return index
+
+    def see(self, index):
+        self.seen.append(index)
+
+    def yview(self, index):
+        pass
+
+    def after_idle(self, callback):
+        pass
+
+    def after(self, ms, callback):
+        self.timer = callback
+        return "timer"
+
+    def after_cancel(self, after_id):
+        self.timer = None
+
+    def tag_add(self, tag, start, end):
+        self.tag_calls += 1
+        self.tags[tag] = (start, end)
+
+    def tag_remove(self, tag, start, end):
+        self.tag_calls += 1
+        self.tags.pop(tag, None)
+
+    def bbox(self, index):
+        return (0, 0, 10, 10) if self.visible else None
+
+    def tick(self):
+        self.timer()
+
+
+@pytest.fixture
+def cursor():
+    view = DocumentView(FakeText(), window_pages=2)
+    view.append_pieces(PAGES)
+    cursor = NarrationCursor(view)
+    cursor.start()
+    return cursor
+
+
+def tagged_text(cursor, tag):
+    start, end = (cursor.view.to_offset(index) for index in cursor.widget.tags[tag])
+    return TEXT[start:end]
+
+
+def test_only_the_latest_word_is_applied_per_tick(cursor):
+    sentence = TEXT.index("Page 1 begins")
+    cursor.set_sentence(sentence, sentence + len("Page 1 begins here. "))
+    for word in ("Page", "1", "begins", "here"):
+        start = TEXT.index(word, sentence)
+        cursor.set_word(start, start + len(word))
+    cursor.widget.tick()
+    assert tagged_text(cursor, 'narration_word') == "here"
+    assert tagged_text(cursor, 'narration_sentence') == "Page 1 begins here. "
+    assert cursor.widget.tag_calls == 2
+    # Nothing changed, so the next tick leaves the tags alone
+    cursor.widget.tick()
+    assert cursor.widget.tag_calls == 2 and cursor.widget.seen == []
+
+
+def test_a_word_off_screen_scrolls_and_one_outside_the_window_moves_it(cursor):
+    cursor.widget.visible = False
+    start = TEXT.index("Page 2 begins")
+    cursor.set_word(start, start + 4)
+    cursor.widget.tick()
+    assert len(cursor.widget.seen) == 1
+
+    start = TEXT.index("Page 15 begins")
+    cursor.set_word(start, start + 4)
+    cursor.widget.tick()
+    assert cursor.view.first <= 15 < cursor.view.last
+    assert tagged_text(cursor, 'narration_word') == "Page"
+
+
+def test_stop_removes_the_highlight_and_the_timer(cursor):
+    start = TEXT.index("Page 0 begins")
+    cursor.set_sentence(start, start + 20)
+    cursor.widget.tick()
+    cursor.stop()
+    assert cursor.widget.tags == {} and cursor.widget.timer is None and not cursor.running
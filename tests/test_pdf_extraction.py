@@ -0,0 +1,39 @@
+from concurrent.futures import CancelledError
+
+import pytest
+
+from benchmark import write_synthetic_pdf
+from pdf_extraction import PageExtractor
+from scheduler import CancellationToken
+
+PAGES = 40
+
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "book.pdf")
+    write_synthetic_pdf(path, PAGES, lines_per_page=5, words_per_line=6, seed=3)
+    return path
+
+
+@pytest.fixture(scope="module")
+def serial_pages(pdf_path):
+    return PageExtractor(workers=1).extract_pages(pdf_path)
+
+
+@pytest.mark.parametrize("start_page", [0, 7])
+def test_parallel_pages_arrive_in_order(pdf_path, serial_pages, start_page):
+    progress = []
+    extractor = PageExtractor(workers=2, serial_threshold=1)
+    pages = list(extractor.iter_pages(pdf_path, lambda done, total: progress.append((done, total)),
+                                      start_page=start_page))
+    assert pages == list(enumerate(serial_pages))[start_page:]
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    assert progress[-1] == (PAGES, PAGES)
+
+
+def test_cancelled_token_stops_the_workers(pdf_path):
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(CancelledError):
+        list(PageExtractor(workers=2, serial_threshold=1).iter_pages(pdf_path, token=token))
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, Scheduler
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(**kwargs):
+        scheduler = Scheduler(**kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def blocker(started, release):
+    """A job that signals it has started, then waits for release"""
+    def run(token):
+        started.set()
+        release.wait(TIMEOUT)
+    return run
+
+
+def test_lane_cancels_the_earlier_job_and_waits_for_it(make_scheduler):
+    scheduler = make_scheduler()
+    events = []
+    started = threading.Event()
+
+    def first(token):
+        started.set()
+        token.wait(TIMEOUT)
+        events.append(("first cancelled", token.cancelled))
+
+    first_job = scheduler.submit(first, lane="narration")
+    assert started.wait(TIMEOUT)
+    second_job = scheduler.submit(lambda token: events.append(("second", token.cancelled)), lane="narration")
+    assert second_job.wait(TIMEOUT) and first_job.done
+    assert events == [("first cancelled", True), ("second", False)]
+
+
+def test_queued_job_replaced_in_its_lane_never_runs(make_scheduler):
+    scheduler = make_scheduler(workers=1)
+    started, release = threading.Event(), threading.Event()
+    scheduler.submit(blocker(started, release))
+    assert started.wait(TIMEOUT)
+    ran = []
+    dropped = scheduler.submit(lambda token: ran.append("dropped"), lane="search")
+    kept = scheduler.submit(lambda token: ran.append("kept"), lane="search")
+    assert dropped.cancelled
+    release.set()
+    assert kept.wait(TIMEOUT) and dropped.wait(TIMEOUT)
+    assert ran == ["kept"]
+
+
+def test_cancel_lane(make_scheduler):
+    scheduler = make_scheduler()
+    started = threading.Event()
+    job = scheduler.submit(lambda token: started.set() or token.wait(TIMEOUT), lane="pages")
+    assert started.wait(TIMEOUT)
+    scheduler.cancel_lane("pages")
+    assert job.wait(TIMEOUT) and job.cancelled
+
+
+def test_most_urgent_job_runs_first(make_scheduler):
+    scheduler = make_scheduler(workers=1)
+    started, release = threading.Event(), threading.Event()
+    scheduler.submit(blocker(started, release))
+    assert started.wait(TIMEOUT)
+    order = []
+    jobs = [scheduler.submit(lambda token, name=name: order.append(name), priority=priority)
+            for name, priority in [("background", PRIORITY_BACKGROUND), ("normal", PRIORITY_NORMAL),
+                                   ("interactive", PRIORITY_INTERACTIVE), ("normal 2", PRIORITY_NORMAL)]]
+    release.set()
+    assert all(job.wait(TIMEOUT) for job in jobs)
+    assert order == ["interactive", "normal", "normal 2", "background"]
+
+
+def test_background_jobs_are_capped(make_scheduler):
+    scheduler = make_scheduler(workers=3, max_background=1)
+    first_started, second_started, release = threading.Event(), threading.Event(), threading.Event()
+    scheduler.submit(blocker(first_started, release), priority=PRIORITY_BACKGROUND)
+    second = scheduler.submit(blocker(second_started, release), priority=PRIORITY_BACKGROUND)
+    assert first_started.wait(TIMEOUT)
+    # Interactive work still finds a free worker while the second background job waits
+    assert scheduler.submit(lambda token: None, priority=PRIORITY_INTERACTIVE).wait(TIMEOUT)
+    assert not second_started.is_set()
+    release.set()
+    assert second.wait(TIMEOUT) and second_started.is_set()
+
+
+def test_is_idle_ignores_background_work(make_scheduler):
+    scheduler = make_scheduler()
+    started, release = threading.Event(), threading.Event()
+    scheduler.submit(blocker(started, release), priority=PRIORITY_BACKGROUND)
+    assert started.wait(TIMEOUT)
+    assert scheduler.is_idle()
+    interactive_started = threading.Event()
+    job = scheduler.submit(blocker(interactive_started, release), priority=PRIORITY_INTERACTIVE)
+    assert interactive_started.wait(TIMEOUT)
+    assert not scheduler.is_idle()
+    release.set()
+    assert job.wait(TIMEOUT)
+
+
+def test_failed_job_keeps_its_error(make_scheduler):
+    scheduler = make_scheduler()
+
+    def fail(token):
+        raise ValueError("broken")
+
+    job = scheduler.submit(fail, name="fails")
+    assert job.wait(TIMEOUT)
+    assert isinstance(job.error, ValueError)
@@ -0,0 +1,100 @@
+import re
+
+import pytest
+
+from search_index import SearchIndex, fold_text
+
+PAGES = [
+    "The quick brown fox jumps over the lazy dog.\nThen the fox rests; other foxes watch.",
+    "Theatre-goers saw the theme: \"the end\". Aaa aaaa, the THE tHe.\n\n",
+    "Straße and STRASSE are spelled differently. Foxtrot, fox-trot, fox   trot!",
+    "",
+    "Père Noël, naïve café... the 3rd of 33 items; x=1+2.",
+]
+TEXT = ''.join(PAGES)
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = SearchIndex()
+    for page_num, page in enumerate(PAGES):
+        index.add_text(page, page_num)
+    return index
+
+
+def naive(query, mode):
+    """Every match found by scanning the casefolded text directly"""
+    folded = fold_text(TEXT)
+    folded_query = fold_text(query)
+    if mode == "text":
+        return [(m.start(), m.start() + len(folded_query))
+                for m in re.finditer('(?=' + re.escape(folded_query) + ')', folded)]
+    if mode == "word":
+        pattern = r'\b' + re.escape(folded_query) + r'\b'
+    elif mode == "prefix":
+        pattern = r'\b' + re.escape(folded_query)
+    elif mode == "phrase":
+        pattern = r'\b' + r'\W+'.join(map(re.escape, re.findall(r'\w+', folded_query))) + r'\b'
+    return [m.span() for m in re.finditer(pattern, folded)]
+
+
+QUERIES = ["the", "The", "he", "fox", "fox trot", "x", "aa", "e q", "é", "straße", "3", "s t", "x=1"]
+
+
+@pytest.mark.parametrize("mode", ["text", "word", "prefix"])
+@pytest.mark.parametrize("query", QUERIES)
+def test_find_all_matches_naive_scan(index, query, mode):
+    assert index.find_all(query, mode) == naive(query, mode)
+
+
+@pytest.mark.parametrize("query", ["; ", "...", ".", "\n\n"])
+def test_queries_without_words_are_scanned(index, query):
+    assert index.find_all(query) == naive(query, "text")
+
+
+@pytest.mark.parametrize("query", ["the fox", "FOX TROT", "fox-trot", "the end", "3rd of 33", "dog then"])
+def test_phrase_matches_naive_scan(index, query):
+    assert index.find_all(query, "phrase") == naive(query, "phrase")
+
+
+def test_regex_and_empty_queries(index):
+    assert index.find_all(r"fox\w*", "regex") == [m.span() for m in re.finditer(r"fox\w*", fold_text(TEXT))]
+    assert index.find_all("", "text") == []
+    with pytest.raises(re.error):
+        index.find_all("(", "regex")
+
+
+@pytest.mark.parametrize("mode", ["text", "prefix"])
+def test_refine_matches_a_fresh_search(index, mode):
+    previous = index.find_all("t", mode)
+    for query in ["th", "the", "then", "ther"]:
+        assert index.refine(previous, query) == index.find_all(query, mode)
+
+
+def test_iter_find_batches_add_up_to_find_all(index):
+    batches = list(index.iter_find("e", batch_size=4))
+    assert all(len(batch) <= 4 for batch in batches)
+    assert sum(batches, []) == index.find_all("e")
+    previous = ("fo", "text", index.find_all("fo"))
+    assert sum(index.iter_find("fox", "text", previous, batch_size=2), []) == index.find_all("fox")
+
+
+def test_cancelled_search_stops(index):
+    assert index.find_all("e", is_cancelled=lambda: True) == []
+    assert list(index.iter_find(";", is_cancelled=lambda: True)) == []
+
+
+def test_serialized_index_finds_the_same_matches(index):
+    restored = SearchIndex.from_dict(index.to_dict(), TEXT)
+    for query in QUERIES:
+        assert restored.find_all(query) == index.find_all(query)
+    assert restored.page_for_offset(TEXT.index("Straße")) == 2
+
+
+def test_build_with_page_starts_matches_adding_pages(index):
+    page_starts = [sum(map(len, PAGES[:n])) for n in range(len(PAGES))]
+    built = SearchIndex.build(TEXT, page_starts)
+    assert built.find_all("the") == index.find_all("the")
+    for offset in (0, TEXT.index("Theatre"), TEXT.index("Straße"), TEXT.index("Père"), len(TEXT) - 1):
+        assert built.page_for_offset(offset) == index.page_for_offset(offset)
+    assert SearchIndex.build(TEXT).page_for_offset(TEXT.index("Père")) == 0
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from library import Library
+from session_store import SessionStore
+
+TIMEOUT = 5
+
+
+class CountingLibrary(Library):
+    """A library that reports each batch of sessions it writes"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.batches = []
+        self.saved = threading.Event()
+
+    def save_sessions(self, sessions):
+        super().save_sessions(sessions)
+        self.batches.append(sessions)
+        self.saved.set()
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = CountingLibrary(str(tmp_path / "library.sqlite3"))
+    yield library
+    library.close()
+
+
+def test_changes_are_merged_and_written_in_one_batch(tmp_path, library):
+    first = library.add(str(tmp_path / "first.pdf"))
+    second = library.add(str(tmp_path / "second.pdf"))
+    store = SessionStore(library, delay=0.05)
+    for offset in range(0, 500, 10):
+        store.update(first, scroll_offset=offset)
+    store.update(first, search_query="fox")
+    store.update(second, narration_offset=7)
+    assert library.saved.wait(TIMEOUT)
+    assert library.batches == [{first: {'scroll_offset': 490, 'search_query': "fox"},
+                                second: {'narration_offset': 7}}]
+    assert library.load_session(first) == {'scroll_offset': 490, 'search_query': "fox"}
+
+
+def test_load_includes_changes_not_yet_written(tmp_path, library):
+    path = library.add(str(tmp_path / "book.pdf"))
+    library.save_sessions({path: {'search_query': "fox", 'scroll_offset': 3}})
+    library.batches.clear()
+    store = SessionStore(library, delay=TIMEOUT * 10)
+    store.update(path, scroll_offset=40)
+    assert store.load(path) == {'search_query': "fox", 'scroll_offset': 40}
+    assert library.batches == []
+    # Closing writes what is pending instead of waiting for the timer
+    store.close()
+    assert library.batches == [{path: {'scroll_offset': 40}}]
+    assert library.load_session(path) == {'search_query': "fox", 'scroll_offset': 40}
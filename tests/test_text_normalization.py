@@ -0,0 +1,116 @@
+import pytest
+
+from text_normalization import (NormalizedPage, cache_normalized, document_sentence_ends, iter_normalized,
+                                load_normalized, normalize_page_at, page_number, sentence_span)
+from document_view import page_piece
+from extraction_cache import ExtractionCache
+
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+
+
+def body(page_num):
+    """Body text that differs from page to page"""
+    word = WORDS[page_num % len(WORDS)]
+    return f"The {word} section starts here.\nIt goes on about {word} for a while.\nThe {word} section ends."
+
+
+def normalize(raw_pages):
+    return [page.text for page in iter_normalized(raw_pages)]
+
+
+def test_running_header_and_page_numbers_are_dropped():
+    raw = [f"A Book Title\n{body(n)}\n{n + 1}" for n in range(8)]
+    for n, text in enumerate(normalize(raw)):
+        assert "A Book Title" not in text
+        assert text.startswith(f"The {WORDS[n]} section")
+        assert text.endswith("section ends.")
+
+
+def test_roman_page_numbers_in_sequence_are_dropped():
+    numerals = ["i", "ii", "iii", "iv", "v", "vi"]
+    raw = [f"{body(n)}\n{numeral}" for n, numeral in enumerate(numerals)]
+    for text in normalize(raw):
+        assert text.endswith("section ends.")
+
+
+def test_line_repeated_on_one_neighbour_is_kept():
+    # "Yes." ends page 2 and starts page 3; that is dialogue, not a header
+    raw = [body(n) for n in range(6)]
+    raw[2] += "\nYes."
+    raw[3] = "Yes.\n" + raw[3]
+    texts = normalize(raw)
+    assert texts[2].endswith("Yes.")
+    assert texts[3].startswith("Yes.")
+
+
+def test_lone_numerals_out_of_sequence_are_kept():
+    raw = [f"{body(n)}\n{n + 1}" for n in range(8)]
+    raw[4] = "I\n" + raw[4]  # Drop cap
+    raw[5] = "Mix\n" + raw[5]
+    raw[6] = "MD\n" + raw[6]
+    texts = normalize(raw)
+    assert texts[4].startswith("I ")
+    assert texts[5].startswith("Mix ")
+    assert texts[6].startswith("MD ")
+
+
+def test_drop_cap_does_not_continue_arabic_numbering():
+    # "I" has value 1 on the first page, like the arabic numbers around it
+    raw = [f"{body(n)}\n{n + 1}" for n in range(6)]
+    raw[0] = "I\n" + raw[0]
+    assert normalize(raw)[0].startswith("I ")
+
+
+def test_page_number_parsing():
+    assert page_number("12") == ('arabic', 12)
+    assert page_number("- 12 -") == ('arabic', 12)
+    assert page_number("Page 7 of 300") == ('arabic', 7)
+    assert page_number("xiv") == ('roman', 14)
+    assert page_number("---") is None
+    assert page_number("") is None
+    assert page_number("Chapter 1") is None
+
+
+def test_hyphenation_and_soft_breaks():
+    text = normalize(["A hyphen-\nated word and a soft\nbreak.\nNew line\n\nNext paragraph."])[0]
+    assert text == "A hyphenated word and a soft break.\nNew line\n\nNext paragraph."
+
+
+def test_streaming_matches_random_access():
+    raw = [f"Header\n{body(n)}\n{n + 1}" for n in range(12)]
+    raw[3] = ""
+    pages = list(iter_normalized(raw))
+    assert pages == [normalize_page_at(n, len(raw), raw.__getitem__) for n in range(len(raw))]
+
+
+def test_sentence_ends_map_to_document_offsets():
+    pages = list(iter_normalized([body(n) for n in range(3)]))
+    text = ''.join(page_piece(n, page.text) for n, page in enumerate(pages))
+    ends = document_sentence_ends(pages)
+    offset = text.index("goes on about bravo")
+    start, end = sentence_span(ends, offset, len(text))
+    assert text[start:end].strip() == "It goes on about bravo for a while."
+
+
+def test_cache_round_trip(tmp_path):
+    pdf_path = tmp_path / "doc.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    pages = list(iter_normalized([body(n) for n in range(3)]))
+    cache_normalized(cache, str(pdf_path), pages)
+    loaded = load_normalized(cache, str(pdf_path))
+    assert loaded == pages
+    assert all(isinstance(page, NormalizedPage) for page in loaded)
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("An exam-\nple.", "An example."),
+    ("A self-\ncontained page.", "A self-contained page."),
+    # The page's own spelling wins over the prefix list
+    ("A well-\nknown name, and well-known still.", "A well-known name, and well-known still."),
+    ("The co-\noperate rule: we cooperate.", "The cooperate rule: we cooperate."),
+    ("Data-\nbase rows; the data-base grew.", "Data-base rows; the data-base grew."),
+    ("Self-\nish acts are selfish.", "Selfish acts are selfish."),
+])
+def test_hyphenated_compounds_keep_their_hyphen(raw, expected):
+    assert normalize([raw]) == [expected]
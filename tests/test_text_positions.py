@@ -0,0 +1,50 @@
+from text_positions import LineIndex
+
+TEXT = "First line\nsecond\n\nfourth line is longer\nlast"
+
+
+def tk_index(text, offset):
+    """What Tk reports for "1.0+<offset>c"""
+    before = text[:offset]
+    line = before.count('\n')
+    column = offset - (before.rfind('\n') + 1)
+    return f"{line + 1}.{column}"
+
+
+def test_offsets_round_trip():
+    index = LineIndex(TEXT)
+    for offset in range(len(TEXT) + 1):
+        assert index.to_index(offset) == tk_index(TEXT, offset)
+        assert index.to_offset(index.to_index(offset)) == offset
+
+
+def test_to_indices_matches_to_index():
+    index = LineIndex(TEXT)
+    ranges = [(0, 5), (3, 12), (11, 11), (17, 19), (19, 40), (len(TEXT) - 4, len(TEXT))]
+    assert index.to_indices(ranges) == [(index.to_index(start), index.to_index(end)) for start, end in ranges]
+
+
+def test_to_indices_with_ranges_spanning_many_lines():
+    text = "\n".join(f"line {n}" for n in range(50))
+    index = LineIndex(text)
+    ranges = [(start, start + 30) for start in range(0, len(text) - 30, 7)]
+    indices = index.to_indices(ranges)
+    assert indices == [(tk_index(text, start), tk_index(text, end)) for start, end in ranges]
+    assert [(index.to_offset(a), index.to_offset(b)) for a, b in indices] == ranges
+
+
+def test_appending_matches_building_at_once():
+    index = LineIndex()
+    for piece in ["First line\nsec", "ond\n", "\nfourth line is longer", "\nlast"]:
+        index.append(piece)
+    whole = LineIndex(TEXT)
+    assert index.line_starts == whole.line_starts
+    assert index.length == whole.length == len(TEXT)
+
+
+def test_line_start_is_clamped():
+    index = LineIndex(TEXT)
+    assert index.line_start(1) == 0
+    assert index.line_start(3) == TEXT.index("\n\n") + 1
+    assert index.line_start(0) == 0
+    assert index.line_start(99) == TEXT.rindex("\n") + 1
@@ -0,0 +1,189 @@
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import tts_backends
+from tts_backends import GTTSBackend, HTTPBackend, gtts_internals_supported
+
+AUDIO_PARTS = [b"ID3-first-part", b"second-part", b"third-part"]
+
+
+class MockTTSServer:
+    """Local stand-in for a TTS service: fails the first few requests, then streams audio in parts"""
+
+    def __init__(self, failures=0, status=503):
+        self.failures = failures
+        self.status = status
+        self.requests = []
+        self.release = threading.Event()  # Set to let the server send the parts after the first
+        self.release.set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                server.requests.append((body, dict(self.headers)))
+                if len(server.requests) <= server.failures:
+                    self.send_response(server.status)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'audio/mpeg')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for i, part in enumerate(AUDIO_PARTS):
+                    if i == 1:
+                        server.release.wait(5)
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/tts"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.release.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(**kwargs):
+        server = MockTTSServer(**kwargs)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def make_backend(server, **kwargs):
+    return HTTPBackend(url=server.url, api_key="secret", voice="alloy", backoff=0.01, timeout=(2, 5), **kwargs)
+
+
+def test_request_body_and_headers(make_server):
+    server = make_server()
+    backend = make_backend(server, rate=300)
+    assert backend.synthesize("Hello there.") == b''.join(AUDIO_PARTS)
+    body, headers = server.requests[0]
+    assert body == {'input': "Hello there.", 'format': 'mp3', 'language': 'en', 'speed': 2.0, 'voice': 'alloy'}
+    assert headers['Authorization'] == "Bearer secret"
+    backend.close()
+
+
+def test_retries_with_backoff_after_server_errors(make_server):
+    server = make_server(failures=2)
+    backend = make_backend(server)
+    assert backend.synthesize("Retry me.") == b''.join(AUDIO_PARTS)
+    assert len(server.requests) == 3
+    backend.close()
+
+
+def test_gives_up_after_the_retry_limit(make_server):
+    import requests
+    server = make_server(failures=10)
+    backend = make_backend(server, retries=2)
+    with pytest.raises(requests.exceptions.RequestException):
+        backend.synthesize("Never works.")
+    assert len(server.requests) == 3  # The first try and two retries
+    backend.close()
+
+
+def test_audio_streams_before_the_response_finishes(make_server):
+    server = make_server()
+    server.release.clear()
+    backend = make_backend(server)
+    parts = backend.iter_audio("Stream me.")
+    # The server holds back the rest until the first part has been received
+    first = next(parts)
+    assert AUDIO_PARTS[0].startswith(first)
+    server.release.set()
+    assert first + b''.join(parts) == b''.join(AUDIO_PARTS)
+    backend.close()
+
+
+class FakeResponse:
+    status_code = 200
+    reason = "OK"
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, chunk_size=1024):
+        return iter(self.lines)
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.timeouts = []
+
+    def send(self, request, timeout=None, proxies=None):
+        self.timeouts.append(timeout)
+        return self.response
+
+
+def test_gtts_response_without_audio_raises():
+    pytest.importorskip("gtts")
+    from gtts import gTTSError
+    backend = GTTSBackend()
+    session = backend._session = FakeSession(FakeResponse([b')]}\'', b'[["wrb.fr","jQ1olc",null]]']))
+    with pytest.raises(gTTSError):
+        backend.synthesize("No audio here.")
+    assert all(timeout is not None for timeout in session.timeouts)
+
+
+def gtts_response(*clips):
+    """Lines of a batchexecute response carrying clips as gTTS receives them"""
+    lines = [b")]}'"]
+    for clip in clips:
+        lines.append(b'[["wrb.fr","jQ1olc","[\\"' + base64.b64encode(clip) + b'\\"]",null,null,null,"generic"]]')
+    return lines
+
+
+def test_installed_gtts_is_a_tested_release():
+    pytest.importorskip("gtts")
+    # If this fails after upgrading gTTS, check _prepare_requests() and its response
+    # format against GTTSBackend.iter_audio() before extending GTTS_TESTED_VERSIONS
+    assert gtts_internals_supported()
+
+
+@pytest.mark.parametrize("supported", [True, False])
+def test_gtts_audio_matches_gtts_own_stream(monkeypatch, supported):
+    pytest.importorskip("gtts")
+    import requests
+    from gtts import gTTS
+    response = FakeResponse(gtts_response(b"first clip", b"second clip"))
+
+    def send(session, request, **kwargs):
+        response.request = request
+        return response
+
+    monkeypatch.setattr(requests.Session, "send", send)
+    expected = b"".join(gTTS("Hello there.").stream())
+    assert expected == b"first clipsecond clip"
+
+    monkeypatch.setattr(tts_backends, "gtts_internals_supported", lambda: supported)
+    backend = GTTSBackend()
+    session = backend._session = FakeSession(response)
+    assert backend.synthesize("Hello there.") == expected
+    # Untested releases go through gTTS's own requests instead of the pooled session
+    assert bool(session.timeouts) == supported
@@ -0,0 +1,270 @@
+import re
+import struct
+import threading
+import time
+
+import pytest
+
+from audio_cache import EmptyClipError
+from text_normalization import SENTENCE_BREAK
+from tts_pipeline import (AudioStream, NarrationPipeline, Pyttsx3Narrator, TextChunk, iter_wav_segments,
+                          split_into_chunks)
+
+TIMEOUT = 5
+RATE = 1000
+# 16-bit mono PCM, as a streaming server sends it: the sizes aren't known yet
+FMT = struct.pack('<HHIIHH', 1, 1, RATE, 2 * RATE, 2, 16)
+STREAMED_HEADER = b'RIFF\xff\xff\xff\xffWAVEfmt ' + struct.pack('<I', len(FMT)) + FMT + b'data\xff\xff\xff\xff'
+
+
+def samples(wav):
+    """The sample data of a complete WAV file, checking its header sizes"""
+    assert wav[:4] == b'RIFF' and wav[8:16] == b'WAVEfmt '
+    assert struct.unpack('<I', wav[4:8])[0] == len(wav) - 8
+    data_size, = struct.unpack('<I', wav[40:44])
+    assert wav[36:40] == b'data' and data_size == len(wav) - 44
+    return wav[44:]
+
+
+class RecordingPlayer:
+    """Stands in for PygameClipPlayer, keeping what it was given"""
+
+    def __init__(self):
+        self.sounds = []
+        self.enqueued = threading.Event()
+
+    def enqueue(self, data, is_running, on_start=None):
+        self.sounds.append(data)
+        if on_start:
+            on_start()
+        self.enqueued.set()
+
+    def wait_until_done(self, is_running):
+        pass
+
+    def stop(self):
+        pass
+
+
+class HeldSynthesizer:
+    """Streams a WAV clip, holding back its second half until released"""
+
+    def __init__(self, frames):
+        self.audio = bytes(range(256)) * (2 * frames // 256)
+        self.release = threading.Event()
+
+    def iter_audio(self, text):
+        half = len(self.audio) // 2
+        yield STREAMED_HEADER
+        yield self.audio[:half]
+        self.release.wait(TIMEOUT)
+        yield self.audio[half:]
+
+
+def test_segments_are_cut_as_parts_arrive():
+    audio = bytes(range(256)) * 20
+    stream = STREAMED_HEADER + audio
+    # Parts split the header and the frames at awkward places
+    parts = [stream[i:i + 37] for i in range(0, len(stream), 37)]
+    segments = list(iter_wav_segments(parts, segment_seconds=0.5))
+    data = [samples(segment) for segment in segments]
+    assert b''.join(data) == audio
+    assert [len(d) for d in data[:-1]] == [RATE] * (len(data) - 1)
+    assert all(segment[12:36] == STREAMED_HEADER[12:36] for segment in segments)
+
+
+def test_a_clip_cut_off_mid_frame_ends_at_its_last_whole_frame():
+    segments = list(iter_wav_segments([STREAMED_HEADER, b'\1\2\3']))
+    assert [samples(segment) for segment in segments] == [b'\1\2']
+    assert list(iter_wav_segments([])) == []
+
+
+@pytest.mark.parametrize("parts", [[b'ID3\4\0\0\0\0\0\0\0\0\0'], [STREAMED_HEADER[:20]]])
+def test_audio_that_is_not_wav_is_rejected(parts):
+    with pytest.raises(ValueError):
+        list(iter_wav_segments(parts))
+
+
+def test_stream_parts_end_with_the_writer_error():
+    stream = AudioStream()
+    stream.feed(b'first')
+    stream.finish(RuntimeError("lost connection"))
+    parts = stream.iter_parts()
+    assert next(parts) == b'first'
+    with pytest.raises(RuntimeError):
+        next(parts)
+
+
+def test_streamed_clip_starts_playing_before_it_is_complete():
+    synthesizer = HeldSynthesizer(frames=2 * RATE)
+    player = RecordingPlayer()
+    pipeline = NarrationPipeline(synthesizer, player, streaming=True)
+    started = []
+    narration = threading.Thread(target=pipeline.run,
+                                 args=([TextChunk(0, "Hello.")], lambda index, chunk: started.append(index)))
+    narration.start()
+    try:
+        assert player.enqueued.wait(TIMEOUT)
+        # Only the first half of the clip has arrived
+        assert started == [0] and not synthesizer.release.is_set()
+    finally:
+        synthesizer.release.set()
+        narration.join(TIMEOUT)
+    assert b''.join(samples(sound) for sound in player.sounds) == synthesizer.audio
+    assert started == [0]
+
+
+SENTENCES = ("Short one. A second sentence follows it! Does a question end here? "
+             "Then a new paragraph.\n\nAnd a very long sentence that goes on " + "and on " * 40 + "until it ends. Last")
+
+
+@pytest.mark.parametrize("start", [0, 11, 70])
+def test_chunks_cover_the_text_in_order(start):
+    chunks = split_into_chunks(SENTENCES, max_chars=60, first_max_chars=35, start=start)
+    assert ''.join(chunk.text for chunk in chunks) == SENTENCES[start:]
+    assert chunks[0].start == start
+    for chunk in chunks:
+        assert SENTENCES[chunk.start:chunk.start + len(chunk.text)] == chunk.text
+        assert len(chunk.text) <= 60
+    assert len(chunks[0].text) <= 35
+
+
+def test_stored_boundaries_give_the_same_chunks():
+    boundaries = [match.end() for match in SENTENCE_BREAK.finditer(SENTENCES)]
+    for start in (0, 30):
+        assert (split_into_chunks(SENTENCES, 60, 25, start=start, boundaries=boundaries)
+                == split_into_chunks(SENTENCES, 60, 25, start=start))
+
+
+class GatedSynthesizer:
+    """Returns each chunk's text as its clip once released, recording which chunks were requested"""
+
+    def __init__(self):
+        self.requested = []
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, text):
+        with self._lock:
+            self.requested.append(text)
+        self.release.wait(TIMEOUT)
+        return text.encode()
+
+
+def test_clips_play_in_order_with_a_bounded_prefetch():
+    synthesizer = GatedSynthesizer()
+    player = RecordingPlayer()
+    pipeline = NarrationPipeline(synthesizer, player, prefetch=2, workers=4)
+    chunks = [TextChunk(i, f"chunk {i}") for i in range(6)]
+    narration = threading.Thread(target=pipeline.run, args=(chunks,))
+    narration.start()
+    try:
+        # Nothing has been played, so only the first two clips are being made
+        time.sleep(0.1)
+        assert sorted(synthesizer.requested) == ["chunk 0", "chunk 1"]
+    finally:
+        synthesizer.release.set()
+        narration.join(TIMEOUT)
+    assert player.sounds == [chunk.text.encode() for chunk in chunks]
+
+
+def test_clips_finishing_out_of_order_still_play_in_order():
+    delays = {"a": 0.06, "b": 0.0, "c": 0.03}
+
+    def synthesize(text):
+        time.sleep(delays[text])
+        return text.encode()
+
+    player = RecordingPlayer()
+    started = []
+    NarrationPipeline(synthesize, player, workers=3).run(
+        [TextChunk(i, text) for i, text in enumerate("abc")],
+        on_chunk_start=lambda index, chunk: started.append((index, chunk.text)))
+    assert player.sounds == [b"a", b"b", b"c"]
+    assert started == [(0, "a"), (1, "b"), (2, "c")]
+
+
+def test_an_empty_clip_is_an_error():
+    with pytest.raises(EmptyClipError):
+        NarrationPipeline(lambda text: b"", RecordingPlayer()).run([TextChunk(0, "Hello.")])
+
+
+def test_stop_ends_a_narration_waiting_on_synthesis():
+    synthesizer = GatedSynthesizer()
+    player = RecordingPlayer()
+    pipeline = NarrationPipeline(synthesizer, player)
+    narration = threading.Thread(target=pipeline.run, args=([TextChunk(0, "Hello.")],))
+    narration.start()
+    try:
+        pipeline.stop()
+        narration.join(TIMEOUT)
+        assert not narration.is_alive()
+        assert player.sounds == []
+    finally:
+        synthesizer.release.set()
+
+
+class FakeEngine:
+    """A pyttsx3 engine that "speaks" instantly, reporting each word"""
+
+    def __init__(self):
+        self.said = []
+        self.properties = []
+        self.callbacks = {}
+        self.during_chunk = None  # Called while a chunk is being spoken
+        self._text = None
+
+    def connect(self, name, callback):
+        self.callbacks[name] = callback
+        return name
+
+    def disconnect(self, token):
+        del self.callbacks[token]
+
+    def setProperty(self, name, value):
+        self.properties.append((len(self.said), name, value))
+
+    def say(self, text):
+        self._text = text
+
+    def runAndWait(self):
+        self.said.append(self._text)
+        for match in re.finditer(r'\w+', self._text):
+            if 'started-word' in self.callbacks:
+                self.callbacks['started-word'](None, match.start(), len(match.group()))
+        if self.during_chunk:
+            self.during_chunk()
+
+    def stop(self):
+        pass
+
+
+def test_narrator_speaks_chunks_and_maps_words_to_the_text():
+    engine = FakeEngine()
+    narrator = Pyttsx3Narrator(engine, chunk_chars=60, first_chunk_chars=35)
+    words = []
+    narrator.run(SENTENCES, start_offset=11, on_word=lambda start, end: words.append(SENTENCES[start:end]))
+    assert ''.join(engine.said) == SENTENCES[11:]
+    assert words == re.findall(r'\w+', SENTENCES[11:])
+    assert narrator.offset == len(SENTENCES)
+    assert engine.callbacks == {}
+
+
+def test_property_changes_and_stop_wait_for_the_chunk_boundary():
+    engine = FakeEngine()
+    narrator = Pyttsx3Narrator(engine, chunk_chars=60, first_chunk_chars=35)
+    chunks = split_into_chunks(SENTENCES, 60, 35)
+
+    def during_chunk():
+        if len(engine.said) == 1:
+            narrator.set_property('rate', 200)
+        elif len(engine.said) == 2:
+            narrator.stop()
+
+    engine.during_chunk = during_chunk
+    narrator.run(SENTENCES)
+    assert engine.said == [chunk.text for chunk in chunks[:2]]
+    # Applied before the second chunk was said
+    assert engine.properties == [(1, 'rate', 200)]
+    # Stopped while the second chunk was spoken, so narration resumes from it
+    assert narrator.offset == chunks[1].start
@@ -0,0 +1,276 @@
+"""Clean extracted page text once, before it is shown, searched, cached or spoken.
+
+Running headers and footers are found by hashing the lines at the top and
+bottom of each page and looking for the same line on several neighbouring
+pages. A bare number is only taken for a page number when it continues the
+numbering of the pages around it. Only neighbours are compared, so a page's
+result depends on a few pages around it and can be reproduced on demand
+(for pages shown before the loader reaches them) exactly as the streaming
+pass produced it.
+"""
+import base64
+import re
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import Counter, namedtuple
+
+from document_view import page_piece
+from perf import stats
+
+# Non-blank lines at the top and bottom of a page checked for running headers and footers
+EDGE_LINES = 3
+# Pages on each side compared when looking for running headers and footers; wide
+# enough for headers that alternate between left and right pages
+REPEAT_WINDOW = 4
+# Neighbouring pages an edge line must also appear on to count as a header or footer
+MIN_REPEATS = 2
+# Longer edge lines are body text, never headers or footers
+MAX_EDGE_LINE_CHARS = 100
+
+# End of a sentence (with any closing quotes/brackets) or a blank line between paragraphs
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n\s*\n')
+# "12", "- 12 -", "Page 12", "12 of 300", "xiv"; the lookahead keeps the numeral from being empty
+PAGE_NUMBER_LINE = re.compile(r'[-\u2013\u2014\s]*(?:page\s+)?'
+                              r'(?:(\d+)(?:\s*(?:of|/)\s*\d+)?'
+                              r'|((?=[mdclxvi])m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})))'
+                              r'[-\u2013\u2014\s]*', re.IGNORECASE)
+ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100, 'd': 500, 'm': 1000}
+DIGITS = re.compile(r'\d+')
+# A word broken across lines with a hyphen: "exam-\nple", or a compound: "self-\ncontained"
+HYPHENATED_BREAK = re.compile(r'([^\W\d_]+)-\n([a-z\u00df-\u00ff][^\W\d_]*)')
+# Words, including hyphenated compounds, counted to tell the two apart
+COMPOUND_WORD = re.compile(r'[^\W\d_]+(?:-[^\W\d_]+)*')
+# First halves that make a compound when the page doesn't show which form it uses
+COMPOUND_PREFIXES = frozenset({'self', 'well', 'half', 'quasi'})
+BLANK_LINES = re.compile(r'\n{2,}')
+# A line break inside a paragraph; lines ending a sentence keep theirs
+SOFT_BREAK = re.compile(r'(?<![.!?:\n])\n(?!\n)')
+SPACE_RUN = re.compile(r'[^\S\n]+')
+
+NormalizedPage = namedtuple('NormalizedPage', ['text', 'sentence_ends'])
+# Hashes of a page's edge lines, and the page_number() of those that could be page numbers
+EdgeLines = namedtuple('EdgeLines', ['hashes', 'numbers'])
+# What the pages around page_num have at their edges
+PageContext = namedtuple('PageContext', ['page_num', 'line_counts', 'number_offsets'])
+
+
+def line_hash(line):
+    """Hash a line so that running headers match even as their page numbers change"""
+    key = DIGITS.sub('#', ' '.join(line.split()).casefold())
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def roman_value(numeral):
+    total = 0
+    values = [ROMAN_VALUES[c] for c in numeral.lower()]
+    for value, following in zip(values, values[1:] + [0]):
+        total += -value if value < following else value
+    return total
+
+
+def page_number(line):
+    """Return (style, value) if a line consists only of something like a page number, else None.
+
+    style is 'arabic' or 'roman', so front matter numbered i, ii, ... is
+    never taken to continue 1, 2, 3.
+    """
+    match = PAGE_NUMBER_LINE.fullmatch(line)
+    if match is None:
+        return None
+    digits, numeral = match.groups()
+    return ('arabic', int(digits)) if digits else ('roman', roman_value(numeral))
+
+
+def _edge_lines(lines):
+    """Return the indices of the first and last EDGE_LINES non-blank lines"""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return filled[:EDGE_LINES], filled[-EDGE_LINES:][::-1]
+
+
+def edge_lines(raw_text):
+    """Return the EdgeLines of the lines a page could have a running header, footer or page number on"""
+    lines = raw_text.splitlines()
+    top, bottom = _edge_lines(lines)
+    hashes = set()
+    numbers = set()
+    for i in {*top, *bottom}:
+        line = lines[i].strip()
+        number = page_number(line)
+        if number is not None:
+            numbers.add(number)
+        elif len(line) <= MAX_EDGE_LINE_CHARS:
+            hashes.add(line_hash(line))
+    return EdgeLines(hashes, numbers)
+
+
+def page_context(page_num, page_count, edge_lines_of):
+    """Collect the edge lines of the pages around page_num; edge_lines_of(n) returns a page's EdgeLines"""
+    counts = Counter()
+    offsets = set()
+    for neighbour in range(max(0, page_num - REPEAT_WINDOW), min(page_count, page_num + REPEAT_WINDOW + 1)):
+        if neighbour != page_num:
+            edges = edge_lines_of(neighbour)
+            counts.update(edges.hashes)
+            # Printed number minus page index stays the same along a run of numbered pages
+            offsets.update((style, value - neighbour) for style, value in edges.numbers)
+    return PageContext(page_num, counts, offsets)
+
+
+def join_hyphenated(text):
+    """Join words hyphenated across lines, keeping the hyphen of compounds.
+
+    The page's own spelling decides: whichever of "example" and
+    "exam-ple" occurs more often elsewhere on the page wins. If neither
+    does, the hyphen is kept only after a COMPOUND_PREFIXES word. Only the
+    page is consulted, so on-demand pages come out as the loader made them.
+    """
+    if '-\n' not in text:
+        return text
+    counts = Counter(word.casefold() for word in COMPOUND_WORD.findall(text))
+
+    def join(match):
+        first, second = match.groups()
+        joined = counts[(first + second).casefold()]
+        hyphenated = counts[f"{first}-{second}".casefold()]
+        if hyphenated > joined or (hyphenated == joined and first.casefold() in COMPOUND_PREFIXES):
+            stats.count('normalize.kept_hyphens')
+            return f"{first}-{second}"
+        return first + second
+
+    return HYPHENATED_BREAK.sub(join, text)
+
+
+def sentence_ends(text):
+    """Return the offsets in text where each sentence after the first starts"""
+    return array('I', (match.end() for match in SENTENCE_BREAK.finditer(text)))
+
+
+def normalize_page(raw_text, context):
+    """Return the NormalizedPage for one page's extracted text, given its PageContext.
+
+    Page numbers in sequence with the neighbouring pages' and lines repeated
+    at the edges of several neighbouring pages are dropped from the top and
+    bottom, words hyphenated across lines are joined, and line breaks inside
+    paragraphs become spaces.
+    """
+    with stats.timer('normalize.page'):
+        lines = raw_text.splitlines()
+
+        def is_boilerplate(i):
+            line = lines[i].strip()
+            number = page_number(line)
+            if number is not None:
+                # A lone "I" or "12" is body text unless the numbering around it says otherwise
+                style, value = number
+                return (style, value - context.page_num) in context.number_offsets
+            return len(line) <= MAX_EDGE_LINE_CHARS and context.line_counts[line_hash(line)] >= MIN_REPEATS
+
+        # Stop at the first real line, so body text is never cut from the middle
+        top, bottom = _edge_lines(lines)
+        dropped = set()
+        for edge in (top, bottom):
+            for i in edge:
+                if not is_boilerplate(i):
+                    break
+                dropped.add(i)
+        if dropped:
+            stats.count('normalize.dropped_lines', len(dropped))
+
+        text = '\n'.join(line.strip() for i, line in enumerate(lines) if i not in dropped)
+        text = join_hyphenated(text)
+        text = BLANK_LINES.sub('\n\n', text)
+        text = SOFT_BREAK.sub(' ', text)
+        text = SPACE_RUN.sub(' ', text).strip()
+        return NormalizedPage(text, sentence_ends(text))
+
+
+def normalize_page_at(page_num, page_count, raw_page):
+    """Normalize one page given random access to raw page texts through raw_page(n)"""
+    context = page_context(page_num, page_count, lambda n: edge_lines(raw_page(n)))
+    return normalize_page(raw_page(page_num), context)
+
+
+def iter_normalized(raw_pages):
+    """Yield a NormalizedPage for each raw page text, in order.
+
+    Output runs REPEAT_WINDOW pages behind the input, since each page is
+    compared with the pages after it as well as before.
+    """
+    raw_texts = {}
+    edges = {}
+    next_page = 0
+    page_count = 0
+
+    def flush(stop):
+        nonlocal next_page
+        while next_page < stop:
+            context = page_context(next_page, page_count, edges.__getitem__)
+            yield normalize_page(raw_texts.pop(next_page), context)
+            edges.pop(next_page - REPEAT_WINDOW, None)
+            next_page += 1
+
+    for raw_text in raw_pages:
+        raw_texts[page_count] = raw_text
+        edges[page_count] = edge_lines(raw_text)
+        page_count += 1
+        yield from flush(page_count - REPEAT_WINDOW)
+    yield from flush(page_count)
+
+
+def extend_sentence_ends(document_ends, piece_start, piece, page):
+    """Append a page's sentence ends to document_ends as document offsets.
+
+    piece is page_piece() of the page and piece_start where it begins in
+    the document. A page after the first also starts a new sentence, at
+    the end of the blank line that separates it from the page before.
+    """
+    if not piece:
+        return
+    text_start = piece_start + len(piece) - len(page.text)
+    if text_start:
+        document_ends.append(text_start)
+    document_ends.extend(text_start + end for end in page.sentence_ends)
+
+
+def document_sentence_ends(pages):
+    """Return the sentence ends of a document laid out with page_piece(), as an array of offsets"""
+    document_ends = array('L')
+    length = 0
+    for page_num, page in enumerate(pages):
+        piece = page_piece(page_num, page.text)
+        extend_sentence_ends(document_ends, length, piece, page)
+        length += len(piece)
+    return document_ends
+
+
+def sentence_span(document_ends, offset, text_length):
+    """Return (start, end) of the sentence containing offset"""
+    i = bisect_right(document_ends, offset)
+    start = document_ends[i - 1] if i else 0
+    end = document_ends[i] if i < len(document_ends) else text_length
+    return start, end
+
+
+def cache_normalized(extraction_cache, pdf_path, pages):
+    """Store NormalizedPages: the texts as the document's pages, the sentence ends alongside"""
+    extraction_cache.put(pdf_path, [page.text for page in pages])
+    encoded = [base64.b64encode(page.sentence_ends.tobytes()).decode('ascii') for page in pages]
+    extraction_cache.put(pdf_path, encoded, kind='sentences')
+
+
+def load_normalized(extraction_cache, pdf_path):
+    """Return the cached NormalizedPages for a document, or None"""
+    texts = extraction_cache.get(pdf_path)
+    if texts is None:
+        return None
+    encoded = extraction_cache.get(pdf_path, kind='sentences')
+    if encoded is None or len(encoded) != len(texts):
+        # Cheap to redo; only the text is expensive to get
+        return [NormalizedPage(text, sentence_ends(text)) for text in texts]
+    pages = []
+    for text, data in zip(texts, encoded):
+        ends = array('I')
+        ends.frombytes(base64.b64decode(data))
+        pages.append(NormalizedPage(text, ends))
+    return pages
@@ -0,0 +1,57 @@
+from array import array
+from bisect import bisect_right
+
+
+class LineIndex:
+    """Map character offsets in a text to Tk "line.column" indices and back.
+
+    Tk resolves "1.0+Nc" by counting characters from the start of the
+    widget, so converting offsets ourselves against a precomputed table
+    of line starts keeps index computation O(log n).
+    """
+
+    def __init__(self, text=""):
+        self.line_starts = array('L', [0])
+        self.length = 0
+        self.append(text)
+
+    def append(self, text):
+        """Extend the table with text added to the end of the document"""
+        base = self.length
+        pos = text.find('\n')
+        while pos != -1:
+            self.line_starts.append(base + pos + 1)
+            pos = text.find('\n', pos + 1)
+        self.length += len(text)
+
+    def line_of(self, offset, lo=0):
+        """Return the 0-based line containing offset, searching from line lo"""
+        return bisect_right(self.line_starts, offset, lo) - 1
+
+    def to_index(self, offset):
+        """Return the Tk index for a character offset"""
+        line = self.line_of(offset)
+        return f"{line + 1}.{offset - self.line_starts[line]}"
+
+    def to_indices(self, ranges):
+        """Convert sorted (start, end) offsets to (start_index, end_index) in one forward pass"""
+        starts = self.line_starts
+        indices = []
+        line = 0
+        for start, end in ranges:
+            line = self.line_of(start, line if starts[line] <= start else 0)
+            end_line = self.line_of(end, line)
+            indices.append((f"{line + 1}.{start - starts[line]}",
+                            f"{end_line + 1}.{end - starts[end_line]}"))
+        return indices
+
+    def to_offset(self, index):
+        """Return the character offset for a Tk "line.column" index"""
+        line, column = str(index).split('.')
+        line = min(int(line) - 1, len(self.line_starts) - 1)
+        return self.line_starts[line] + int(column)
+
+    def line_start(self, line):
+        """Return the offset where a 1-based Tk line begins"""
+        line = max(0, min(line - 1, len(self.line_starts) - 1))
+        return self.line_starts[line]
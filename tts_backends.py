@@ -0,0 +1,325 @@
+"""Speech backends behind one synthesize-a-chunk interface.
+
+Backends register themselves by name; the GUI and the exporter look them
+up with create_backend() and size their chunking and concurrency from
+the declared capabilities instead of special-casing each engine.
+"""
+import base64
+import functools
+import os
+import re
+import sys
+import tempfile
+import threading
+import urllib.request
+from collections import namedtuple
+
+BackendCapabilities = namedtuple('BackendCapabilities', [
+    'streaming',        # iter_audio() yields PCM WAV that can be played before synthesis finishes
+    'max_chunk_chars',  # Longest text accepted in one request
+    'max_concurrency',  # Requests that may run at once
+    'needs_network',
+    'direct_playback',  # Speaks through its own audio output rather than returning clips
+    'audio_format',     # File extension of the returned audio
+])
+
+# HTTP backend defaults, overridable through the environment
+HTTP_TTS_URL_ENV = "PDF_READER_TTS_URL"
+HTTP_TTS_API_KEY_ENV = "PDF_READER_TTS_API_KEY"
+HTTP_TTS_VOICE_ENV = "PDF_READER_TTS_VOICE"
+HTTP_TTS_FORMAT_ENV = "PDF_READER_TTS_FORMAT"
+DEFAULT_HTTP_CONCURRENCY = 4
+DEFAULT_HTTP_RETRIES = 3
+DEFAULT_HTTP_BACKOFF = 0.5
+# (connect, read) timeouts in seconds
+DEFAULT_HTTP_TIMEOUT = (5, 60)
+# Bytes read from a streamed response at a time
+STREAM_CHUNK_BYTES = 16 * 1024
+
+# Where gTTS finds the base64 audio in Google's batchexecute response
+GTTS_AUDIO_PATTERN = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+# gTTS releases, as [lowest, highest), whose private _prepare_requests() and
+# response format GTTSBackend was checked against; tests fail outside it
+GTTS_TESTED_VERSIONS = ((2, 5), (2, 6))
+
+_BACKENDS = {}
+
+
+def register_backend(cls):
+    """Class decorator adding a backend to the registry under cls.name"""
+    _BACKENDS[cls.name] = cls
+    return cls
+
+
+def backend_classes():
+    """Return the registered backend classes in registration order"""
+    return list(_BACKENDS.values())
+
+
+def get_backend_class(name):
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend: {name}") from None
+
+
+def create_backend(name, **options):
+    """Instantiate a registered backend; options are passed to its constructor"""
+    return get_backend_class(name)(**options)
+
+
+def pooled_session(pool_size, retries=DEFAULT_HTTP_RETRIES, backoff=DEFAULT_HTTP_BACKOFF):
+    """Return a requests.Session keeping up to pool_size connections alive, with retry and backoff"""
+    # Imported on first use so opening the window doesn't pay for it
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({'GET', 'POST'}), respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def gtts_internals_supported():
+    """Whether GTTSBackend may send gTTS's prepared requests itself.
+
+    That relies on gTTS internals, so it is only done for the releases in
+    GTTS_TESTED_VERSIONS. Others fall back to gTTS's own stream(), which
+    works but opens a connection per request; a warning says so once.
+    """
+    import gtts
+    version = getattr(gtts, '__version__', '0')
+    release = tuple(int(part) for part in re.findall(r'\d+', version)[:2])
+    low, high = GTTS_TESTED_VERSIONS
+    if low <= release < high and hasattr(gtts.gTTS, '_prepare_requests'):
+        return True
+    print(f"Warning: gTTS {version} is untested here; using its own requests without connection pooling")
+    return False
+
+
+class TTSBackend:
+    """Base class for speech backends.
+
+    Subclasses set name, label and capabilities and implement synthesize().
+    Instances are callable, so they can be handed directly to
+    NarrationPipeline or CachedSynthesizer.
+    """
+
+    name = None
+    label = None
+    capabilities = None
+
+    def __init__(self, language="en", rate=150):
+        self.language = language
+        self.rate = rate
+
+    @classmethod
+    def is_configured(cls):
+        """Whether the backend has everything it needs to be offered"""
+        return True
+
+    def voice_key(self):
+        """Identify the voice settings that change the audio, for cache keys"""
+        return self.voice_key_for(self.language, self.rate)
+
+    def voice_key_for(self, language, rate):
+        """The voice_key() this backend would have with language and rate instead of its own"""
+        return f"{language}:{rate}"
+
+    def synthesize(self, text):
+        """Return the audio for one chunk of text as bytes"""
+        raise NotImplementedError
+
+    def iter_audio(self, text):
+        """Yield audio bytes for one chunk, as they become available"""
+        yield self.synthesize(text)
+
+    def close(self):
+        pass
+
+    def __call__(self, text):
+        return self.synthesize(text)
+
+
+@register_backend
+class Pyttsx3Backend(TTSBackend):
+    """Offline system voices through pyttsx3"""
+
+    name = "pyttsx3"
+    label = "Offline (pyttsx3)"
+    # NSSpeechSynthesizer writes AIFF; SAPI5 and espeak write WAV
+    capabilities = BackendCapabilities(streaming=False, max_chunk_chars=None, max_concurrency=1, needs_network=False,
+                                       direct_playback=True, audio_format='aiff' if sys.platform == 'darwin' else 'wav')
+
+    def __init__(self, language="en", rate=150, engine=None):
+        super().__init__(language, rate)
+        self._engine = engine
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            import pyttsx3
+            self._engine = pyttsx3.init()
+        return self._engine
+
+    def synthesize(self, text):
+        # pyttsx3 can only render to a file
+        fd, path = tempfile.mkstemp(suffix='.' + self.capabilities.audio_format)
+        os.close(fd)
+        try:
+            with self._lock:
+                self.engine.setProperty('rate', self.rate)
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+
+@register_backend
+class GTTSBackend(TTSBackend):
+    """Google Translate's voice through gTTS; returns MP3.
+
+    gTTS opens a new session for every request, so its prepared requests
+    are sent through one pooled session instead, for the gTTS releases
+    that was checked against (see gtts_internals_supported()).
+    """
+
+    name = "gtts"
+    label = "Online (gTTS)"
+    capabilities = BackendCapabilities(streaming=False, max_chunk_chars=None, max_concurrency=4, needs_network=True,
+                                       direct_playback=False, audio_format='mp3')
+
+    def __init__(self, language="en", rate=150, slow=False):
+        super().__init__(language, rate)
+        self.slow = slow
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                self._session = pooled_session(self.capabilities.max_concurrency)
+            return self._session
+
+    def voice_key_for(self, language, rate):
+        # gTTS has no rate control, only a slow flag
+        return f"{language}:{'slow' if self.slow else 'normal'}"
+
+    def synthesize(self, text):
+        return b''.join(self.iter_audio(text))
+
+    def iter_audio(self, text):
+        import requests
+        from gtts import gTTS, gTTSError
+        tts = gTTS(text=text, lang=self.language, slow=self.slow)
+        if not gtts_internals_supported():
+            yield from tts.stream()
+            return
+
+        # gTTS sends without a timeout by default, which lets a stalled request hang narration
+        timeout = tts.timeout if tts.timeout is not None else DEFAULT_HTTP_TIMEOUT
+        for request in tts._prepare_requests():
+            # Raise gTTSError for failed requests, as gTTS.stream() does
+            try:
+                response = self.session.send(request, timeout=timeout, proxies=urllib.request.getproxies())
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                raise gTTSError(tts=tts, response=response) from None
+            except requests.exceptions.RequestException:
+                raise gTTSError(tts=tts) from None
+            found_audio = False
+            for line in response.iter_lines(chunk_size=1024):
+                match = GTTS_AUDIO_PATTERN.search(line.decode('utf-8'))
+                if match:
+                    found_audio = True
+                    yield base64.b64decode(match.group(1).encode('ascii'))
+            if not found_audio:
+                # A successful response without an audio stream
+                raise gTTSError(tts=tts, response=response)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+@register_backend
+class HTTPBackend(TTSBackend):
+    """Any TTS service that takes a JSON POST and answers with audio bytes.
+
+    The request body is {"input": text, "voice": ..., "format": ...,
+    "language": ..., "speed": ...} plus any extra_fields. All requests go
+    through one pooled requests.Session, so connections are kept alive
+    between chunks. At most max_concurrency requests run at once; failed
+    connections and 429/5xx answers are retried with exponential backoff.
+    The URL, API key, voice and format default to the PDF_READER_TTS_*
+    environment variables, so a local mock server can stand in for the
+    real service. With audio_format 'wav' the audio is played while it
+    downloads; other formats play once each clip is complete.
+    """
+
+    name = "http"
+    label = "Cloud (HTTP)"
+    # Instances replace this with their configured limits and format
+    capabilities = BackendCapabilities(streaming=False, max_chunk_chars=None,
+                                       max_concurrency=DEFAULT_HTTP_CONCURRENCY, needs_network=True,
+                                       direct_playback=False, audio_format='mp3')
+
+    def __init__(self, language="en", rate=150, url=None, api_key=None, voice=None, audio_format=None,
+                 extra_fields=None, max_concurrency=DEFAULT_HTTP_CONCURRENCY, max_chunk_chars=None,
+                 retries=DEFAULT_HTTP_RETRIES, backoff=DEFAULT_HTTP_BACKOFF, timeout=DEFAULT_HTTP_TIMEOUT):
+        super().__init__(language, rate)
+        self.url = url or os.environ.get(HTTP_TTS_URL_ENV)
+        if not self.url:
+            raise ValueError(f"No URL for the HTTP TTS backend; set {HTTP_TTS_URL_ENV}")
+        self.api_key = api_key or os.environ.get(HTTP_TTS_API_KEY_ENV)
+        self.voice = voice or os.environ.get(HTTP_TTS_VOICE_ENV)
+        self.audio_format = audio_format or os.environ.get(HTTP_TTS_FORMAT_ENV) or 'mp3'
+        self.extra_fields = extra_fields or {}
+        self.timeout = timeout
+        self.capabilities = BackendCapabilities(streaming=self.audio_format == 'wav', max_chunk_chars=max_chunk_chars,
+                                                max_concurrency=max_concurrency, needs_network=True,
+                                                direct_playback=False, audio_format=self.audio_format)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.session = pooled_session(max_concurrency, retries, backoff)
+        self.session.headers['Accept'] = f"audio/{self.audio_format}, application/octet-stream"
+        if self.api_key:
+            self.session.headers['Authorization'] = f"Bearer {self.api_key}"
+
+    @classmethod
+    def is_configured(cls):
+        return bool(os.environ.get(HTTP_TTS_URL_ENV))
+
+    def voice_key_for(self, language, rate):
+        return f"{self.url}:{self.voice}:{self.audio_format}:{language}:{rate}"
+
+    def request_body(self, text):
+        body = {'input': text, 'format': self.audio_format, 'language': self.language,
+                'speed': round(self.rate / 150, 2)}
+        if self.voice:
+            body['voice'] = self.voice
+        body.update(self.extra_fields)
+        return body
+
+    def synthesize(self, text):
+        return b''.join(self.iter_audio(text))
+
+    def iter_audio(self, text):
+        with self._slots:
+            with self.session.post(self.url, json=self.request_body(text), timeout=self.timeout,
+                                   stream=True) as response:
+                response.raise_for_status()
+                for data in response.iter_content(STREAM_CHUNK_BYTES):
+                    if data:
+                        yield data
+
+    def close(self):
+        self.session.close()
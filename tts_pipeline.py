@@ -0,0 +1,491 @@
+import io
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_right
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_cache import EmptyClipError
+from perf import stats
+from text_normalization import SENTENCE_BREAK
+
+# Chunk sizes in characters; the first chunk is kept short so audio starts sooner
+DEFAULT_CHUNK_CHARS = 400
+DEFAULT_FIRST_CHUNK_CHARS = 120
+# Clips synthesized ahead of the one currently playing
+DEFAULT_PREFETCH = 3
+DEFAULT_SYNTH_WORKERS = 2
+# Seconds between checks of the mixer channel while waiting for a clip to finish
+PLAYBACK_POLL_SECONDS = 0.02
+# Seconds of audio per segment when a WAV clip is played while it downloads
+STREAM_SEGMENT_SECONDS = 0.5
+
+TextChunk = namedtuple('TextChunk', ['start', 'text'])
+
+
+def _split_long(start, text, max_chars):
+    """Hard-split a run of text with no sentence breaks at whitespace"""
+    while len(text) > max_chars:
+        cut = text.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield TextChunk(start, text[:cut])
+        start += cut
+        text = text[cut:]
+    if text:
+        yield TextChunk(start, text)
+
+
+def iter_sentences(text, start=0, boundaries=None):
+    """Yield TextChunk for each sentence or paragraph in text[start:].
+
+    boundaries, if given, are the sorted offsets where sentences start in
+    text (as stored by the normalization stage), so text isn't rescanned.
+    """
+    if boundaries is None:
+        ends = (match.end() for match in SENTENCE_BREAK.finditer(text, start))
+    else:
+        ends = (boundaries[i] for i in range(bisect_right(boundaries, start), len(boundaries)))
+    pos = start
+    for end in ends:
+        if end >= len(text):
+            break
+        yield TextChunk(pos, text[pos:end])
+        pos = end
+    if pos < len(text):
+        yield TextChunk(pos, text[pos:])
+
+
+def split_into_chunks(text, max_chars=DEFAULT_CHUNK_CHARS, first_max_chars=DEFAULT_FIRST_CHUNK_CHARS, start=0,
+                      boundaries=None):
+    """Group sentences into TextChunks of at most max_chars characters.
+
+    Offsets in each TextChunk are positions in ``text``, so callers can map
+    playback back to the document. boundaries are passed to iter_sentences().
+    """
+    chunks = []
+    limit = first_max_chars or max_chars
+    current_start = None
+    current = []
+    current_len = 0
+
+    def flush():
+        if current and ''.join(current).strip():
+            chunks.append(TextChunk(current_start, ''.join(current)))
+
+    for sentence in iter_sentences(text, start, boundaries):
+        for piece in _split_long(sentence.start, sentence.text, max_chars):
+            if current and current_len + len(piece.text) > limit:
+                flush()
+                limit = max_chars
+                current, current_len = [], 0
+            if not current:
+                current_start = piece.start
+            current.append(piece.text)
+            current_len += len(piece.text)
+    flush()
+    return chunks
+
+
+def _parse_wav_header(data):
+    """Return (fmt chunk body, offset of the sample data) once data holds a whole WAV header, else None"""
+    if len(data) < 12:
+        return None
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError("Streamed audio is not a WAV file")
+    fmt = None
+    pos = 12
+    while len(data) >= pos + 8:
+        chunk_id = bytes(data[pos:pos + 4])
+        size, = struct.unpack('<I', data[pos + 4:pos + 8])
+        if chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV stream has no format chunk before its data")
+            return fmt, pos + 8
+        if len(data) < pos + 8 + size:
+            return None
+        if chunk_id == b'fmt ':
+            fmt = bytes(data[pos + 8:pos + 8 + size])
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def _wav_file(fmt, frames):
+    """Wrap sample data in a minimal WAV header"""
+    fmt_chunk = b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'\0' * (len(fmt) & 1)
+    return (b'RIFF' + struct.pack('<I', 4 + len(fmt_chunk) + 8 + len(frames)) + b'WAVE' + fmt_chunk
+            + b'data' + struct.pack('<I', len(frames)) + frames)
+
+
+def iter_wav_segments(parts, segment_seconds=STREAM_SEGMENT_SECONDS):
+    """Cut a WAV clip arriving in parts into short, complete WAV files.
+
+    A segment is yielded as soon as enough samples for it have arrived, so
+    playback can start while the rest of the clip downloads. Sizes in the
+    streamed header are ignored; servers streaming audio often don't know
+    them yet. Raises ValueError if the audio isn't PCM WAV.
+    """
+    buffer = bytearray()
+    fmt = None
+    segment_bytes = None
+    for part in parts:
+        buffer += part
+        if fmt is None:
+            header = _parse_wav_header(buffer)
+            if header is None:
+                continue
+            fmt, data_start = header
+            del buffer[:data_start]
+            byte_rate, block_align = struct.unpack('<IH', fmt[8:14])
+            if not block_align:
+                raise ValueError("WAV stream has no frame size")
+            segment_bytes = max(block_align, int(byte_rate * segment_seconds) // block_align * block_align)
+        while len(buffer) >= segment_bytes:
+            yield _wav_file(fmt, bytes(buffer[:segment_bytes]))
+            del buffer[:segment_bytes]
+    if fmt is None:
+        if buffer:
+            raise ValueError("Streamed audio ended inside its WAV header")
+        return
+    # A clip cut off mid-frame plays up to its last whole frame
+    _, block_align = struct.unpack('<IH', fmt[8:14])
+    del buffer[len(buffer) - len(buffer) % block_align:]
+    if buffer:
+        yield _wav_file(fmt, bytes(buffer))
+
+
+class AudioStream:
+    """In-memory clip filled by a synthesis thread while the player reads it.
+
+    Bytes are appended as the backend delivers them, so stopping narration
+    abandons a clip mid-download. iter_parts() hands them on as they
+    arrive, for formats that can be played before the clip is complete;
+    getvalue() waits for the whole clip. Nothing touches the disk.
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._finished = False
+        self._error = None
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self._finished
+
+    def __len__(self):
+        return len(self._data)
+
+    def feed(self, data):
+        """Append audio bytes from the synthesizing thread"""
+        with self._changed:
+            self._data += data
+            self._changed.notify_all()
+
+    def finish(self, error=None):
+        """Mark the clip complete, or failed with error, waking any blocked readers"""
+        with self._changed:
+            self._finished = True
+            self._error = error
+            self._changed.notify_all()
+
+    def getvalue(self):
+        """Return the complete clip, waiting for the writer to finish"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._finished)
+            if self._error is not None:
+                raise self._error
+            return bytes(self._data)
+
+    def iter_parts(self):
+        """Yield the clip's bytes as they arrive, raising the writer's error at the end if it failed"""
+        pos = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._finished or len(self._data) > pos)
+                data = bytes(self._data[pos:])
+                finished, error = self._finished, self._error
+            if data:
+                pos += len(data)
+                yield data
+            elif finished:
+                if error is not None:
+                    raise error
+                return
+
+
+class PygameClipPlayer:
+    """Gapless clip playback on a single pygame mixer channel.
+
+    A channel holds one playing and one queued sound, so enqueue blocks
+    until the queue slot is free. Each call takes a complete sound file:
+    a whole clip, or one segment of a WAV clip that is still downloading.
+    on_start callbacks run when a sound actually starts, not when it is
+    queued.
+    Waits poll the channel from the narration thread; pygame's end events
+    would need its display and event loop, which can't be run off the
+    main thread next to Tk.
+    """
+
+    def __init__(self):
+        self.channel = None
+        self.clips_played = 0
+        self._queued_start = None  # on_start of the sound waiting in the channel queue
+        self._stopped = threading.Event()  # Set by stop() to cut a poll short
+
+    def _check_queued_start(self):
+        if self._queued_start is not None and self.channel.get_queue() is None:
+            # The queued sound has moved up and is playing now
+            on_start, self._queued_start = self._queued_start, None
+            on_start()
+
+    def _wait_while(self, busy, is_running):
+        """Block while busy() and playback is running, polling the channel"""
+        while is_running():
+            self._check_queued_start()
+            if not busy():
+                return
+            self._stopped.wait(PLAYBACK_POLL_SECONDS)
+
+    def _get_channel(self):
+        import pygame
+        if self.channel is None:
+            # The mixer is only started once something is actually played
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            self.channel = pygame.mixer.find_channel(True)
+        return self.channel
+
+    def enqueue(self, data, is_running, on_start=None):
+        """Play a clip now, or queue it behind the one that is playing"""
+        import pygame
+        channel = self._get_channel()
+        sound = pygame.mixer.Sound(file=io.BytesIO(data))
+        self._wait_while(lambda: channel.get_queue() is not None, is_running)
+        if not is_running():
+            return
+        if channel.get_busy():
+            channel.queue(sound)
+            self._queued_start = on_start
+        else:
+            if self.clips_played:
+                # The previous sound ran out before this one was synthesized
+                stats.count('playback.underrun')
+            channel.play(sound)
+            if on_start:
+                on_start()
+        self.clips_played += 1
+
+    def wait_until_done(self, is_running):
+        """Block until everything queued has played or playback is stopped"""
+        channel = self._get_channel()
+        self._wait_while(lambda: channel.get_busy() or channel.get_queue() is not None, is_running)
+
+    def stop(self):
+        self._queued_start = None
+        self._stopped.set()  # Let a waiting enqueue() see that playback stopped
+        if self.channel is not None:
+            self.channel.stop()
+
+
+class NarrationPipeline:
+    """Synthesize chunks ahead in a worker pool and hand clips to a player in order.
+
+    ``synthesize`` is any callable taking chunk text and returning clip bytes,
+    so the network backend can be swapped for a local stub. If it also has
+    iter_audio(), a clip is collected as it downloads and stop() abandons
+    it part way. With streaming set, clips are PCM WAV and are played in
+    segments while they download (see iter_wav_segments); otherwise each
+    clip is played once it is complete.
+    """
+
+    def __init__(self, synthesize, player, prefetch=DEFAULT_PREFETCH, workers=DEFAULT_SYNTH_WORKERS,
+                 streaming=False):
+        self.synthesize = synthesize
+        self.player = player
+        self.prefetch = max(1, prefetch)
+        self.workers = max(1, workers)
+        self.streaming = streaming
+        self._stop_event = threading.Event()
+        self._streams = set()
+        self._streams_lock = threading.Lock()
+
+    def is_running(self):
+        return not self._stop_event.is_set()
+
+    def _synthesize_into(self, stream, text):
+        """Fill stream with the audio for text, in a pool thread"""
+        stats.count('tts.synthesis_requests')
+        try:
+            with stats.timer('tts.synthesize'):
+                if hasattr(self.synthesize, 'iter_audio'):
+                    for data in self.synthesize.iter_audio(text):
+                        if not self.is_running():
+                            break
+                        stream.feed(data)
+                else:
+                    stream.feed(self.synthesize(text))
+                if self.is_running() and not len(stream):
+                    raise EmptyClipError(f"No audio returned for {text[:40]!r}")
+        except Exception as e:
+            stream.finish(e)
+        else:
+            stream.finish()
+        finally:
+            with self._streams_lock:
+                self._streams.discard(stream)
+
+    def stop(self):
+        """Stop synthesis and playback; safe to call from any thread"""
+        self._stop_event.set()
+        # Wake anything blocked reading a clip that will now never complete
+        with self._streams_lock:
+            streams, self._streams = self._streams, set()
+        for stream in streams:
+            stream.finish()
+        self.player.stop()
+
+    def run(self, chunks, on_chunk_start=None):
+        """Narrate chunks in order, blocking until done or stopped.
+
+        on_chunk_start(index, chunk) is called from this thread as each clip starts playing.
+        """
+        pending = deque()
+        chunk_iter = iter(chunks)
+        index = 0
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+
+        def fill():
+            while len(pending) < self.prefetch and self.is_running():
+                chunk = next(chunk_iter, None)
+                if chunk is None:
+                    return
+                stream = AudioStream()
+                with self._streams_lock:
+                    self._streams.add(stream)
+                pool.submit(self._synthesize_into, stream, chunk.text)
+                pending.append((chunk, stream))
+
+        try:
+            fill()
+            while pending and self.is_running():
+                chunk, stream = pending.popleft()
+                # Clips already synthesized and waiting to be played
+                stats.gauge('tts.ready_clips', sum(1 for _, s in pending if s.done) + stream.done)
+                on_start = None
+                if on_chunk_start:
+                    on_start = lambda index=index, chunk=chunk: on_chunk_start(index, chunk)
+                if self.streaming:
+                    fill()
+                    self._play_streamed(stream, on_start)
+                else:
+                    with stats.timer('tts.wait_for_clip'):
+                        # A failed clip raises here; stop() finishes it early
+                        data = stream.getvalue()
+                    fill()
+                    if not self.is_running():
+                        break
+                    self.player.enqueue(data, self.is_running, on_start)
+                index += 1
+            self.player.wait_until_done(self.is_running)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _play_streamed(self, stream, on_start):
+        """Hand a WAV clip to the player segment by segment as it downloads"""
+        waited_since = time.perf_counter()
+        # A failed clip raises here once its audio so far has been queued; stop() ends it early
+        for segment in iter_wav_segments(stream.iter_parts()):
+            if waited_since is not None:
+                stats.record('tts.wait_for_clip', time.perf_counter() - waited_since)
+                waited_since = None
+            if not self.is_running():
+                return
+            stats.count('tts.streamed_segments')
+            self.player.enqueue(segment, self.is_running, on_start)
+            on_start = None
+
+
+class Pyttsx3Narrator:
+    """Feed a pyttsx3 engine one chunk at a time.
+
+    Stop, pause and property changes (rate, voice) take effect at the next
+    chunk boundary instead of after the whole document. ``offset`` is the
+    start of the chunk being spoken, or the end of the last one finished.
+    """
+
+    def __init__(self, engine, chunk_chars=DEFAULT_CHUNK_CHARS, first_chunk_chars=DEFAULT_FIRST_CHUNK_CHARS):
+        self.engine = engine
+        self.chunk_chars = chunk_chars
+        self.first_chunk_chars = first_chunk_chars
+        self.offset = 0
+        self._chunks = queue.Queue()
+        self._pending_properties = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def is_running(self):
+        return not self._stop_event.is_set()
+
+    def set_property(self, name, value):
+        """Apply an engine property before the next chunk is spoken"""
+        with self._lock:
+            self._pending_properties[name] = value
+
+    def _apply_pending_properties(self):
+        with self._lock:
+            properties, self._pending_properties = self._pending_properties, {}
+        for name, value in properties.items():
+            self.engine.setProperty(name, value)
+
+    def stop(self):
+        """Stop after the current chunk is torn down; safe to call from any thread"""
+        self._stop_event.set()
+        try:
+            self.engine.stop()
+        except Exception:
+            pass
+
+    def run(self, text, start_offset=0, on_chunk_start=None, on_word=None, boundaries=None):
+        """Speak text from start_offset, blocking until done or stopped.
+
+        on_word(start, end) gets the offsets in text of each word as the
+        engine starts speaking it, if the engine reports words. boundaries
+        are precomputed sentence starts in text, as for split_into_chunks().
+        """
+        self.offset = start_offset
+        for chunk in split_into_chunks(text, self.chunk_chars, self.first_chunk_chars, start=start_offset,
+                                       boundaries=boundaries):
+            self._chunks.put(chunk)
+        stats.gauge('pyttsx3.queued_chunks', self._chunks.qsize())
+
+        word_token = None
+        if on_word and hasattr(self.engine, 'connect'):
+            # Word locations are relative to the chunk being said
+            def on_started_word(name, location, length):
+                stats.count('pyttsx3.words')
+                on_word(self.offset + location, self.offset + location + length)
+            word_token = self.engine.connect('started-word', on_started_word)
+
+        try:
+            index = 0
+            while self.is_running():
+                try:
+                    chunk = self._chunks.get_nowait()
+                except queue.Empty:
+                    break
+                self._apply_pending_properties()
+                self.offset = chunk.start
+                if on_chunk_start:
+                    on_chunk_start(index, chunk)
+                with stats.timer('pyttsx3.chunk'):
+                    self.engine.say(chunk.text)
+                    self.engine.runAndWait()
+                if self.is_running():
+                    self.offset = chunk.start + len(chunk.text)
+                index += 1
+        finally:
+            if word_token is not None:
+                self.engine.disconnect(word_token)